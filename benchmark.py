@@ -0,0 +1,454 @@
+import os
+import sys
+import csv
+import json
+import asyncio
+import time
+import random
+import socket
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from file_client import FileClient, AsyncFileClient
+from file_metrics import Histogram
+from file_tracing import TraceSummary, TRACE_PHASES
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_SCRIPTS = {
+    'thread': 'file_server_multithreading.py',
+    'process': 'file_server_multiprocessing.py',
+    'asyncio': 'file_server_asyncio.py',
+}
+OPERATIONS = ('download', 'upload', 'get', 'list', 'stat')
+# Operasi yang hasilnya bergantung pada ukuran file; LIST dan STAT cukup sekali per jumlah client
+SIZED_OPERATIONS = ('download', 'upload', 'get')
+# Perintah server untuk tiap operasi, dipakai untuk membaca byte dan jumlah request dari STATS
+OPERATION_COMMANDS = {'download': 'get', 'get': 'get', 'upload': 'add', 'list': 'list', 'stat': 'stat'}
+SIZE_UNITS = {'B': 1, 'KB': 2**10, 'MB': 2**20, 'GB': 2**30}
+SERVER_START_TIMEOUT = 15.0
+# Worker prefork mempublikasikan metriknya setiap detik, jadi STATS ditunggu sebentar
+STATS_SETTLE_DELAY = 1.2
+# Bucket latency sisi client lebih rapat dari bucket server (selisih antar bucket 5%), 10us sampai ~18 menit
+CLIENT_LATENCY_BUCKETS = [0.00001 * 1.05**i for i in range(380)]
+# Waktu yang diberikan ke proses generator untuk siap sebelum semua client mulai bersamaan
+GENERATOR_START_DELAY = 0.5
+CLIENT_MODES = ('thread', 'asyncio')
+SOURCE_NAME = 'bench-source-{size}.bin'
+CSV_FIELDS = ['run_id', 'backend', 'server_pool', 'operation', 'size', 'clients', 'requests', 'ok', 'failed',
+              'wall_s', 'bytes', 'mb_per_s', 'requests_per_s', 'server_requests',
+              'latency_mean_ms', 'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms'] + \
+             [f"trace_{phase}_ms" for phase in TRACE_PHASES]
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for unit in sorted(SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def parse_list(text, convert=str):
+    return [convert(item.strip()) for item in text.split(',') if item.strip()]
+
+
+class ServerProcess:
+    # Server dijalankan sebagai subprocess di direktori kerja sementara, sehingga setiap run
+    # dimulai dari folder files/ yang kosong dan tidak mengganggu file milik pengguna
+    def __init__(self, backend, pool_size, port, workdir):
+        self.backend = backend
+        self.pool_size = pool_size
+        self.address = ('127.0.0.1', port)
+        self.workdir = workdir
+        self.process = None
+        self.log_file = None
+
+    def start(self):
+        script = os.path.join(BASE_DIR, SERVER_SCRIPTS[self.backend])
+        self.log_file = open(os.path.join(self.workdir, f"server-{self.backend}-{self.pool_size}.log"), 'w')
+        self.process = subprocess.Popen([sys.executable, script, str(self.pool_size), '--port', str(self.address[1])],
+                                        cwd=self.workdir, stdout=self.log_file, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server {self.backend} exited with code {self.process.returncode}, "
+                                   f"see {self.log_file.name}")
+            try:
+                socket.create_connection(self.address, timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"Server {self.backend} did not start within {SERVER_START_TIMEOUT}s")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.log_file is not None:
+            self.log_file.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def make_source(workdir, size, seed):
+    # Isi file acak dengan seed tetap: tidak bisa dikompresi dan sama di setiap run
+    path = os.path.join(workdir, 'data', format_size(size))
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        generator = random.Random(f"{seed}-{size}")
+        with open(path, 'wb') as source:
+            remaining = size
+            while remaining:
+                block = min(remaining, 2**20)
+                source.write(generator.randbytes(block))
+                remaining -= block
+    return path
+
+
+def command_counters(client, command):
+    result = client.stats()
+    if result['status'] != 'OK':
+        raise RuntimeError(f"STATS failed: {result.get('data')}")
+    counters = result['counters']
+    label = f'{{command="{command}"}}'
+    return {
+        'requests': counters.get('file_requests_total' + label, 0),
+        'bytes': counters.get('file_bytes_sent_total' + label, 0) + counters.get('file_bytes_received_total' + label, 0),
+    }
+
+
+def download_path(workdir, index):
+    return os.path.join(workdir, f"download-{index}.bin")
+
+
+def remove_download(target):
+    # Target dihapus supaya cache digest tidak mengubah download berikutnya menjadi NOT_MODIFIED
+    if os.path.exists(target):
+        os.remove(target)
+
+
+def perform(client, operation, index, size, source, workdir):
+    if operation == 'download':
+        target = download_path(workdir, index)
+        try:
+            return client.download(SOURCE_NAME.format(size=size), target)
+        finally:
+            remove_download(target)
+    if operation == 'upload':
+        return client.upload(source, f"bench-upload-{index}-{size}.bin")
+    if operation == 'get':
+        return client.get(SOURCE_NAME.format(size=size))
+    if operation == 'list':
+        return client.list()
+    return client.stat(SOURCE_NAME.format(size=size))
+
+
+async def perform_async(client, operation, index, size, source, workdir):
+    if operation == 'download':
+        target = download_path(workdir, index)
+        try:
+            return await client.download(SOURCE_NAME.format(size=size), target)
+        finally:
+            remove_download(target)
+    if operation == 'upload':
+        return await client.upload(source, f"bench-upload-{index}-{size}.bin")
+    if operation == 'get':
+        return await client.get(SOURCE_NAME.format(size=size))
+    if operation == 'list':
+        return await client.list()
+    return await client.stat(SOURCE_NAME.format(size=size))
+
+
+class LoadResult:
+    # Hasil satu kelompok client virtual; dikirim balik dari proses generator lewat pickle
+    def __init__(self):
+        self.ok = 0
+        self.failed = 0
+        self.histogram = Histogram(bounds=CLIENT_LATENCY_BUCKETS)
+        # Rincian waktu per fase dari server bila benchmark dijalankan dengan --trace
+        self.traces = TraceSummary()
+        self.finished = 0.0
+
+    def record(self, ok, seconds):
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+        self.histogram.observe(seconds)
+
+    def merge(self, other):
+        self.ok += other.ok
+        self.failed += other.failed
+        self.histogram.merge(other.histogram)
+        self.traces.merge(other.traces)
+        self.finished = max(self.finished, other.finished)
+
+
+def run_thread_clients(job, indices):
+    client = FileClient(job['address'], pool_size=len(indices), timeout=job['timeout'], trace=job['trace'])
+
+    def virtual_client(index):
+        result = LoadResult()
+        for _ in range(job['requests']):
+            start = time.perf_counter()
+            try:
+                ok = perform(client, job['operation'], index, job['size'], job['source'], job['workdir'])['status'] == 'OK'
+            except Exception as err:
+                print(f"{job['operation']} error: {err}", file=sys.stderr)
+                ok = False
+            result.record(ok, time.perf_counter() - start)
+        return result
+
+    total = LoadResult()
+    with ThreadPoolExecutor(max_workers=len(indices)) as executor:
+        for result in executor.map(virtual_client, indices):
+            total.merge(result)
+    client.close()
+    if client.traces is not None:
+        total.traces.merge(client.traces)
+    return total
+
+
+async def run_async_clients(job, indices):
+    client = AsyncFileClient(job['address'], pool_size=len(indices), timeout=job['timeout'], trace=job['trace'])
+    total = LoadResult()
+
+    async def virtual_client(index):
+        for _ in range(job['requests']):
+            start = time.perf_counter()
+            try:
+                result = await perform_async(client, job['operation'], index, job['size'], job['source'], job['workdir'])
+                ok = result['status'] == 'OK'
+            except Exception as err:
+                print(f"{job['operation']} error: {err}", file=sys.stderr)
+                ok = False
+            total.record(ok, time.perf_counter() - start)
+
+    await asyncio.gather(*(virtual_client(index) for index in indices))
+    client.close()
+    if client.traces is not None:
+        total.traces.merge(client.traces)
+    return total
+
+
+def run_clients(job, indices):
+    # Semua proses generator mulai bersamaan pada job['start_at'] (time.monotonic berlaku lintas proses)
+    delay = job['start_at'] - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    if job['mode'] == 'asyncio':
+        result = asyncio.run(run_async_clients(job, indices))
+    else:
+        result = run_thread_clients(job, indices)
+    result.finished = time.monotonic()
+    return result
+
+
+def run_cell(server, settings, operation, size, clients, generators=None):
+    client = FileClient(server.address, pool_size=1, timeout=settings.timeout)
+    source = make_source(server.workdir, size, settings.seed) if size else None
+    if operation in ('download', 'get', 'stat') and size:
+        result = client.upload(source, SOURCE_NAME.format(size=size))
+        if result['status'] != 'OK':
+            raise RuntimeError(f"Failed to prepare {format_size(size)} source: {result.get('data')}")
+
+    command = OPERATION_COMMANDS[operation]
+    if server.backend == 'process':
+        time.sleep(STATS_SETTLE_DELAY)
+    before = command_counters(client, command)
+
+    job = {'address': server.address, 'operation': operation, 'size': size, 'source': source,
+           'workdir': server.workdir, 'requests': settings.requests, 'timeout': settings.timeout,
+           'mode': settings.client_mode, 'trace': settings.trace, 'start_at': time.monotonic()}
+    total = LoadResult()
+    if generators is None:
+        total.merge(run_clients(job, range(clients)))
+    else:
+        # Client virtual dibagi rata ke proses generator, sehingga encode/decode di sisi client
+        # tidak tertahan GIL satu proses
+        groups = [range(offset, clients, settings.client_processes)
+                  for offset in range(min(clients, settings.client_processes))]
+        job['start_at'] = time.monotonic() + GENERATOR_START_DELAY
+        for result in generators.map(run_clients, [job] * len(groups), groups):
+            total.merge(result)
+    wall = total.finished - job['start_at']
+
+    if server.backend == 'process':
+        time.sleep(STATS_SETTLE_DELAY)
+    after = command_counters(client, command)
+    client.close()
+
+    histogram = total.histogram
+    requests = total.ok + total.failed
+    transferred = after['bytes'] - before['bytes']
+    row = {
+        'backend': server.backend,
+        'server_pool': server.pool_size,
+        'operation': operation,
+        'size': format_size(size) if size else '',
+        'clients': clients,
+        'requests': requests,
+        'ok': total.ok,
+        'failed': total.failed,
+        'wall_s': round(wall, 6),
+        'bytes': transferred,
+        'mb_per_s': round(transferred / wall / 2**20, 3) if wall else 0.0,
+        'requests_per_s': round(requests / wall, 3) if wall else 0.0,
+        'server_requests': after['requests'] - before['requests'],
+        'latency_mean_ms': round(histogram.total / requests * 1000, 3) if requests else 0.0,
+        'latency_p50_ms': round(histogram.quantile(0.5) * 1000, 3),
+        'latency_p95_ms': round(histogram.quantile(0.95) * 1000, 3),
+        'latency_p99_ms': round(histogram.quantile(0.99) * 1000, 3),
+    }
+    # Rata-rata waktu per fase di server (ms per request) untuk melihat apakah cell ini
+    # dibatasi disk, CPU (encode/digest), atau jaringan
+    trace = total.traces.summary().get(command)
+    if trace is not None:
+        for phase in TRACE_PHASES:
+            row[f"trace_{phase}_ms"] = round(trace['mean_ms'][phase], 3)
+    return row
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(run_id, settings):
+    return {
+        'run_id': run_id,
+        'started_at': datetime.datetime.now().astimezone().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {key: value for key, value in vars(settings).items()},
+        'environment': {key: value for key, value in os.environ.items() if key.startswith('FILE_')},
+    }
+
+
+def write_results(prefix, metadata, rows):
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    with open(f"{prefix}.json", 'w') as json_file:
+        json.dump({'metadata': metadata, 'results': rows}, json_file, indent=2)
+    with open(f"{prefix}.csv", 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, run_id=metadata['run_id']))
+    return f"{prefix}.json", f"{prefix}.csv"
+
+
+def print_row(row):
+    print(f"{row['backend']:>7} pool={row['server_pool']:<4} {row['operation']:<8} {row['size']:>6} "
+          f"clients={row['clients']:<4} ok={row['ok']}/{row['requests']} wall={row['wall_s']:.3f}s "
+          f"{row['mb_per_s']:.2f} MB/s p50={row['latency_p50_ms']:.1f}ms p95={row['latency_p95_ms']:.1f}ms "
+          f"p99={row['latency_p99_ms']:.1f}ms", flush=True)
+    if 'trace_send_ms' in row:
+        print('        server ms/request: ' + ' '.join(f"{phase}={row[f'trace_{phase}_ms']:.2f}"
+                                                    for phase in TRACE_PHASES), flush=True)
+
+
+def run_benchmark(settings):
+    run_id = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    metadata = run_metadata(run_id, settings)
+    rows = []
+    workdir = tempfile.mkdtemp(prefix='file-bench-')
+    # Proses generator dibuat sekali untuk seluruh run, jadi biaya fork tidak ikut terukur
+    generators = ProcessPoolExecutor(settings.client_processes) if settings.client_processes > 1 else None
+    try:
+        for backend in settings.server:
+            for pool_size in settings.server_pools:
+                with ServerProcess(backend, pool_size, settings.port, workdir) as server:
+                    for operation in settings.operations:
+                        if operation in SIZED_OPERATIONS:
+                            sizes = settings.sizes
+                        else:
+                            sizes = [settings.sizes[0] if operation == 'stat' else None]
+                        for size in sizes:
+                            for clients in settings.clients:
+                                row = run_cell(server, settings, operation, size, clients, generators)
+                                print_row(row)
+                                rows.append(row)
+                # Direktori files/ dikosongkan supaya run berikutnya mulai dari kondisi yang sama
+                shutil.rmtree(os.path.join(workdir, 'files'), ignore_errors=True)
+    finally:
+        if generators is not None:
+            generators.shutdown()
+        if settings.keep_workdir:
+            print(f"Work directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return metadata, rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark file server backends')
+    parser.add_argument('--server', type=lambda text: parse_list(text), default=['thread'],
+                        help=f"Comma-separated backends: {', '.join(SERVER_SCRIPTS)}")
+    parser.add_argument('--operations', type=lambda text: parse_list(text), default=['download', 'upload', 'list'],
+                        help=f"Comma-separated operations: {', '.join(OPERATIONS)}")
+    parser.add_argument('--sizes', type=lambda text: parse_list(text, parse_size), default=[10 * 2**20],
+                        help='Comma-separated file sizes, e.g. 1MB,10MB')
+    parser.add_argument('--clients', type=lambda text: parse_list(text, int), default=[1, 5],
+                        help='Comma-separated concurrent client counts')
+    parser.add_argument('--server-pools', type=lambda text: parse_list(text, int), default=[10],
+                        help='Comma-separated server worker pool sizes')
+    parser.add_argument('--requests', type=int, default=5, help='Requests per client in each cell')
+    parser.add_argument('--client-processes', type=int, default=1,
+                        help='Load generator processes the virtual clients are spread across')
+    parser.add_argument('--client-mode', choices=CLIENT_MODES, default='thread',
+                        help='Run virtual clients as threads or asyncio tasks within each process')
+    parser.add_argument('--trace', action='store_true',
+                        help='Request per-phase server timing for every request and report the averages')
+    parser.add_argument('--port', type=int, default=13337)
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=0, help='Seed for generated file contents')
+    parser.add_argument('--output', default=None,
+                        help='Output path prefix for .json and .csv (default result/benchmark-<run_id>)')
+    parser.add_argument('--keep-workdir', action='store_true', help='Keep the temporary server directory and logs')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    settings = parser.parse_args(argv)
+    for backend in settings.server:
+        if backend not in SERVER_SCRIPTS:
+            parser.error(f"unknown server backend: {backend}")
+    for operation in settings.operations:
+        if operation not in OPERATIONS:
+            parser.error(f"unknown operation: {operation}")
+
+    metadata, rows = run_benchmark(settings)
+    prefix = settings.output or os.path.join('result', f"benchmark-{metadata['run_id']}")
+    for path in write_results(prefix, metadata, rows):
+        print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
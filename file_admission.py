@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+
+from file_framing import SocketReader, BINARY_MAGIC, TEXT_TERMINATOR
+from file_connection import response_header
+from file_metrics import metrics
+
+# Batas koneksi yang menunggu worker; koneksi berikutnya langsung dijawab BUSY
+MAX_QUEUE = int(os.environ.get('FILE_MAX_QUEUE', 64))
+# Koneksi yang sudah menunggu lebih lama dari ini dijawab BUSY, bukan dilayani
+QUEUE_TIMEOUT = float(os.environ.get('FILE_QUEUE_TIMEOUT', 5.0))
+# Saran jeda (detik) sebelum client mencoba lagi
+RETRY_AFTER = float(os.environ.get('FILE_RETRY_AFTER', 1.0))
+# Batas koneksi yang dilayani bersamaan oleh server asyncio
+MAX_CONNECTIONS = int(os.environ.get('FILE_MAX_CONNECTIONS', 1000))
+# Waktu tunggu data pertama dari client yang ditolak (untuk menentukan mode teks/binary)
+REJECT_READ_TIMEOUT = 0.2
+# Batas byte request yang dibuang setelah BUSY dikirim; client yang terus mengirim body besar
+# tidak boleh menahan thread penolakan (dan penolakan lain di belakangnya)
+REJECT_DRAIN_BYTES = 2**18
+REJECT_BACKLOG = 256
+
+
+def busy_result(retry_after=RETRY_AFTER):
+    return dict(status='BUSY', data='Server sedang sibuk, coba lagi nanti', retry_after=retry_after)
+
+
+def encode_busy(binary, retry_after=RETRY_AFTER):
+    result = busy_result(retry_after)
+    if binary:
+        return response_header(result, b'')
+    return json.dumps(result).encode() + TEXT_TERMINATOR
+
+
+def sniffed_binary(pending):
+    # Mode client yang belum selesai mengirim magic: binary bila data yang sudah ada adalah
+    # awal BINARY_MAGIC, selain itu (termasuk belum ada data sama sekali) dianggap teks
+    return bool(pending) and BINARY_MAGIC.startswith(bytes(pending))
+
+
+def reject_connection(conn, client_addr=None, retry_after=RETRY_AFTER):
+    metrics.inc('file_rejected_total')
+    logging.debug("Rejecting %s: server busy", client_addr)
+    try:
+        conn.settimeout(REJECT_READ_TIMEOUT)
+        reader = SocketReader(conn)
+        try:
+            binary = reader.detect_binary()
+        except socket.timeout:
+            binary = sniffed_binary(reader.pending)
+        conn.sendall(encode_busy(binary, retry_after))
+        # Request yang sudah dikirim client dibaca dan dibuang dulu; close dengan data belum
+        # terbaca membuat kernel mengirim RST yang bisa menghapus respons BUSY di sisi client
+        conn.shutdown(socket.SHUT_WR)
+        deadline = time.monotonic() + REJECT_READ_TIMEOUT
+        drained = 0
+        while drained < REJECT_DRAIN_BYTES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            conn.settimeout(remaining)
+            data = conn.recv(2**16)
+            if not data:
+                break
+            drained += len(data)
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+
+class Rejecter:
+    # Penolakan dikerjakan satu thread tersendiri supaya loop accept dan worker tidak tertahan
+    # menunggu client yang ditolak. Bila antrian penolakan pun penuh, koneksi langsung ditutup.
+    def __init__(self, retry_after=RETRY_AFTER):
+        self.retry_after = retry_after
+        self.pending = queue.Queue(REJECT_BACKLOG)
+        self.thread_pid = None
+
+    def reject(self, conn, client_addr=None):
+        if self.thread_pid != os.getpid():
+            self.thread_pid = os.getpid()
+            threading.Thread(target=self.run, name='busy-rejecter', daemon=True).start()
+        try:
+            self.pending.put_nowait((conn, client_addr))
+        except queue.Full:
+            metrics.inc('file_rejected_total')
+            conn.close()
+
+    def run(self):
+        while True:
+            conn, client_addr = self.pending.get()
+            reject_connection(conn, client_addr, self.retry_after)
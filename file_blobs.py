@@ -0,0 +1,102 @@
+import os
+import re
+import uuid
+import logging
+
+# Penyimpanan content-addressed diaktifkan dengan environment variable FILE_CAS=1
+CAS_ENABLED = os.environ.get('FILE_CAS', '') == '1'
+BLOB_DIR = '.blobs'
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def target_stat(file_name):
+    try:
+        return os.stat(file_name)
+    except FileNotFoundError:
+        return None
+
+
+class BlobStore:
+    # Isi file disimpan sekali di .blobs/<2 karakter awal>/<sha256>; nama file di direktori
+    # utama adalah hardlink ke blob tersebut, sehingga semua jalur baca (sendfile, GET, LIST)
+    # tetap bekerja tanpa perubahan. Blob yang tidak lagi punya nama (st_nlink == 1) dihapus.
+    # Blob nama yang dihapus/ditimpa dicari lewat inode di disk, karena digest per nama hanya
+    # diketahui index proses yang menyimpannya (tidak ada di worker prefork lain atau setelah restart).
+    def __init__(self, directory=BLOB_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.collect()
+
+    def path(self, digest):
+        if not isinstance(digest, str) or not DIGEST_PATTERN.fullmatch(digest):
+            raise ValueError(f"Invalid digest: {digest}")
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def size(self, digest):
+        try:
+            return os.stat(self.path(digest)).st_size
+        except FileNotFoundError:
+            return None
+
+    def store(self, temp_path, digest):
+        blob_path = self.path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        if os.path.exists(blob_path):
+            os.remove(temp_path)
+            logging.info(f"Blob {digest[:12]} already stored, upload deduplicated")
+            return False
+        os.replace(temp_path, blob_path)
+        return True
+
+    def link(self, digest, file_name):
+        # Hardlink dibuat dengan nama sementara lalu di-rename agar penggantian nama tetap atomik
+        temp_path = os.path.join(os.path.dirname(file_name), f".{os.path.basename(file_name)}.{uuid.uuid4().hex}.lnk")
+        os.link(self.path(digest), temp_path)
+        previous = target_stat(file_name)
+        try:
+            os.replace(temp_path, file_name)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self.release(previous)
+        return os.stat(file_name)
+
+    def find(self, inode, digest=None):
+        # digest hanya petunjuk cepat; tanpa itu direktori blob dibaca (inode dari readdir, tanpa stat)
+        if digest is not None:
+            try:
+                if os.stat(self.path(digest)).st_ino == inode:
+                    return self.path(digest)
+            except (FileNotFoundError, ValueError):
+                pass
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.inode() == inode:
+                    return entry.path
+        return None
+
+    def release(self, previous, digest=None):
+        # previous: stat nama file sebelum dihapus atau ditimpa
+        if previous is None or previous.st_nlink < 2:
+            return
+        blob_path = self.find(previous.st_ino, digest)
+        try:
+            if blob_path is not None and os.stat(blob_path).st_nlink <= 1:
+                os.remove(blob_path)
+                logging.info(f"Removed unreferenced blob {os.path.basename(blob_path)[:12]}")
+        except FileNotFoundError:
+            pass
+
+    def collect(self):
+        removed = 0
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.stat().st_nlink <= 1:
+                    os.remove(entry.path)
+                    removed += 1
+        if removed:
+            logging.info(f"Removed {removed} unreferenced blob(s)")
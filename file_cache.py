@@ -0,0 +1,114 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Batas memori cache untuk satu server (total semua proses), bisa diatur lewat environment
+# variable FILE_CACHE_BYTES. Server prefork membaginya rata ke setiap worker.
+CACHE_BYTES = int(os.environ.get('FILE_CACHE_BYTES', 2**29))
+
+
+def file_stamp(file_stat):
+    # File baru selalu ditulis lewat rename, jadi inode ikut berubah setiap kali isi berubah
+    return file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+
+
+class ContentCache:
+    # Cache LRU isi file yang sering diminta, dibatasi total byte.
+    # Setiap entry menyimpan stamp file; entry dengan stamp lama dianggap miss.
+    def __init__(self, max_bytes=CACHE_BYTES, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 2 if max_entry_bytes is None else max_entry_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resize(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.max_entry_bytes = min(self.max_entry_bytes, max_bytes // 2)
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def accepts(self, size):
+        return 0 < size <= self.max_entry_bytes
+
+    def get(self, path, form, stamp, count=True):
+        key = (os.path.normpath(path), form)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                self.hits += count
+                return entry[1]
+            if entry is not None:
+                self.remove(key)
+            self.misses += count
+            return None
+
+    def put(self, path, form, stamp, value):
+        if not self.accepts(len(value)):
+            return
+        key = (os.path.normpath(path), form)
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (stamp, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                evicted_key, _ = next(iter(self.entries.items()))
+                self.remove(evicted_key)
+                self.evictions += 1
+                logging.debug("Cache evicted %s (%s)", evicted_key[0], evicted_key[1])
+
+    def invalidate(self, path):
+        path = os.path.normpath(path)
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == path]:
+                self.remove(key)
+
+    def remove(self, key):
+        _, value = self.entries.pop(key)
+        self.size -= len(value)
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+
+class SingleFlight:
+    # Pemanggilan dengan key yang sama yang datang bersamaan hanya dijalankan sekali;
+    # pemanggil lain menunggu dan menerima objek hasil yang sama
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.shared = 0
+
+    def run(self, key, func):
+        with self.lock:
+            flight = self.calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.calls[key] = Future()
+            else:
+                self.shared += 1
+
+        if not leader:
+            return flight.result()
+
+        try:
+            result = func()
+            flight.set_result(result)
+            return result
+        except Exception as err:
+            flight.set_exception(err)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
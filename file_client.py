@@ -0,0 +1,980 @@
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from file_framing import (BINARY_MAGIC, COMMAND_OPCODES, FLAG_RAW, TEXT_TERMINATOR, CHUNK_HEADER, PAYLOAD_CHUNKED,
+                          AsyncSocketReader, SocketReader, encode_chunk, pack_frame, payload_reader, read_frame,
+                          read_frame_async)
+from file_codec import (COMPRESS_SAMPLE_SIZE, StreamDecoder, compress_chunks, decompress_chunks, get_codec,
+                        worth_compressing)
+from file_tracing import TraceSummary
+
+DEFAULT_ADDRESS = ('127.0.0.1', 13337)
+DOWNLOAD_BUFFER_SIZE = 2**20
+# Range lebih kecil dari ini tidak sebanding dengan biaya satu request tambahan
+RANGE_MIN_SIZE = 2**20
+UPLOAD_CHUNK_SIZE = 2**23
+# Berapa kali request diulang setelah server menjawab BUSY
+BUSY_RETRIES = 3
+
+Request = namedtuple('Request', ['command', 'name', 'payload', 'flags', 'meta'],
+                     defaults=['', b'', FLAG_RAW, None])
+
+
+def encode_request(request, binary, payload_len=None, trace=False):
+    if not binary:
+        return request.encode() if isinstance(request, str) else request, b''
+    if trace:
+        request = request._replace(meta=dict(request.meta or {}, trace=True))
+    if payload_len is None:
+        payload_len = len(request.payload)
+    header = pack_frame(COMMAND_OPCODES[request.command], request.name, meta=request.meta,
+                        payload_len=payload_len, flags=request.flags)
+    return header, request.payload
+
+
+def is_busy(result):
+    # Server yang penuh menjawab BUSY lalu menutup koneksi
+    return isinstance(result, dict) and result.get('status') == 'BUSY'
+
+
+def read_file_chunks(file_handle):
+    return iter(lambda: file_handle.read(DOWNLOAD_BUFFER_SIZE), b'')
+
+
+def file_compressible(path, codec):
+    with open(path, 'rb') as file_handle:
+        return worth_compressing(codec, file_handle.read(COMPRESS_SAMPLE_SIZE))
+
+
+def decode_body(result, data):
+    if result.get('encoding'):
+        return b''.join(decompress_chunks(get_codec(result['encoding']), [data]))
+    return data
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as file_handle:
+        for chunk in iter(lambda: file_handle.read(DOWNLOAD_BUFFER_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def plan_ranges(file_size, chunk_size):
+    return [(offset, min(chunk_size, file_size - offset)) for offset in range(0, file_size, chunk_size)]
+
+
+class RangeWriter:
+    # File object tiruan yang menulis ke posisi tertentu dengan pwrite, aman dipakai paralel
+    def __init__(self, fd, offset):
+        self.fd = fd
+        self.offset = offset
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self.fd, view, self.offset)
+            self.offset += written
+            view = view[written:]
+
+
+class HashingWriter:
+    # SHA-256 isi yang ditulis, untuk download yang responsnya tidak membawa digest
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hasher = hashlib.sha256()
+
+    def write(self, data):
+        self.hasher.update(data)
+        return self.fileobj.write(data)
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+
+class RangedDownload:
+    # Download paralel ditulis ke <path>.part; range yang sudah selesai dicatat di
+    # <path>.part.json sehingga download yang terputus bisa dilanjutkan
+    def __init__(self, path, info, streams):
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.state_path = f"{path}.part.json"
+        self.lock = threading.Lock()
+        self.state = {'name': info['data_namafile'], 'size': info['data_size'], 'mtime': info['data_mtime'],
+                      'chunk_size': max(RANGE_MIN_SIZE, -(-info['data_size'] // streams)), 'done': []}
+
+        previous = self.load()
+        if previous and all(previous.get(key) == self.state[key] for key in ('name', 'size', 'mtime')) \
+                and os.path.exists(self.part_path):
+            self.state = previous
+
+        self.fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        os.ftruncate(self.fd, self.state['size'])
+
+    def load(self):
+        try:
+            with open(self.state_path) as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return None
+
+    def pending_ranges(self):
+        done = set(self.state['done'])
+        return [r for r in plan_ranges(self.state['size'], self.state['chunk_size']) if r[0] not in done]
+
+    def request(self, offset, length):
+        return Request('get', self.state['name'], meta={'offset': offset, 'length': length})
+
+    def check(self, result, offset):
+        # Setiap range harus berasal dari versi file yang dicatat di .part.json (ukuran dan mtime dari STAT)
+        version = (result.get('file_size'), result.get('file_mtime'))
+        if result['status'] == 'OK' and version != (self.state['size'], self.state['mtime']):
+            return {'status': 'ERROR', 'data': f"File {self.state['name']} changed during download"}
+        if result['status'] == 'OK':
+            with self.lock:
+                self.state['done'].append(offset)
+                temp_path = f"{self.state_path}.tmp"
+                with open(temp_path, 'w') as state_file:
+                    json.dump(self.state, state_file)
+                os.replace(temp_path, self.state_path)
+        return result
+
+    def finish(self, results):
+        os.close(self.fd)
+        failed = [result for result in results if result['status'] != 'OK']
+        if failed:
+            return failed[0]
+        os.replace(self.part_path, self.path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return {'status': 'OK', 'data_namafile': self.state['name'], 'data_size': self.state['size'],
+                'ranges': len(plan_ranges(self.state['size'], self.state['chunk_size']))}
+
+
+class ChunkedUpload:
+    # Upload bertahap: id sesi disimpan di <path>.upload.json sehingga upload yang terputus
+    # dilanjutkan hanya dengan chunk yang belum diterima server
+    def __init__(self, path, name):
+        self.path = path
+        self.state_path = f"{path}.upload.json"
+        file_stat = os.stat(path)
+        self.state = {'name': name, 'size': file_stat.st_size, 'mtime': file_stat.st_mtime,
+                      'upload_id': None, 'chunk_size': None}
+
+        previous = self.load()
+        if previous and all(previous.get(key) == self.state[key] for key in ('name', 'size', 'mtime')):
+            self.state = previous
+
+    def load(self):
+        try:
+            with open(self.state_path) as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return None
+
+    def save(self):
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w') as state_file:
+            json.dump(self.state, state_file)
+        os.replace(temp_path, self.state_path)
+
+    @property
+    def upload_id(self):
+        return self.state['upload_id']
+
+    def begin_request(self, chunk_size):
+        return Request('upload_begin', self.state['name'], meta={'size': self.state['size'], 'chunk_size': chunk_size})
+
+    def start(self, result):
+        self.state['upload_id'] = result['upload_id']
+        self.state['chunk_size'] = result['chunk_size']
+        self.save()
+
+    def reset(self):
+        self.state['upload_id'] = None
+
+    def pending_chunks(self, received):
+        received = set(received)
+        ranges = plan_ranges(self.state['size'], self.state['chunk_size'])
+        return [(index, offset, length) for index, (offset, length) in enumerate(ranges) if index not in received]
+
+    def chunk_request(self, index):
+        return Request('upload_chunk', self.upload_id, meta={'index': index})
+
+    def committed(self, result):
+        if result['status'] == 'OK' and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return result
+
+
+class DigestCache:
+    # Digest file yang pernah didownload ke path lokal. Selama salinan lokal belum berubah,
+    # digest dikirim sebagai if_none_match sehingga server tidak mengirim ulang isinya.
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def key(self, name, target):
+        if not isinstance(target, (str, os.PathLike)):
+            return None
+        return name, os.path.abspath(target)
+
+    def local_stamp(self, target):
+        file_stat = os.stat(target)
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+    def request(self, name, target):
+        key = self.key(name, target)
+        with self.lock:
+            entry = self.entries.get(key)
+        try:
+            if entry is not None and entry[0] == self.local_stamp(target):
+                return Request('get', name, meta={'if_none_match': entry[1]})
+        except OSError:
+            pass
+        return Request('get', name)
+
+    def resolve(self, name, target, result, outcome=None):
+        if result['status'] == 'NOT_MODIFIED':
+            return dict(result, status='OK', data_size=os.path.getsize(target), not_modified=True)
+        # Server hanya mengirim digest yang sudah diketahuinya; selain itu dipakai digest isi yang ditulis
+        if result['status'] == 'OK' and not result.get('data_digest') and outcome and outcome.get('local_digest'):
+            result = dict(result, data_digest=outcome['local_digest'])
+        key = self.key(name, target)
+        if key is not None and result['status'] == 'OK' and result.get('data_digest'):
+            with self.lock:
+                self.entries[key] = (self.local_stamp(target), result['data_digest'])
+        return result
+
+
+def decode_text_response(response):
+    if response is None:
+        raise ConnectionError("Server closed the connection without a response")
+    return json.loads(response)
+
+
+class Connection:
+    # Satu koneksi TCP yang dipakai ulang untuk banyak perintah (keep-alive).
+    # Mode binary memakai framing FPB1, mode teks memakai perintah lama "...\r\n\r\n".
+    def __init__(self, address, timeout=300, binary=True, traces=None):
+        self.binary = binary
+        # TraceSummary; bila diisi setiap request meminta rincian waktu per fase dari server
+        self.traces = traces
+        self.response_started = False
+        self.sock = socket.create_connection(address, timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = SocketReader(self.sock, bufsize=2**20)
+        if binary:
+            self.sock.sendall(BINARY_MAGIC)
+
+    def send(self, request):
+        self.response_started = False
+        header, payload = encode_request(request, self.binary, trace=self.traces is not None)
+        if payload and len(payload) > 2**16:
+            self.sock.sendall(header)
+            self.sock.sendall(payload)
+        else:
+            self.sock.sendall(header + payload)
+
+    def receive_frame(self):
+        frame = read_frame(self.reader)
+        if frame is None:
+            raise ConnectionError("Server closed the connection without a response")
+        self.response_started = True
+        return frame
+
+    def read_trailer(self, result):
+        # Respons ber-trace diikuti frame trailer berisi rincian waktu per fase di server
+        if not result.pop('traced', False):
+            return result
+        trailer = read_frame(self.reader)
+        if trailer is None:
+            raise ConnectionError("Server closed the connection before the trace trailer")
+        result['trace'] = trailer.meta['trace']
+        if self.traces is not None:
+            self.traces.record(trailer.meta.get('command'), trailer.meta['trace'])
+        return result
+
+    def receive(self):
+        if not self.binary:
+            response = self.reader.read_until(TEXT_TERMINATOR)
+            self.response_started = response is not None
+            return decode_text_response(response)
+
+        frame = self.receive_frame()
+        result = frame.meta
+        if frame.payload_len:
+            result['data_file'] = decode_body(result, payload_reader(self.reader, frame.payload_len).read_all())
+        return self.read_trailer(result)
+
+    def request(self, request):
+        self.send(request)
+        return self.receive()
+
+    def download(self, request, fileobj):
+        # Body GET ditulis langsung ke file object per potongan, tidak ditampung di memori
+        self.send(request)
+        frame = self.receive_frame()
+        payload = payload_reader(self.reader, frame.payload_len)
+        if frame.meta.get('encoding'):
+            codec = get_codec(frame.meta['encoding'])
+            for chunk in decompress_chunks(codec, payload.iter_chunks(DOWNLOAD_BUFFER_SIZE)):
+                fileobj.write(chunk)
+            return self.read_trailer(frame.meta)
+
+        buffer = bytearray(DOWNLOAD_BUFFER_SIZE)
+        view = memoryview(buffer)
+        while True:
+            count = payload.readinto(view)
+            if not count:
+                break
+            fileobj.write(view[:count])
+        return self.read_trailer(frame.meta)
+
+    def upload(self, request, path, offset=0, length=None):
+        with open(path, 'rb') as file_handle:
+            if length is None:
+                length = os.fstat(file_handle.fileno()).st_size - offset
+            header, _ = encode_request(request, self.binary, payload_len=length, trace=self.traces is not None)
+            self.response_started = False
+            self.sock.sendall(header)
+            if length:
+                self.sock.sendfile(file_handle, offset, length)
+        return self.receive()
+
+    def upload_compressed(self, request, path, codec):
+        # Panjang hasil kompresi belum diketahui, jadi body dikirim sebagai payload chunked
+        header, _ = encode_request(request, self.binary, payload_len=PAYLOAD_CHUNKED, trace=self.traces is not None)
+        self.response_started = False
+        self.sock.sendall(header)
+        with open(path, 'rb') as file_handle:
+            for chunk in compress_chunks(codec, read_file_chunks(file_handle)):
+                self.sock.sendall(encode_chunk(chunk))
+        self.sock.sendall(CHUNK_HEADER.pack(0))
+        return self.receive()
+
+    def pipeline(self, requests):
+        # Semua request dikirim berurutan tanpa menunggu respons; pengiriman dijalankan
+        # di thread terpisah supaya buffer socket kedua sisi tidak saling menunggu
+        send_error = []
+
+        def send_all():
+            try:
+                for request in requests:
+                    self.send(request)
+            except Exception as err:
+                send_error.append(err)
+
+        sender = threading.Thread(target=send_all, daemon=True)
+        sender.start()
+        try:
+            return [self.receive() for _ in requests]
+        finally:
+            sender.join()
+            if send_error:
+                raise send_error[0]
+
+    def close(self):
+        self.sock.close()
+
+
+class ConnectionPool:
+    def __init__(self, address, max_size=10, timeout=300, binary=True, traces=None):
+        self.address = address
+        self.timeout = timeout
+        self.binary = binary
+        self.traces = traces
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self, fresh=False):
+        self.slots.acquire()
+        if not fresh:
+            try:
+                return self.idle.get_nowait(), True
+            except queue.Empty:
+                pass
+        try:
+            return Connection(self.address, self.timeout, self.binary, self.traces), False
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            conn.close()
+        else:
+            self.idle.put(conn)
+        self.slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn, reused = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        else:
+            self.release(conn)
+
+    def call(self, method, *args):
+        for attempt in range(BUSY_RETRIES):
+            result = self.call_once(method, *args)
+            if not is_busy(result):
+                return result
+            time.sleep(result.get('retry_after', 1.0))
+        return self.call_once(method, *args)
+
+    def call_once(self, method, *args):
+        conn, reused = self.acquire()
+        try:
+            result = getattr(conn, method)(*args)
+        except TimeoutError:
+            self.release(conn, broken=True)
+            raise
+        except (ConnectionError, OSError):
+            self.release(conn, broken=True)
+            if not reused or conn.response_started:
+                raise
+            # Koneksi idle bisa sudah ditutup server; ulangi sekali dengan koneksi baru
+            conn, reused = self.acquire(fresh=True)
+            try:
+                result = getattr(conn, method)(*args)
+            except Exception:
+                self.release(conn, broken=True)
+                raise
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        self.release(conn, broken=is_busy(result))
+        return result
+
+    def request(self, request):
+        return self.call('request', request)
+
+    def pipeline(self, requests):
+        return self.call('pipeline', requests)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class AsyncConnection:
+    def __init__(self, reader, writer, binary=True, traces=None):
+        self.reader = reader
+        self.writer = writer
+        self.binary = binary
+        self.traces = traces
+        self.response_started = False
+
+    @classmethod
+    async def open(cls, address, binary=True, traces=None):
+        stream_reader, writer = await asyncio.open_connection(*address)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if binary:
+            writer.write(BINARY_MAGIC)
+        return cls(AsyncSocketReader(stream_reader, asyncio.get_running_loop(), bufsize=2**20), writer, binary,
+                   traces)
+
+    async def send(self, request):
+        self.response_started = False
+        header, payload = encode_request(request, self.binary, trace=self.traces is not None)
+        self.writer.write(header)
+        if payload:
+            self.writer.write(payload)
+        await self.writer.drain()
+
+    async def receive_frame(self):
+        frame = await read_frame_async(self.reader)
+        if frame is None:
+            raise ConnectionError("Server closed the connection without a response")
+        self.response_started = True
+        return frame
+
+    async def read_trailer(self, result):
+        # Sama dengan Connection.read_trailer
+        if not result.pop('traced', False):
+            return result
+        trailer = await read_frame_async(self.reader)
+        if trailer is None:
+            raise ConnectionError("Server closed the connection before the trace trailer")
+        result['trace'] = trailer.meta['trace']
+        if self.traces is not None:
+            self.traces.record(trailer.meta.get('command'), trailer.meta['trace'])
+        return result
+
+    async def receive(self):
+        if not self.binary:
+            response = await self.reader.read_until(TEXT_TERMINATOR)
+            self.response_started = response is not None
+            return decode_text_response(response)
+
+        frame = await self.receive_frame()
+        result = frame.meta
+        if frame.payload_len:
+            data = b''.join([chunk async for chunk in self.reader.iter_payload(frame.payload_len)])
+            result['data_file'] = decode_body(result, data)
+        return await self.read_trailer(result)
+
+    async def request(self, request):
+        await self.send(request)
+        return await self.receive()
+
+    async def download(self, request, fileobj):
+        loop = asyncio.get_running_loop()
+        await self.send(request)
+        frame = await self.receive_frame()
+        decoder = StreamDecoder(get_codec(frame.meta['encoding'])) if frame.meta.get('encoding') else None
+
+        def write(chunk):
+            for piece in (decoder.feed(chunk) if decoder else [chunk]):
+                fileobj.write(piece)
+
+        async for chunk in self.reader.iter_payload(frame.payload_len):
+            await loop.run_in_executor(None, write, chunk)
+        if decoder:
+            for piece in decoder.finish():
+                await loop.run_in_executor(None, fileobj.write, piece)
+        return await self.read_trailer(frame.meta)
+
+    async def upload(self, request, path, offset=0, length=None):
+        loop = asyncio.get_running_loop()
+        with open(path, 'rb') as file_handle:
+            if length is None:
+                length = os.fstat(file_handle.fileno()).st_size - offset
+            header, _ = encode_request(request, self.binary, payload_len=length, trace=self.traces is not None)
+            self.response_started = False
+            self.writer.write(header)
+            if length:
+                await loop.sendfile(self.writer.transport, file_handle, offset, length)
+            await self.writer.drain()
+        return await self.receive()
+
+    async def upload_compressed(self, request, path, codec):
+        loop = asyncio.get_running_loop()
+        header, _ = encode_request(request, self.binary, payload_len=PAYLOAD_CHUNKED, trace=self.traces is not None)
+        self.response_started = False
+        self.writer.write(header)
+        with open(path, 'rb') as file_handle:
+            chunks = compress_chunks(codec, read_file_chunks(file_handle))
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                self.writer.write(encode_chunk(chunk))
+                await self.writer.drain()
+        self.writer.write(CHUNK_HEADER.pack(0))
+        await self.writer.drain()
+        return await self.receive()
+
+    async def pipeline(self, requests):
+        async def send_all():
+            for request in requests:
+                await self.send(request)
+
+        sender = asyncio.create_task(send_all())
+        try:
+            return [await self.receive() for _ in requests]
+        finally:
+            await sender
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnectionPool:
+    def __init__(self, address, max_size=10, timeout=300, binary=True, traces=None):
+        self.address = address
+        self.timeout = timeout
+        self.binary = binary
+        self.traces = traces
+        self.idle = []
+        self.slots = asyncio.Semaphore(max_size)
+
+    async def acquire(self, fresh=False):
+        await self.slots.acquire()
+        if self.idle and not fresh:
+            return self.idle.pop(), True
+        try:
+            return await asyncio.wait_for(AsyncConnection.open(self.address, self.binary, self.traces), self.timeout), False
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            conn.close()
+        else:
+            self.idle.append(conn)
+        self.slots.release()
+
+    async def call(self, method, *args):
+        for attempt in range(BUSY_RETRIES):
+            result = await self.call_once(method, *args)
+            if not is_busy(result):
+                return result
+            await asyncio.sleep(result.get('retry_after', 1.0))
+        return await self.call_once(method, *args)
+
+    async def call_once(self, method, *args):
+        conn, reused = await self.acquire()
+        try:
+            result = await asyncio.wait_for(getattr(conn, method)(*args), self.timeout)
+        except asyncio.TimeoutError:
+            self.release(conn, broken=True)
+            raise
+        except (ConnectionError, OSError):
+            self.release(conn, broken=True)
+            if not reused or conn.response_started:
+                raise
+            conn, reused = await self.acquire(fresh=True)
+            try:
+                result = await asyncio.wait_for(getattr(conn, method)(*args), self.timeout)
+            except BaseException:
+                self.release(conn, broken=True)
+                raise
+        except BaseException:
+            self.release(conn, broken=True)
+            raise
+        self.release(conn, broken=is_busy(result))
+        return result
+
+    async def request(self, request):
+        return await self.call('request', request)
+
+    async def pipeline(self, requests):
+        return await self.call('pipeline', requests)
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+
+@contextmanager
+def download_target(target):
+    # Path tujuan ditulis lewat file sementara lalu di-rename setelah download selesai
+    if not isinstance(target, (str, os.PathLike)):
+        yield target, None
+        return
+
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(target)}.", suffix='.part', dir=directory)
+    os.fchmod(fd, 0o644)
+    outcome = {}
+    try:
+        with os.fdopen(fd, 'wb') as fileobj:
+            writer = HashingWriter(fileobj)
+            yield writer, outcome
+        if outcome.get('status') == 'OK':
+            os.replace(temp_path, target)
+            outcome['local_digest'] = writer.hexdigest()
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def accept_encoding(request, compression):
+    # Client menawarkan codec; server yang memutuskan apakah body benar-benar dikompresi
+    if not compression:
+        return request
+    return request._replace(meta=dict(request.meta or {}, accept_encoding=[compression]))
+
+
+class FileClient:
+    def __init__(self, address=DEFAULT_ADDRESS, pool_size=10, timeout=300, compression=None, trace=False):
+        # trace=True: server mengirim rincian waktu per fase untuk setiap request, diakumulasi di traces
+        self.traces = TraceSummary() if trace else None
+        self.pool = ConnectionPool(address, max_size=pool_size, timeout=timeout, traces=self.traces)
+        self.digests = DigestCache()
+        self.compression = compression
+
+    def list(self, prefix='', cursor=None, limit=None, detail=False):
+        meta = {'prefix': prefix, 'cursor': cursor, 'limit': limit, 'detail': detail}
+        return self.pool.request(Request('list', meta={key: value for key, value in meta.items() if value}))
+
+    def iter_list(self, prefix='', page_size=1000, detail=False):
+        cursor = None
+        while True:
+            result = self.list(prefix, cursor, page_size, detail)
+            if result['status'] != 'OK':
+                raise RuntimeError(result.get('data'))
+            yield from result['data']
+            cursor = result.get('next_cursor')
+            if not cursor:
+                return
+
+    def get(self, name):
+        return self.pool.request(accept_encoding(Request('get', name), self.compression))
+
+    def delete(self, name):
+        return self.pool.request(Request('delete', name))
+
+    def stat(self, name):
+        return self.pool.request(Request('stat', name))
+
+    def cache_stats(self):
+        return self.pool.request(Request('cache_stats'))
+
+    def stats(self):
+        return self.pool.request(Request('stats'))
+
+    def profile(self, seconds=None):
+        return self.pool.request(Request('profile', meta={'seconds': seconds} if seconds else {}))
+
+    def add(self, name, content):
+        return self.pool.request(Request('add', name, content))
+
+    def get_range(self, name, offset, length):
+        request = Request('get', name, meta={'offset': offset, 'length': length})
+        return self.pool.request(accept_encoding(request, self.compression))
+
+    def download(self, name, target):
+        request = accept_encoding(self.digests.request(name, target), self.compression)
+        with download_target(target) as (fileobj, outcome):
+            result = self.pool.call('download', request, fileobj)
+            if outcome is not None:
+                outcome.update(result)
+        return self.digests.resolve(name, target, result, outcome)
+
+    def download_parallel(self, name, path, streams=4):
+        info = self.stat(name)
+        if info['status'] != 'OK':
+            return info
+
+        transfer = RangedDownload(path, info, streams)
+
+        def fetch(byte_range):
+            offset, length = byte_range
+            try:
+                request = accept_encoding(transfer.request(offset, length), self.compression)
+                result = self.pool.call('download', request, RangeWriter(transfer.fd, offset))
+            except Exception as err:
+                result = {'status': 'ERROR', 'data': str(err)}
+            return transfer.check(result, offset)
+
+        with ThreadPoolExecutor(max_workers=streams) as executor:
+            results = list(executor.map(fetch, transfer.pending_ranges()))
+        return transfer.finish(results)
+
+    def has(self, digest):
+        return self.pool.request(Request('has', digest))
+
+    def link(self, name, digest):
+        return self.pool.request(Request('link', name, meta={'digest': digest}))
+
+    def link_existing(self, path, name):
+        # Bila server sudah menyimpan isi yang sama, nama cukup ditautkan tanpa mengirim body
+        result = self.link(name, file_sha256(path))
+        if result['status'] == 'OK':
+            return dict(result, deduplicated=True)
+        return None
+
+    def upload(self, path, name=None, dedupe=False):
+        name = name or os.path.basename(path)
+        result = self.link_existing(path, name) if dedupe else None
+        if result is not None:
+            return result
+        if self.compression and file_compressible(path, get_codec(self.compression)):
+            request = Request('add', name, meta={'encoding': self.compression})
+            return self.pool.call('upload_compressed', request, path, get_codec(self.compression))
+        return self.pool.call('upload', Request('add', name), path)
+
+    def upload_chunked(self, path, name=None, streams=4, chunk_size=UPLOAD_CHUNK_SIZE, dedupe=False):
+        name = name or os.path.basename(path)
+        result = self.link_existing(path, name) if dedupe else None
+        if result is not None:
+            return result
+
+        transfer = ChunkedUpload(path, name)
+        received = []
+        if transfer.upload_id:
+            status = self.pool.request(Request('upload_status', transfer.upload_id))
+            if status['status'] == 'OK':
+                received = status['received']
+            else:
+                transfer.reset()
+        if not transfer.upload_id:
+            result = self.pool.request(transfer.begin_request(chunk_size))
+            if result['status'] != 'OK':
+                return result
+            transfer.start(result)
+
+        def send(chunk):
+            index, offset, length = chunk
+            try:
+                return self.pool.call('upload', transfer.chunk_request(index), path, offset, length)
+            except Exception as err:
+                return {'status': 'ERROR', 'data': str(err)}
+
+        with ThreadPoolExecutor(max_workers=streams) as executor:
+            results = list(executor.map(send, transfer.pending_chunks(received)))
+        failed = [result for result in results if result['status'] != 'OK']
+        if failed:
+            return failed[0]
+        result = self.pool.request(Request('upload_commit', transfer.upload_id))
+        return transfer.committed(result)
+
+    def pipeline(self, requests):
+        return self.pool.pipeline(requests)
+
+    def close(self):
+        self.pool.close()
+
+
+class AsyncFileClient:
+    def __init__(self, address=DEFAULT_ADDRESS, pool_size=10, timeout=300, compression=None, trace=False):
+        self.traces = TraceSummary() if trace else None
+        self.pool = AsyncConnectionPool(address, max_size=pool_size, timeout=timeout, traces=self.traces)
+        self.digests = DigestCache()
+        self.compression = compression
+
+    async def list(self, prefix='', cursor=None, limit=None, detail=False):
+        meta = {'prefix': prefix, 'cursor': cursor, 'limit': limit, 'detail': detail}
+        return await self.pool.request(Request('list', meta={key: value for key, value in meta.items() if value}))
+
+    async def iter_list(self, prefix='', page_size=1000, detail=False):
+        cursor = None
+        while True:
+            result = await self.list(prefix, cursor, page_size, detail)
+            if result['status'] != 'OK':
+                raise RuntimeError(result.get('data'))
+            for entry in result['data']:
+                yield entry
+            cursor = result.get('next_cursor')
+            if not cursor:
+                return
+
+    async def get(self, name):
+        return await self.pool.request(accept_encoding(Request('get', name), self.compression))
+
+    async def delete(self, name):
+        return await self.pool.request(Request('delete', name))
+
+    async def stat(self, name):
+        return await self.pool.request(Request('stat', name))
+
+    async def cache_stats(self):
+        return await self.pool.request(Request('cache_stats'))
+
+    async def stats(self):
+        return await self.pool.request(Request('stats'))
+
+    async def profile(self, seconds=None):
+        return await self.pool.request(Request('profile', meta={'seconds': seconds} if seconds else {}))
+
+    async def add(self, name, content):
+        return await self.pool.request(Request('add', name, content))
+
+    async def get_range(self, name, offset, length):
+        request = Request('get', name, meta={'offset': offset, 'length': length})
+        return await self.pool.request(accept_encoding(request, self.compression))
+
+    async def download(self, name, target):
+        request = accept_encoding(self.digests.request(name, target), self.compression)
+        with download_target(target) as (fileobj, outcome):
+            result = await self.pool.call('download', request, fileobj)
+            if outcome is not None:
+                outcome.update(result)
+        return self.digests.resolve(name, target, result, outcome)
+
+    async def download_parallel(self, name, path, streams=4):
+        info = await self.stat(name)
+        if info['status'] != 'OK':
+            return info
+
+        transfer = RangedDownload(path, info, streams)
+        limit = asyncio.Semaphore(streams)
+
+        async def fetch(byte_range):
+            offset, length = byte_range
+            async with limit:
+                try:
+                    request = accept_encoding(transfer.request(offset, length), self.compression)
+                    result = await self.pool.call('download', request, RangeWriter(transfer.fd, offset))
+                except Exception as err:
+                    result = {'status': 'ERROR', 'data': str(err)}
+            return transfer.check(result, offset)
+
+        results = await asyncio.gather(*[fetch(byte_range) for byte_range in transfer.pending_ranges()])
+        return transfer.finish(results)
+
+    async def has(self, digest):
+        return await self.pool.request(Request('has', digest))
+
+    async def link(self, name, digest):
+        return await self.pool.request(Request('link', name, meta={'digest': digest}))
+
+    async def link_existing(self, path, name):
+        digest = await asyncio.get_running_loop().run_in_executor(None, file_sha256, path)
+        result = await self.link(name, digest)
+        if result['status'] == 'OK':
+            return dict(result, deduplicated=True)
+        return None
+
+    async def upload(self, path, name=None, dedupe=False):
+        name = name or os.path.basename(path)
+        result = await self.link_existing(path, name) if dedupe else None
+        if result is not None:
+            return result
+        if self.compression and file_compressible(path, get_codec(self.compression)):
+            request = Request('add', name, meta={'encoding': self.compression})
+            return await self.pool.call('upload_compressed', request, path, get_codec(self.compression))
+        return await self.pool.call('upload', Request('add', name), path)
+
+    async def upload_chunked(self, path, name=None, streams=4, chunk_size=UPLOAD_CHUNK_SIZE, dedupe=False):
+        name = name or os.path.basename(path)
+        result = await self.link_existing(path, name) if dedupe else None
+        if result is not None:
+            return result
+
+        transfer = ChunkedUpload(path, name)
+        received = []
+        if transfer.upload_id:
+            status = await self.pool.request(Request('upload_status', transfer.upload_id))
+            if status['status'] == 'OK':
+                received = status['received']
+            else:
+                transfer.reset()
+        if not transfer.upload_id:
+            result = await self.pool.request(transfer.begin_request(chunk_size))
+            if result['status'] != 'OK':
+                return result
+            transfer.start(result)
+
+        limit = asyncio.Semaphore(streams)
+
+        async def send(chunk):
+            index, offset, length = chunk
+            async with limit:
+                try:
+                    return await self.pool.call('upload', transfer.chunk_request(index), path, offset, length)
+                except Exception as err:
+                    return {'status': 'ERROR', 'data': str(err)}
+
+        results = await asyncio.gather(*[send(chunk) for chunk in transfer.pending_chunks(received)])
+        failed = [result for result in results if result['status'] != 'OK']
+        if failed:
+            return failed[0]
+        result = await self.pool.request(Request('upload_commit', transfer.upload_id))
+        return transfer.committed(result)
+
+    async def pipeline(self, requests):
+        return await self.pool.pipeline(requests)
+
+    def close(self):
+        self.pool.close()
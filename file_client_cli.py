@@ -1,76 +1,101 @@
-from socket import create_connection
-import json
-import base64
 import os
-import time
+
+from file_client import FileClient, Request, UPLOAD_CHUNK_SIZE
 
 server_address = ('127.0.0.1', 13337)
 
-def send_command(command_str):
-    try:
-        with create_connection(server_address, timeout=300) as sock:
-            sock.sendall(command_str.encode())
+# Koneksi keep-alive dipakai ulang selama sesi CLI berjalan; lebih dari satu untuk PGET.
+# Kompresi zlib ditawarkan ke server, file yang tidak bisa dikompresi tetap dikirim mentah.
+client = FileClient(server_address, pool_size=8, compression='zlib')
 
-            data_received = b""
-            end_marker = b"\r\n\r\n"
+# Opsi UPLOAD/PUPLOAD: cek dulu apakah isi file sudah ada di server (HAS/LINK). Hanya berguna
+# untuk server dengan FILE_CAS=1, karena client harus menghitung SHA-256 seluruh file lebih dulu.
+DEDUPE_OPTION = '--dedupe'
 
-            while True:
-                chunk = sock.recv(2**20)
-                if not chunk:
-                    break
-                data_received += chunk
-                if end_marker in data_received[-8:]:
-                    break
+def split_dedupe(argument):
+    if argument.startswith(DEDUPE_OPTION + ' '):
+        return argument[len(DEDUPE_OPTION):].strip(), True
+    return argument, False
 
-            response_str = data_received.decode().strip()
-            return json.loads(response_str)
+def run_command(action, *args):
+    try:
+        return action(*args)
     except Exception as e:
         print(f"Error: {e}")
         return {"status": "ERROR", "data": str(e)}
 
-def list_files():
-    result = send_command("LIST\r\n\r\n")
-    if result['status'] == 'OK':
+def list_files(prefix=''):
+    # Daftar diambil per halaman sehingga direktori besar tidak dikirim sekaligus
+    try:
         print("Daftar file:")
-        for i, name in enumerate(result['data'], 1):
-            print(f"{i}. {name}")
-    else:
-        print(f"Gagal: {result.get('data')}")
+        for i, entry in enumerate(client.iter_list(prefix, detail=True), 1):
+            print(f"{i}. {entry['name']} ({entry['size']} bytes)")
+    except Exception as e:
+        print(f"Gagal: {e}")
 
 def download_file(filename):
-    result = send_command(f"GET {filename}\r\n\r\n")
-    if result['status'] == 'OK':
-        content = base64.b64decode(result['data_file'])
-        with open(result['data_namafile'], 'wb') as f:
-            f.write(content)
-        print(f"File {filename} berhasil didownload ({len(content)} bytes)")
+    result = run_command(client.download, filename, os.path.basename(filename))
+    if result['status'] == 'OK' and result.get('not_modified'):
+        print(f"File {filename} tidak berubah, salinan lokal sudah terbaru")
+    elif result['status'] == 'OK':
+        print(f"File {filename} berhasil didownload ({result['data_size']} bytes)")
     else:
         print(f"Gagal: {result.get('data')}")
 
-def upload_file(filename):
+def parallel_download(filename, streams=4):
+    result = run_command(client.download_parallel, filename, os.path.basename(filename), streams)
+    if result['status'] == 'OK':
+        print(f"File {filename} berhasil didownload ({result['data_size']} bytes, {result['ranges']} range)")
+    else:
+        print(f"Gagal: {result.get('data')} (jalankan ulang PGET untuk melanjutkan)")
+
+def download_files(filenames):
+    # Semua GET dikirim sekaligus lewat satu koneksi, respons dibaca berurutan
+    results = run_command(client.pipeline, [Request('get', name) for name in filenames])
+    if isinstance(results, dict):
+        results = [results] * len(filenames)
+    for filename, result in zip(filenames, results):
+        if result['status'] == 'OK':
+            content = result.get('data_file', b'')
+            with open(os.path.basename(result['data_namafile']), 'wb') as f:
+                f.write(content)
+            print(f"File {filename} berhasil didownload ({len(content)} bytes)")
+        else:
+            print(f"Gagal {filename}: {result.get('data')}")
+
+def upload_file(filename, dedupe=False):
     if not os.path.exists(filename):
         print(f"File {filename} tidak ditemukan!")
         return
 
-    with open(filename, 'rb') as f:
-        content = base64.b64encode(f.read()).decode()
+    result = run_command(client.upload, filename, None, dedupe)
+    if result['status'] == 'OK' and result.get('deduplicated'):
+        print(f"File {filename} sudah ada di server, diupload tanpa mengirim isi")
+    elif result['status'] == 'OK':
+        print(f"File {filename} berhasil diupload")
+    else:
+        print(f"Gagal upload: {result.get('data')}")
+
+def chunked_upload(filename, streams=4, dedupe=False):
+    if not os.path.exists(filename):
+        print(f"File {filename} tidak ditemukan!")
+        return
 
-    command = f"ADD {filename} {content}\r\n\r\n"
-    result = send_command(command)
+    result = run_command(client.upload_chunked, filename, None, streams, UPLOAD_CHUNK_SIZE, dedupe)
     if result['status'] == 'OK':
         print(f"File {filename} berhasil diupload")
     else:
-        print(f"Gagal upload: {result.get('data')}")
+        print(f"Gagal upload: {result.get('data')} (jalankan ulang PUPLOAD untuk melanjutkan)")
 
 def delete_file(filename):
-    result = send_command(f"DELETE {filename}\r\n\r\n")
+    result = run_command(client.delete, filename)
     if result['status'] == 'OK':
         print(f"File {filename} berhasil dihapus")
     else:
         print(f"Gagal: {result.get('data')}")
 
 def interactive_download():
-    result = send_command("LIST\r\n\r\n")
+    result = run_command(client.list)
     if result['status'] == 'OK':
         files = result['data']
         if not files:
@@ -97,11 +122,31 @@ def interactive_download():
     else:
         print(f"Gagal ambil daftar file: {result.get('data')}")
 
+def show_stats():
+    result = run_command(client.stats)
+    if result['status'] != 'OK':
+        print(f"Gagal: {result.get('data')}")
+        return
+    print("Gauge:")
+    for key, value in sorted(result['gauges'].items()):
+        print(f"  {key} = {value}")
+    print("Latency (ms):")
+    for key, summary in sorted(result['latency'].items()):
+        print(f"  {key}: n={summary['count']} p50={summary['p50'] * 1000:.2f} "
+              f"p95={summary['p95'] * 1000:.2f} p99={summary['p99'] * 1000:.2f}")
+
+def start_profile(seconds=None):
+    result = run_command(client.profile, seconds)
+    if result['status'] != 'OK':
+        print(f"Gagal: {result.get('data')}")
+        return
+    print(f"{result['data']}, laporan akan ditulis ke {result['directory']} di server")
+
 def main():
     print("=== File Client ===")
     while True:
         try:
-            user_input = input("\nPerintah (list/get/upload/delete/download/quit): ").strip()
+            user_input = input("\nPerintah (list/get/mget/pget/upload/pupload/delete/download/stats/profile/quit): ").strip()
             if not user_input:
                 continue
 
@@ -109,17 +154,35 @@ def main():
             cmd = parts[0].upper()
 
             if cmd == "LIST":
-                list_files()
+                list_files(parts[1] if len(parts) > 1 else '')
             elif cmd == "GET":
                 if len(parts) < 2:
                     print("Gunakan: GET <nama_file>")
                 else:
                     download_file(parts[1])
+            elif cmd == "MGET":
+                if len(parts) < 2:
+                    print("Gunakan: MGET <nama_file> [nama_file ...]")
+                else:
+                    download_files(parts[1].split())
+            elif cmd == "PGET":
+                args = parts[1].split() if len(parts) > 1 else []
+                if not args:
+                    print("Gunakan: PGET <nama_file> [jumlah_stream]")
+                else:
+                    parallel_download(args[0], int(args[1]) if len(args) > 1 else 4)
             elif cmd == "UPLOAD":
                 if len(parts) < 2:
-                    print("Gunakan: UPLOAD <nama_file>")
+                    print("Gunakan: UPLOAD [--dedupe] <nama_file>")
+                else:
+                    upload_file(*split_dedupe(parts[1]))
+            elif cmd == "PUPLOAD":
+                argument, dedupe = split_dedupe(parts[1]) if len(parts) > 1 else ('', False)
+                args = argument.split()
+                if not args:
+                    print("Gunakan: PUPLOAD [--dedupe] <nama_file> [jumlah_stream]")
                 else:
-                    upload_file(parts[1])
+                    chunked_upload(args[0], int(args[1]) if len(args) > 1 else 4, dedupe)
             elif cmd == "DELETE":
                 if len(parts) < 2:
                     print("Gunakan: DELETE <nama_file>")
@@ -127,6 +190,10 @@ def main():
                     delete_file(parts[1])
             elif cmd == "DOWNLOAD":
                 interactive_download()
+            elif cmd == "STATS":
+                show_stats()
+            elif cmd == "PROFILE":
+                start_profile(float(parts[1]) if len(parts) > 1 else None)
             elif cmd == "QUIT":
                 print("Keluar...")
                 break
@@ -0,0 +1,99 @@
+import zlib
+
+# Sampel awal file yang dikompresi untuk menilai apakah kompresi sepadan
+COMPRESS_SAMPLE_SIZE = 2**16
+COMPRESS_MIN_SIZE = 512
+# File dengan sampel yang tidak menyusut di bawah rasio ini (JPEG, data acak) dikirim apa adanya
+COMPRESS_RATIO_LIMIT = 0.9
+# Batas output per langkah dekompresi agar payload kecil tidak bisa meledak di memori
+DECOMPRESS_OUTPUT_LIMIT = 2**18
+
+
+class ZlibCodec:
+    # Codec harus menyediakan compressor()/decompressor() dengan antarmuka
+    # zlib.compressobj/decompressobj (compress, decompress(max_length), unconsumed_tail, eof, unused_data, flush)
+    def __init__(self, name, wbits, level=6):
+        self.name = name
+        self.wbits = wbits
+        self.level = level
+
+    def compressor(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, self.wbits)
+
+    def decompressor(self):
+        return zlib.decompressobj(self.wbits)
+
+
+CODECS = {}
+
+
+def register_codec(codec):
+    CODECS[codec.name] = codec
+
+
+register_codec(ZlibCodec('zlib', zlib.MAX_WBITS))
+register_codec(ZlibCodec('gzip', 16 + zlib.MAX_WBITS))
+
+
+def negotiate(accepted):
+    # Codec pertama dari daftar client yang juga dikenal server
+    if isinstance(accepted, str):
+        accepted = [accepted]
+    for name in accepted or []:
+        if name in CODECS:
+            return CODECS[name]
+    return None
+
+
+def get_codec(name):
+    if name not in CODECS:
+        raise ValueError(f"Unsupported encoding: {name}")
+    return CODECS[name]
+
+
+def worth_compressing(codec, sample):
+    if len(sample) < COMPRESS_MIN_SIZE:
+        return False
+    compressor = codec.compressor()
+    compressed_size = len(compressor.compress(sample)) + len(compressor.flush())
+    return compressed_size <= len(sample) * COMPRESS_RATIO_LIMIT
+
+
+def compress_chunks(codec, chunks):
+    compressor = codec.compressor()
+    for chunk in chunks:
+        output = compressor.compress(chunk)
+        if output:
+            yield output
+    tail = compressor.flush()
+    if tail:
+        yield tail
+
+
+class StreamDecoder:
+    def __init__(self, codec):
+        self.decompressor = codec.decompressor()
+
+    def feed(self, data):
+        while data:
+            output = self.decompressor.decompress(data, DECOMPRESS_OUTPUT_LIMIT)
+            if output:
+                yield output
+            data = self.decompressor.unconsumed_tail
+
+    def finish(self):
+        tail = self.decompressor.flush()
+        if tail:
+            yield tail
+        # Stream yang terpotong tidak boleh diterima sebagai file yang lebih pendek
+        if not self.decompressor.eof:
+            raise ValueError("Compressed stream ended before its end marker")
+        if self.decompressor.unused_data:
+            raise ValueError("Unexpected data after the end of the compressed stream")
+
+
+def decompress_chunks(codec, chunks):
+    decoder = StreamDecoder(codec)
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.finish()
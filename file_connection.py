@@ -0,0 +1,262 @@
+import os
+import json
+import logging
+import socket
+import time
+
+from file_framing import (SocketReader, TransferLimit, payload_reader, TEXT_TERMINATOR, STATUS_ERROR,
+                          RESULT_STATUSES, STATUS_OK, OPCODES, COMMAND_OPCODES, body_length, pack_frame, read_frame, send_body,
+                          send_limited)
+from file_metrics import metrics
+from file_logging import access_log
+from file_tracing import Trace
+
+# Body kecil digabung dengan header dalam satu sendall
+INLINE_BODY_LIMIT = 2**16
+# Interval cek client lain yang menunggu selama koneksi keep-alive idle
+IDLE_POLL_INTERVAL = 0.05
+# Batas pencarian nama file pada perintah ADD teks sebelum dianggap request biasa
+ADD_PREFIX_LIMIT = 4096
+
+# Timeout per fase koneksi (detik), bisa diatur lewat environment variable:
+# request pertama/header harus lengkap dalam HEADER_TIMEOUT, body tidak boleh macet lebih dari
+# BODY_TIMEOUT, koneksi keep-alive boleh idle IDLE_TIMEOUT, dan respons tidak boleh macet lebih dari SEND_TIMEOUT
+HEADER_TIMEOUT = float(os.environ.get('FILE_HEADER_TIMEOUT', 10))
+BODY_TIMEOUT = float(os.environ.get('FILE_BODY_TIMEOUT', 30))
+IDLE_TIMEOUT = float(os.environ.get('FILE_IDLE_TIMEOUT', 60))
+SEND_TIMEOUT = float(os.environ.get('FILE_SEND_TIMEOUT', 30))
+# Laju minimum upload/download (byte/detik); client yang lebih lambat diputus. 0 menonaktifkan
+MIN_RATE = int(os.environ.get('FILE_MIN_RATE', 1024))
+
+NEED_MORE = object()
+
+
+def match_add_prefix(pending):
+    # Cek apakah request berikutnya adalah "ADD <nama> <base64>" tanpa mengonsumsi buffer
+    if len(pending) < 4:
+        return None if TEXT_TERMINATOR in pending else NEED_MORE
+    if pending[:4].lower() != b'add ':
+        return None
+
+    space = pending.find(b' ', 4)
+    terminator = pending.find(TEXT_TERMINATOR)
+    if space >= 0 and (terminator < 0 or space < terminator):
+        return bytes(pending[4:space]).decode(), space + 1
+    if terminator >= 0 or len(pending) > ADD_PREFIX_LIMIT:
+        return None
+    return NEED_MORE
+
+
+def read_add_prefix(reader):
+    while True:
+        match = match_add_prefix(reader.pending)
+        if match is NEED_MORE:
+            if not reader.fill():
+                return None
+            continue
+        if match is None:
+            return None
+        file_name, consumed = match
+        del reader.pending[:consumed]
+        return file_name
+
+
+def text_command(request_bytes):
+    # Label metrik dibatasi pada perintah yang dikenal
+    command = bytes(request_bytes[:32]).split(b' ', 1)[0].strip().lower().decode(errors='replace')
+    return command if command in COMMAND_OPCODES else 'unknown'
+
+
+def consumed_bytes(reader):
+    # Byte request yang sudah diproses; data pipelined yang masih di buffer belum dihitung
+    return reader.received - len(reader.pending)
+
+
+def finish_request(command, client_addr, status, phases, bytes_in, bytes_out):
+    metrics.record_request(command, phases, bytes_in, bytes_out)
+    access_log(command, client_addr, status, phases, bytes_in, bytes_out)
+
+
+def header_limit():
+    return TransferLimit(HEADER_TIMEOUT, deadline=HEADER_TIMEOUT, phase='header')
+
+
+def body_limit():
+    return TransferLimit(BODY_TIMEOUT, min_rate=MIN_RATE, phase='body')
+
+
+def send_limit():
+    return TransferLimit(SEND_TIMEOUT, min_rate=MIN_RATE, phase='send')
+
+
+def wait_for_request(reader, client_addr, served):
+    # Fase recv dihitung sejak request berikutnya mulai datang, bukan selama koneksi idle.
+    # Koneksi baru hanya diberi HEADER_TIMEOUT untuk mulai mengirim request.
+    reader.limit = None
+    if reader.data_ready(IDLE_TIMEOUT if served else HEADER_TIMEOUT):
+        reader.limit = header_limit()
+        return True
+    logging.debug("Closing idle connection %s", client_addr)
+    return False
+
+
+def log_slow_client(client_addr, err):
+    metrics.inc('file_slow_clients_total')
+    logging.warning(f"Closing slow connection {client_addr}: {str(err) or 'timed out'}")
+
+
+def response_header(result, body):
+    status = RESULT_STATUSES.get(result.get('status'), STATUS_ERROR)
+    return pack_frame(status, meta=result, payload_len=body_length(body))
+
+
+def start_trace(frame, recv_seconds):
+    # Trace hanya dibuat bila client memintanya lewat meta 'trace'
+    if not frame.meta.get('trace'):
+        return None
+    trace = Trace()
+    trace.add('recv', recv_seconds)
+    return trace
+
+
+def trace_trailer(command, trace):
+    # Waktu kirim baru diketahui setelah body terkirim, jadi rincian trace dikirim sebagai
+    # frame tambahan tanpa payload setelah body; header respons ditandai 'traced'
+    return pack_frame(STATUS_OK, meta={'command': command, 'trace': trace.phases}, payload_len=0)
+
+
+def release_idle(reader, client_addr, should_yield, served):
+    # Koneksi keep-alive yang sedang idle dilepas bila ada client lain menunggu worker.
+    # Request pertama selalu dilayani supaya client yang baru terhubung tidak ditolak.
+    if should_yield is None or not served:
+        return False
+    deadline = time.monotonic() + IDLE_TIMEOUT
+    while not reader.data_ready(IDLE_POLL_INTERVAL):
+        if should_yield():
+            logging.debug("Releasing idle keep-alive connection %s for waiting clients", client_addr)
+            return True
+        if time.monotonic() > deadline:
+            logging.debug("Closing idle connection %s", client_addr)
+            return True
+    return False
+
+
+def serve_text(conn, reader, client_addr, protocol, should_yield=None):
+    served = 0
+    while True:
+        if release_idle(reader, client_addr, should_yield, served):
+            break
+        if not wait_for_request(reader, client_addr, served):
+            break
+        recv_start = time.perf_counter()
+        consumed_start = consumed_bytes(reader)
+        add_file_name = read_add_prefix(reader)
+        if add_file_name is not None:
+            # Body ADD dibaca sambil ditulis ke disk, jadi recv termasuk dalam fase execute
+            logging.debug("Streaming ADD %s from %s", add_file_name, client_addr)
+            reader.limit = body_limit()
+            exec_start = time.perf_counter()
+            result = protocol.stream_add_execute(add_file_name, reader.iter_until(TEXT_TERMINATOR))
+            send_start = time.perf_counter()
+            response = result.encode() + TEXT_TERMINATOR
+            send_limited(conn, response, send_limit())
+            finish_request('add', client_addr, json.loads(result).get('status'),
+                           {'recv': exec_start - recv_start, 'execute': send_start - exec_start,
+                            'send': time.perf_counter() - send_start},
+                           consumed_bytes(reader) - consumed_start, len(response))
+            served += 1
+            continue
+
+        request_bytes = reader.read_until(TEXT_TERMINATOR)
+        if request_bytes is None:
+            break
+
+        logging.debug("Received complete data from %s (size: %s bytes)", client_addr, len(request_bytes))
+
+        exec_start = time.perf_counter()
+        status, response_chunks = protocol.stream_execute(request_bytes.decode().strip())
+        send_start = time.perf_counter()
+        sent = 0
+        limit = send_limit()
+        for chunk in response_chunks:
+            send_limited(conn, chunk, limit)
+            sent += len(chunk)
+        exec_end = time.perf_counter()
+
+        finish_request(text_command(request_bytes), client_addr, status,
+                       {'recv': exec_start - recv_start, 'execute': send_start - exec_start, 'send': exec_end - send_start},
+                       consumed_bytes(reader) - consumed_start, sent)
+        served += 1
+
+
+def serve_binary(conn, reader, client_addr, protocol, should_yield=None):
+    served = 0
+    while True:
+        if release_idle(reader, client_addr, should_yield, served):
+            break
+        if not wait_for_request(reader, client_addr, served):
+            break
+        recv_start = time.perf_counter()
+        consumed_start = consumed_bytes(reader)
+        frame = read_frame(reader)
+        if frame is None:
+            break
+
+        reader.limit = body_limit()
+        payload = payload_reader(reader, frame.payload_len)
+        command = OPCODES.get(frame.opcode, 'unknown')
+
+        # Payload upload dibaca selama execute (langsung ditulis ke disk)
+        exec_start = time.perf_counter()
+        trace = start_trace(frame, exec_start - recv_start)
+        result, body = protocol.frame_execute(frame, payload, trace)
+        exec_end = time.perf_counter()
+        payload.drain()
+
+        served += 1
+        if trace is not None:
+            trace.add_outer('execute', exec_end - exec_start)
+            result['traced'] = True
+        serialize_start = time.perf_counter()
+        header = response_header(result, body)
+        send_start = time.perf_counter()
+        limit = send_limit()
+        if isinstance(body, bytes) and len(body) <= INLINE_BODY_LIMIT:
+            send_limited(conn, header + body, limit)
+            sent = len(header) + len(body)
+        else:
+            send_limited(conn, header, limit)
+            sent = len(header) + send_body(conn, body, limit)
+        send_end = time.perf_counter()
+        if trace is not None:
+            trace.add('serialize', send_start - serialize_start)
+            trace.add_outer('send', send_end - send_start)
+            trailer = trace_trailer(command, trace)
+            send_limited(conn, trailer, limit)
+            sent += len(trailer)
+        finish_request(command, client_addr, result.get('status'),
+                       {'recv': exec_start - recv_start, 'execute': exec_end - exec_start,
+                        'send': send_end - exec_end},
+                       consumed_bytes(reader) - consumed_start, sent)
+
+
+def serve_connection(conn, client_addr, protocol, should_yield=None):
+    reader = SocketReader(conn)
+    metrics.add_gauge('file_active_connections', 1)
+    try:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        logging.debug("Client %s connected and ready to process.", client_addr)
+        reader.limit = header_limit()
+        if reader.detect_binary():
+            logging.debug("Client %s negotiated binary framing", client_addr)
+            serve_binary(conn, reader, client_addr, protocol, should_yield)
+        else:
+            serve_text(conn, reader, client_addr, protocol, should_yield)
+    except TimeoutError as err:
+        log_slow_client(client_addr, err)
+    except Exception as err:
+        logging.error(f"An error occurred while handling {client_addr}: {err}")
+    finally:
+        logging.debug("Connection with %s is now closed.", client_addr)
+        metrics.add_gauge('file_active_connections', -1)
+        conn.close()
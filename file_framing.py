@@ -0,0 +1,497 @@
+import os
+import json
+import asyncio
+import time
+import select
+import struct
+from collections import namedtuple
+
+# Client binary mengirim magic ini sebagai 4 byte pertama koneksi.
+# Client lama langsung mengirim perintah teks yang diakhiri "\r\n\r\n".
+BINARY_MAGIC = b'FPB1'
+TEXT_TERMINATOR = b"\r\n\r\n"
+
+# opcode/status, flags, panjang nama, panjang metadata JSON, panjang payload
+FRAME_HEADER = struct.Struct('!BBHIQ')
+
+OP_LIST = 1
+OP_GET = 2
+OP_ADD = 3
+OP_DELETE = 4
+OP_STAT = 5
+OP_UPLOAD_BEGIN = 6
+OP_UPLOAD_CHUNK = 7
+OP_UPLOAD_STATUS = 8
+OP_UPLOAD_COMMIT = 9
+OP_UPLOAD_ABORT = 10
+OP_CACHE_STATS = 11
+OP_HAS = 12
+OP_LINK = 13
+OP_STATS = 14
+OP_PROFILE = 15
+
+OPCODES = {
+    OP_LIST: 'list',
+    OP_GET: 'get',
+    OP_ADD: 'add',
+    OP_DELETE: 'delete',
+    OP_STAT: 'stat',
+    OP_UPLOAD_BEGIN: 'upload_begin',
+    OP_UPLOAD_CHUNK: 'upload_chunk',
+    OP_UPLOAD_STATUS: 'upload_status',
+    OP_UPLOAD_COMMIT: 'upload_commit',
+    OP_UPLOAD_ABORT: 'upload_abort',
+    OP_CACHE_STATS: 'cache_stats',
+    OP_HAS: 'has',
+    OP_LINK: 'link',
+    OP_STATS: 'stats',
+    OP_PROFILE: 'profile',
+}
+COMMAND_OPCODES = {name: code for code, name in OPCODES.items()}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+# GET dengan if_none_match yang cocok dengan digest file saat ini; tanpa body
+STATUS_NOT_MODIFIED = 2
+# Server penuh; meta berisi retry_after dan koneksi ditutup setelah respons ini
+STATUS_BUSY = 3
+RESULT_STATUSES = {'OK': STATUS_OK, 'NOT_MODIFIED': STATUS_NOT_MODIFIED, 'BUSY': STATUS_BUSY}
+
+# Payload GET/ADD dikirim sebagai byte mentah, bukan base64
+FLAG_RAW = 0x01
+
+# payload_len khusus untuk body yang panjangnya belum diketahui saat header dikirim
+# (misalnya hasil kompresi streaming): body dikirim sebagai rangkaian [panjang u32][data]
+# dan diakhiri chunk dengan panjang 0
+PAYLOAD_CHUNKED = 2**64 - 1
+CHUNK_HEADER = struct.Struct('!I')
+
+Frame = namedtuple('Frame', ['opcode', 'flags', 'name', 'meta', 'payload_len'])
+
+# Body respons yang dikirim langsung dari file descriptor (sendfile)
+FileBody = namedtuple('FileBody', ['file', 'offset', 'length'])
+# Body respons berupa iterator potongan byte, dikirim dengan payload chunked
+StreamBody = namedtuple('StreamBody', ['chunks'])
+
+
+# Laju minimum baru diperiksa setelah fase transfer berjalan selama ini (detik)
+MIN_RATE_GRACE = 10.0
+# sendfile dipecah per segmen agar laju kirim bisa diperiksa di antaranya
+SENDFILE_SEGMENT = 2**23
+# Buffer besar dikirim per potongan: timeout sendall berlaku untuk seluruh panggilan, jadi tanpa
+# potongan SEND_TIMEOUT menjadi batas waktu seluruh body, bukan batas macet
+SEND_SLICE = 2**18
+
+
+class SlowClientError(TimeoutError):
+    pass
+
+
+class TransferLimit:
+    # Batas satu fase transfer: timeout stall per recv/send, deadline total (opsional),
+    # dan laju minimum byte/detik setelah MIN_RATE_GRACE
+    def __init__(self, stall_timeout, deadline=None, min_rate=0, phase=''):
+        self.stall_timeout = stall_timeout
+        self.started = time.monotonic()
+        self.deadline = None if deadline is None else self.started + deadline
+        self.min_rate = min_rate
+        self.phase = phase
+        self.transferred = 0
+        # Sekali timeout, fase ini dianggap gagal; pembacaan berikutnya (misalnya drain) langsung gagal
+        self.expired = False
+
+    def timeout(self):
+        if self.expired:
+            raise SlowClientError(f"{self.phase} timed out")
+        now = time.monotonic()
+        timeout = self.stall_timeout
+        if self.deadline is not None:
+            timeout = min(timeout, self.deadline - now)
+            if timeout <= 0:
+                raise SlowClientError(f"{self.phase} deadline exceeded")
+        elapsed = now - self.started
+        if self.min_rate and elapsed > MIN_RATE_GRACE and self.transferred < self.min_rate * elapsed:
+            raise SlowClientError(f"{self.phase} rate {self.transferred / elapsed:.0f} B/s "
+                                  f"below minimum {self.min_rate} B/s")
+        return timeout
+
+    def add(self, count):
+        self.transferred += count
+
+
+class SocketReader:
+    def __init__(self, sock, bufsize=2**16):
+        self.sock = sock
+        self.bufsize = bufsize
+        self.pending = bytearray()
+        # Total byte yang diterima dari socket, untuk metrik
+        self.received = 0
+        # TransferLimit fase yang sedang berjalan; None berarti timeout socket biasa
+        self.limit = None
+
+    def recv(self, recv_func, *args):
+        if self.limit is None:
+            return recv_func(*args)
+        self.sock.settimeout(self.limit.timeout())
+        try:
+            return recv_func(*args)
+        except TimeoutError:
+            self.limit.expired = True
+            raise
+
+    def count(self, size):
+        self.received += size
+        if self.limit is not None:
+            self.limit.add(size)
+
+    def fill(self):
+        chunk = self.recv(self.sock.recv, self.bufsize)
+        if not chunk:
+            return False
+        self.pending += chunk
+        self.count(len(chunk))
+        return True
+
+    def data_ready(self, timeout=0):
+        if self.pending:
+            return True
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        return bool(readable)
+
+    def take(self, size):
+        data = bytes(self.pending[:size])
+        del self.pending[:size]
+        return data
+
+    def read_exact(self, size):
+        if size <= len(self.pending):
+            return self.take(size)
+
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = len(self.pending)
+        view[:received] = self.pending
+        self.pending.clear()
+        while received < size:
+            count = self.recv(self.sock.recv_into, view[received:], size - received)
+            if count == 0:
+                raise ConnectionError(f"Connection closed after {received} of {size} bytes")
+            received += count
+            self.count(count)
+        return buffer
+
+    def readinto(self, view):
+        if self.pending:
+            count = min(len(view), len(self.pending))
+            view[:count] = self.pending[:count]
+            del self.pending[:count]
+            return count
+        count = self.recv(self.sock.recv_into, view, len(view))
+        if count == 0:
+            raise ConnectionError("Connection closed in the middle of a request body")
+        self.count(count)
+        return count
+
+    def iter_until(self, terminator=TEXT_TERMINATOR):
+        # Data sebelum terminator dikeluarkan per potongan tanpa ditumpuk di buffer
+        keep = len(terminator) - 1
+        while True:
+            index = self.pending.find(terminator)
+            if index >= 0:
+                data = self.take(index)
+                del self.pending[:len(terminator)]
+                if data:
+                    yield data
+                return
+            if len(self.pending) > keep:
+                yield self.take(len(self.pending) - keep)
+            if not self.fill():
+                raise ConnectionError("Connection closed before the request terminator")
+
+    def read_until(self, terminator=TEXT_TERMINATOR):
+        # Hanya data baru yang discan, bukan seluruh buffer setiap kali recv
+        scan_from = 0
+        while True:
+            index = self.pending.find(terminator, scan_from)
+            if index >= 0:
+                data = self.take(index)
+                del self.pending[:len(terminator)]
+                return data
+            scan_from = max(0, len(self.pending) - len(terminator) + 1)
+            if not self.fill():
+                return None
+
+    def detect_binary(self):
+        while len(self.pending) < len(BINARY_MAGIC):
+            if TEXT_TERMINATOR in self.pending or not self.fill():
+                return False
+        if self.pending.startswith(BINARY_MAGIC):
+            del self.pending[:len(BINARY_MAGIC)]
+            return True
+        return False
+
+
+class PayloadReader:
+    def __init__(self, reader, length):
+        self.reader = reader
+        self.remaining = length
+
+    def readinto(self, view):
+        if self.remaining <= 0:
+            return 0
+        count = self.reader.readinto(view[:min(len(view), self.remaining)])
+        self.remaining -= count
+        return count
+
+    def read_all(self):
+        data = self.reader.read_exact(self.remaining) if self.remaining else b''
+        self.remaining = 0
+        return data
+
+    def iter_chunks(self, chunk_size=2**16):
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while self.remaining > 0:
+            count = self.readinto(view)
+            yield bytes(view[:count])
+
+    def drain(self):
+        for _ in self.iter_chunks():
+            pass
+
+
+class ChunkedPayloadReader:
+    # Pasangan PayloadReader untuk payload PAYLOAD_CHUNKED; readinto mengembalikan 0 di akhir body
+    remaining = None
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.chunk_remaining = 0
+        self.finished = False
+
+    def readinto(self, view):
+        if self.chunk_remaining == 0:
+            if self.finished:
+                return 0
+            (size,) = CHUNK_HEADER.unpack(self.reader.read_exact(CHUNK_HEADER.size))
+            if size == 0:
+                self.finished = True
+                return 0
+            self.chunk_remaining = size
+        count = self.reader.readinto(view[:min(len(view), self.chunk_remaining)])
+        self.chunk_remaining -= count
+        return count
+
+    def read_all(self):
+        return b''.join(self.iter_chunks())
+
+    def iter_chunks(self, chunk_size=2**16):
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            count = self.readinto(view)
+            if not count:
+                return
+            yield bytes(view[:count])
+
+    def drain(self):
+        for _ in self.iter_chunks():
+            pass
+
+
+def payload_reader(reader, payload_len):
+    if payload_len == PAYLOAD_CHUNKED:
+        return ChunkedPayloadReader(reader)
+    return PayloadReader(reader, payload_len)
+
+
+class AsyncSocketReader:
+    def __init__(self, stream, loop, bufsize=2**16):
+        self.stream = stream
+        self.loop = loop
+        self.bufsize = bufsize
+        self.pending = bytearray()
+        self.received = 0
+        self.limit = None
+
+    async def fill(self):
+        if self.limit is None:
+            chunk = await self.stream.read(self.bufsize)
+        else:
+            timeout = self.limit.timeout()
+            try:
+                chunk = await asyncio.wait_for(self.stream.read(self.bufsize), timeout)
+            except asyncio.TimeoutError:
+                self.limit.expired = True
+                raise
+            self.limit.add(len(chunk))
+        if not chunk:
+            return False
+        self.pending += chunk
+        self.received += len(chunk)
+        return True
+
+    def take(self, size):
+        data = bytes(self.pending[:size])
+        del self.pending[:size]
+        return data
+
+    async def read_exact(self, size):
+        while len(self.pending) < size:
+            if not await self.fill():
+                raise ConnectionError(f"Connection closed after {len(self.pending)} of {size} bytes")
+        return self.take(size)
+
+    async def readinto(self, view):
+        if not self.pending and not await self.fill():
+            raise ConnectionError("Connection closed in the middle of a request body")
+        count = min(len(view), len(self.pending))
+        view[:count] = self.pending[:count]
+        del self.pending[:count]
+        return count
+
+    async def skip(self, size):
+        while size > 0:
+            if not self.pending and not await self.fill():
+                raise ConnectionError("Connection closed in the middle of a request body")
+            count = min(size, len(self.pending))
+            del self.pending[:count]
+            size -= count
+
+    async def read_until(self, terminator=TEXT_TERMINATOR):
+        scan_from = 0
+        while True:
+            index = self.pending.find(terminator, scan_from)
+            if index >= 0:
+                data = self.take(index)
+                del self.pending[:len(terminator)]
+                return data
+            scan_from = max(0, len(self.pending) - len(terminator) + 1)
+            if not await self.fill():
+                return None
+
+    async def iter_payload(self, payload_len):
+        # Versi async dari payload_reader: mengeluarkan isi body per potongan
+        if payload_len != PAYLOAD_CHUNKED:
+            async for chunk in self.iter_exact(payload_len):
+                yield chunk
+            return
+        while True:
+            (size,) = CHUNK_HEADER.unpack(await self.read_exact(CHUNK_HEADER.size))
+            if size == 0:
+                return
+            async for chunk in self.iter_exact(size):
+                yield chunk
+
+    async def iter_exact(self, size):
+        while size > 0:
+            if not self.pending and not await self.fill():
+                raise ConnectionError("Connection closed in the middle of a response body")
+            chunk = self.take(min(size, len(self.pending)))
+            size -= len(chunk)
+            yield chunk
+
+    async def iter_until(self, terminator=TEXT_TERMINATOR):
+        keep = len(terminator) - 1
+        while True:
+            index = self.pending.find(terminator)
+            if index >= 0:
+                data = self.take(index)
+                del self.pending[:len(terminator)]
+                if data:
+                    yield data
+                return
+            if len(self.pending) > keep:
+                yield self.take(len(self.pending) - keep)
+            if not await self.fill():
+                raise ConnectionError("Connection closed before the request terminator")
+
+
+def pack_frame(opcode, name='', meta=None, payload_len=0, flags=0):
+    name_bytes = name.encode() if isinstance(name, str) else name
+    meta_bytes = json.dumps(meta).encode() if meta else b''
+    header = FRAME_HEADER.pack(opcode, flags, len(name_bytes), len(meta_bytes), payload_len)
+    return header + name_bytes + meta_bytes
+
+
+def body_length(body):
+    if isinstance(body, FileBody):
+        return body.length
+    if isinstance(body, StreamBody):
+        return PAYLOAD_CHUNKED
+    return len(body)
+
+
+def encode_chunk(chunk):
+    return CHUNK_HEADER.pack(len(chunk)) + chunk
+
+
+def iter_file_body(body, chunk_size=2**18):
+    with body.file:
+        offset = body.offset
+        end = body.offset + body.length
+        while offset < end:
+            chunk = os.pread(body.file.fileno(), min(chunk_size, end - offset), offset)
+            if not chunk:
+                return
+            offset += len(chunk)
+            yield chunk
+
+
+def send_limited(conn, data, limit=None):
+    if limit is None:
+        conn.sendall(data)
+        return
+    view = memoryview(data)
+    for start in range(0, len(view), SEND_SLICE):
+        piece = view[start:start + SEND_SLICE]
+        conn.settimeout(limit.timeout())
+        conn.sendall(piece)
+        limit.add(len(piece))
+
+
+def send_body(conn, body, limit=None):
+    # Mengembalikan jumlah byte yang dikirim
+    if isinstance(body, FileBody):
+        with body.file:
+            if limit is None:
+                return conn.sendfile(body.file, body.offset, body.length) if body.length else 0
+            sent = 0
+            while sent < body.length:
+                conn.settimeout(limit.timeout())
+                count = conn.sendfile(body.file, body.offset + sent, min(SENDFILE_SEGMENT, body.length - sent))
+                if not count:
+                    break
+                sent += count
+                limit.add(count)
+            return sent
+    if isinstance(body, StreamBody):
+        sent = CHUNK_HEADER.size
+        for chunk in body.chunks:
+            if chunk:
+                send_limited(conn, encode_chunk(chunk), limit)
+                sent += CHUNK_HEADER.size + len(chunk)
+        send_limited(conn, CHUNK_HEADER.pack(0), limit)
+        return sent
+    if body:
+        send_limited(conn, body, limit)
+        return len(body)
+    return 0
+
+
+def read_frame(reader):
+    if not reader.pending and not reader.fill():
+        return None
+    opcode, flags, name_len, meta_len, payload_len = FRAME_HEADER.unpack(reader.read_exact(FRAME_HEADER.size))
+    name = reader.read_exact(name_len).decode() if name_len else ''
+    meta = json.loads(reader.read_exact(meta_len)) if meta_len else {}
+    return Frame(opcode, flags, name, meta, payload_len)
+
+
+async def read_frame_async(reader):
+    if not reader.pending and not await reader.fill():
+        return None
+    opcode, flags, name_len, meta_len, payload_len = FRAME_HEADER.unpack(await reader.read_exact(FRAME_HEADER.size))
+    name = (await reader.read_exact(name_len)).decode() if name_len else ''
+    meta = json.loads(await reader.read_exact(meta_len)) if meta_len else {}
+    return Frame(opcode, flags, name, meta, payload_len)
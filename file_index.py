@@ -0,0 +1,143 @@
+import os
+import time
+import bisect
+import logging
+import threading
+
+from file_cache import file_stamp
+
+# Interval watcher memeriksa perubahan direktori yang tidak lewat server ini
+# (worker prefork lain atau file yang disalin manual)
+WATCH_INTERVAL = 2.0
+# Scan penuh berkala untuk menangkap file yang diubah di tempat tanpa rename
+FULL_SCAN_INTERVAL = 30.0
+LIST_LIMIT_MAX = 10000
+
+
+class FileIndex:
+    # Metadata file di direktori (nama, ukuran, mtime, digest) disimpan di memori dan diurutkan
+    # menurut nama, sehingga LIST tidak perlu membaca direktori setiap kali dipanggil.
+    # File tersembunyi (termasuk file sementara upload dan .uploads) tidak diindeks.
+    def __init__(self, directory='.', watch_interval=WATCH_INTERVAL):
+        self.directory = directory
+        self.watch_interval = watch_interval
+        self.entries = {}
+        self.names = []
+        # Digest hanya berlaku untuk versi file dengan stamp yang sama
+        self.stamps = {}
+        self.digests = {}
+        self.lock = threading.Lock()
+        self.dir_mtime = None
+        self.last_full_scan = 0
+        self.watcher_pid = None
+        self.rebuild()
+
+    def make_entry(self, name, file_stat):
+        entry = {'name': name, 'size': file_stat.st_size, 'mtime': file_stat.st_mtime}
+        known = self.digests.get(name)
+        if known is not None and known[0] == file_stamp(file_stat):
+            entry['digest'] = known[1]
+        return entry
+
+    def rebuild(self):
+        entries = {}
+        stamps = {}
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        with os.scandir(self.directory) as scanner:
+            for entry in scanner:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    file_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries[entry.name] = self.make_entry(entry.name, file_stat)
+                stamps[entry.name] = file_stamp(file_stat)
+        with self.lock:
+            self.entries = entries
+            self.stamps = stamps
+            self.digests = {name: known for name, known in self.digests.items() if name in entries}
+            self.names = sorted(entries)
+            self.dir_mtime = dir_mtime
+            self.last_full_scan = time.monotonic()
+
+    def update(self, name):
+        if os.path.dirname(name) or name.startswith('.'):
+            return
+        try:
+            file_stat = os.stat(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            self.remove(name)
+            return
+        with self.lock:
+            if name not in self.entries:
+                bisect.insort(self.names, name)
+            self.entries[name] = self.make_entry(name, file_stat)
+            self.stamps[name] = file_stamp(file_stat)
+
+    def remove(self, name):
+        with self.lock:
+            self.digests.pop(name, None)
+            self.stamps.pop(name, None)
+            if self.entries.pop(name, None) is not None:
+                del self.names[bisect.bisect_left(self.names, name)]
+
+    def known_digest(self, name):
+        # Digest terakhir yang diketahui untuk nama ini, tanpa memeriksa versi file
+        with self.lock:
+            known = self.digests.get(name)
+        return None if known is None else known[1]
+
+    def digest(self, name, stamp):
+        with self.lock:
+            known = self.digests.get(name)
+        return known[1] if known is not None and known[0] == stamp else None
+
+    def set_digest(self, name, stamp, digest):
+        with self.lock:
+            self.digests[name] = (stamp, digest)
+            if self.stamps.get(name) == stamp:
+                self.entries[name] = dict(self.entries[name], digest=digest)
+
+    def ensure_watcher(self):
+        # Thread tidak ikut ter-fork, jadi setiap proses worker menyalakan watcher-nya sendiri
+        if self.watch_interval and self.watcher_pid != os.getpid():
+            self.watcher_pid = os.getpid()
+            threading.Thread(target=self.watch, name='file-index-watcher', daemon=True).start()
+
+    def refresh(self):
+        # mtime direktori berubah setiap ada file dibuat, di-rename, atau dihapus
+        if os.stat(self.directory).st_mtime_ns != self.dir_mtime:
+            self.rebuild()
+
+    def watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                if time.monotonic() - self.last_full_scan > FULL_SCAN_INTERVAL:
+                    self.rebuild()
+                else:
+                    self.refresh()
+            except Exception as err:
+                logging.error(f"File index watcher failed: {err}")
+
+    def list(self, prefix='', cursor=None, limit=None):
+        self.ensure_watcher()
+        self.refresh()
+        with self.lock:
+            if cursor:
+                start = bisect.bisect_right(self.names, max(cursor, prefix))
+            else:
+                start = bisect.bisect_left(self.names, prefix)
+            stop = len(self.names) if limit is None else start + limit
+            selected = []
+            for name in self.names[start:stop]:
+                if not name.startswith(prefix):
+                    break
+                selected.append(self.entries[name])
+
+            next_cursor = None
+            if limit is not None and len(selected) == limit and start + limit < len(self.names) \
+                    and self.names[start + limit].startswith(prefix):
+                next_cursor = selected[-1]['name']
+        return selected, next_cursor
@@ -1,8 +1,304 @@
 import os
+import re
 import json
+import time
+import uuid
 import base64
-from glob import glob
+import shutil
+import hashlib
+import binascii
+import tempfile
 import logging
+from collections import namedtuple
+
+from file_framing import FileBody
+from file_blobs import BlobStore, CAS_ENABLED
+from file_codec import StreamDecoder, compress_chunks
+from file_cache import ContentCache, SingleFlight, file_stamp
+from file_mmap import mappings, mapped
+from file_index import FileIndex, LIST_LIMIT_MAX
+from file_metrics import metrics, summarize
+from file_profiling import profiler
+from file_tracing import span, traced_chunks
+
+UPLOAD_BUFFER_SIZE = 2**18
+DIGEST_READ_SIZE = 2**20
+# Sesi upload bertahap disimpan di files/.uploads/<id>
+UPLOAD_SESSION_DIR = '.uploads'
+UPLOAD_CHUNK_SIZE = 2**23
+UPLOAD_CHUNK_LIMIT = 2**28
+# Sesi yang tidak menerima chunk selama ini dihapus saat sesi baru dibuat
+UPLOAD_SESSION_TTL = 24 * 3600
+UPLOAD_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+# Isi yang sudah tersimpan di BlobStore dan ditautkan ke sebuah nama lewat LINK
+StoredContent = namedtuple('StoredContent', ['digest', 'stamp'])
+
+
+def sha256_fd(fd):
+    hasher = hashlib.sha256()
+    offset = 0
+    while True:
+        chunk = os.pread(fd, DIGEST_READ_SIZE, offset)
+        if not chunk:
+            return hasher.hexdigest()
+        hasher.update(chunk)
+        offset += len(chunk)
+
+
+def payload_chunks(payload):
+    # Body dibaca ke satu buffer yang dipakai ulang; setiap potongan harus selesai diproses
+    # sebelum potongan berikutnya diambil
+    buffer = bytearray(UPLOAD_BUFFER_SIZE)
+    view = memoryview(buffer)
+    while True:
+        with span('recv'):
+            count = payload.readinto(view)
+        if not count:
+            return
+        yield view[:count]
+
+
+def resolve_range(file_size, offset=None, length=None):
+    # GET tanpa offset/length berarti seluruh file; length yang melewati akhir file dipotong
+    offset = 0 if offset is None else int(offset)
+    if offset < 0 or offset > file_size:
+        raise ValueError(f"Invalid range: offset {offset} outside file of {file_size} bytes")
+    remaining = file_size - offset
+    length = remaining if length is None else int(length)
+    if length < 0:
+        raise ValueError(f"Invalid range: negative length {length}")
+    return offset, min(length, remaining)
+
+
+class FileUpload:
+    # Upload ditulis ke file sementara lalu di-rename agar pembaca tidak melihat file setengah jadi
+    def __init__(self, file_name, blobs=None):
+        self.file_name = file_name
+        self.blobs = blobs
+        fd, self.temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_name)}.", suffix='.tmp',
+                                              dir=os.path.dirname(file_name) or '.')
+        os.fchmod(fd, 0o644)
+        self.file = os.fdopen(fd, 'wb')
+        self.size = 0
+        # Digest dihitung sambil menulis sehingga file tidak perlu dibaca ulang
+        self.hasher = hashlib.sha256()
+        self.stamp = None
+
+    def write(self, data):
+        with span('disk'):
+            self.file.write(data)
+        with span('digest'):
+            self.hasher.update(data)
+        self.size += len(data)
+
+    def commit(self):
+        with span('disk'):
+            self.file.flush()
+            self.stamp = file_stamp(os.fstat(self.file.fileno()))
+            self.file.close()
+            if self.blobs is None:
+                os.replace(self.temp_path, self.file_name)
+            else:
+                self.blobs.store(self.temp_path, self.digest)
+                self.stamp = file_stamp(self.blobs.link(self.digest, self.file_name))
+        return self.size
+
+    @property
+    def digest(self):
+        return self.hasher.hexdigest()
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class UploadReceiver:
+    # Body ADD yang diterima per potongan: base64 di-decode bertahap (sisa yang belum kelipatan 4
+    # disimpan untuk potongan berikutnya), body terkompresi di-dekompresi, lalu ditulis ke FileUpload.
+    # Server thread menarik body lewat FileInterface.receive; server asyncio membaca socket di
+    # event loop dan hanya menjalankan write/finish di executor.
+    def __init__(self, interface, file_name, codec=None, base64_body=False):
+        self.interface = interface
+        self.file_name = file_name
+        self.decoder = None if codec is None else StreamDecoder(codec)
+        self.carry = b'' if base64_body else None
+        self.upload = FileUpload(file_name, interface.blobs)
+
+    def write(self, data):
+        if self.carry is not None:
+            data = self.carry + data
+            usable = len(data) - len(data) % 4
+            with span('encode'):
+                decoded = base64.b64decode(data[:usable])
+            self.carry = data[usable:]
+            data = decoded
+        if self.decoder is None:
+            self.upload.write(data)
+            return
+        for piece in self.decoder.feed(data):
+            self.upload.write(piece)
+
+    def finish(self):
+        if self.carry is not None and self.carry.strip():
+            raise binascii.Error("Incorrect padding")
+        if self.decoder is not None:
+            for piece in self.decoder.finish():
+                self.upload.write(piece)
+        self.upload.commit()
+        return self.interface.upload_result(self.file_name, self.upload)
+
+    def abort(self):
+        self.upload.abort()
+
+    def failure(self, exc):
+        if isinstance(exc, binascii.Error):
+            logging.error(f"Failed to decode base64: {exc}")
+            return {'status': 'ERROR', 'data': f"Base64 decoding error: {exc}"}
+        logging.error(f"Error during ADD operation: {exc}")
+        return {'status': 'ERROR', 'data': str(exc)}
+
+
+class UploadSession:
+    # Semua state sesi ada di disk sehingga chunk boleh datang dari koneksi atau worker mana pun.
+    # Chunk ditulis dengan pwrite ke posisinya; chunk yang sudah tersimpan ditandai dengan
+    # file kosong di chunks/<index>.
+    def __init__(self, upload_id):
+        if not isinstance(upload_id, str) or not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+            raise ValueError(f"Invalid upload id: {upload_id}")
+        self.upload_id = upload_id
+        self.path = os.path.join(UPLOAD_SESSION_DIR, upload_id)
+        self.data_path = os.path.join(self.path, 'data')
+        self.chunk_dir = os.path.join(self.path, 'chunks')
+        self.digest = None
+        self.stamp = None
+        try:
+            with open(os.path.join(self.path, 'session.json')) as session_file:
+                self.info = json.load(session_file)
+        except FileNotFoundError:
+            raise ValueError(f"Upload session {upload_id} not found")
+
+    @classmethod
+    def create(cls, file_name, size, chunk_size):
+        if size < 0:
+            raise ValueError(f"Invalid upload size: {size}")
+        if not 0 < chunk_size <= UPLOAD_CHUNK_LIMIT:
+            raise ValueError(f"Invalid chunk size: {chunk_size}")
+        cls.expire()
+
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(UPLOAD_SESSION_DIR, upload_id)
+        os.makedirs(os.path.join(path, 'chunks'))
+        with open(os.path.join(path, 'data'), 'wb') as data_file:
+            data_file.truncate(size)
+        with open(os.path.join(path, 'session.json'), 'w') as session_file:
+            json.dump({'name': file_name, 'size': size, 'chunk_size': chunk_size}, session_file)
+        return cls(upload_id)
+
+    @staticmethod
+    def expire():
+        if not os.path.isdir(UPLOAD_SESSION_DIR):
+            return
+        deadline = time.time() - UPLOAD_SESSION_TTL
+        for entry in os.scandir(UPLOAD_SESSION_DIR):
+            try:
+                if os.path.getmtime(os.path.join(entry.path, 'chunks')) < deadline:
+                    logging.info(f"Removing expired upload session {entry.name}")
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
+
+    @property
+    def chunk_count(self):
+        return -(-self.info['size'] // self.info['chunk_size'])
+
+    def chunk_range(self, index):
+        if not 0 <= index < self.chunk_count:
+            raise ValueError(f"Chunk index {index} out of range (0-{self.chunk_count - 1})")
+        offset = index * self.info['chunk_size']
+        return offset, min(self.info['chunk_size'], self.info['size'] - offset)
+
+    def received(self):
+        return sorted(int(name) for name in os.listdir(self.chunk_dir))
+
+    def describe(self):
+        return {'upload_id': self.upload_id, 'data_namafile': self.info['name'], 'data_size': self.info['size'],
+                'chunk_size': self.info['chunk_size'], 'chunk_count': self.chunk_count}
+
+    def mark_received(self, index):
+        open(os.path.join(self.chunk_dir, str(index)), 'w').close()
+
+    @staticmethod
+    def pwrite_all(fd, view, offset):
+        while view:
+            written = os.pwrite(fd, view, offset)
+            offset += written
+            view = view[written:]
+
+    def commit(self, blobs=None):
+        missing = self.chunk_count - len(self.received())
+        if missing:
+            raise ValueError(f"Upload {self.upload_id} incomplete: {missing} chunk(s) missing")
+        os.chmod(self.data_path, 0o644)
+        if blobs is None:
+            os.replace(self.data_path, self.info['name'])
+        else:
+            # Chunk ditulis tidak berurutan, jadi digest baru bisa dihitung setelah lengkap
+            fd = os.open(self.data_path, os.O_RDONLY)
+            try:
+                with span('digest'):
+                    self.digest = sha256_fd(fd)
+            finally:
+                os.close(fd)
+            blobs.store(self.data_path, self.digest)
+            self.stamp = file_stamp(blobs.link(self.digest, self.info['name']))
+        shutil.rmtree(self.path, ignore_errors=True)
+        return self.info['name']
+
+    def abort(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class ChunkReceiver:
+    # Body UPLOAD_CHUNK ditulis dengan pwrite ke posisinya di file data sesi; chunk baru ditandai
+    # tersimpan setelah seluruh panjangnya diterima
+    def __init__(self, session, index, payload_len=None):
+        self.session = session
+        self.index = index
+        self.offset, self.length = session.chunk_range(index)
+        # Panjang payload chunked baru diketahui di akhir body
+        if payload_len is not None and payload_len != self.length:
+            raise ValueError(f"Chunk {index} must be {self.length} bytes, got {payload_len}")
+        self.received = 0
+        self.fd = os.open(session.data_path, os.O_WRONLY)
+
+    def write(self, data):
+        if self.received + len(data) > self.length:
+            raise ValueError(f"Chunk {self.index} must be {self.length} bytes, got more")
+        with span('disk'):
+            UploadSession.pwrite_all(self.fd, memoryview(data), self.offset + self.received)
+        self.received += len(data)
+
+    def finish(self):
+        self.close()
+        if self.received != self.length:
+            raise ValueError(f"Chunk {self.index} must be {self.length} bytes, got {self.received}")
+        self.session.mark_received(self.index)
+        return {'status': 'OK', 'upload_id': self.session.upload_id, 'index': self.index}
+
+    def abort(self):
+        self.close()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def failure(self, exc):
+        logging.error(f"Error during UPLOAD_CHUNK operation: {exc}")
+        return {'status': 'ERROR', 'data': str(exc)}
 
 
 class FileInterface:
@@ -12,14 +308,28 @@ class FileInterface:
         if not os.path.isdir('files'):
             os.mkdir('files')
         os.chdir('files')
+        self.cache = ContentCache()
+        self.flights = SingleFlight()
+        self.index = FileIndex()
+        self.blobs = BlobStore() if CAS_ENABLED else None
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
     def list(self, params=None):
         if params is None:
             params = []
         try:
-            matched_files = glob('*.*')
-            return {'status': 'OK', 'data': matched_files}
+            # LIST [prefix] [cursor] [limit] [detail]; tanpa limit seluruh daftar dikirim
+            prefix, cursor, limit, detail = (list(params) + [None] * 4)[:4]
+            if limit is not None:
+                limit = int(limit)
+                if not 0 < limit <= LIST_LIMIT_MAX:
+                    return {'status': 'ERROR', 'data': f"Limit must be between 1 and {LIST_LIMIT_MAX}"}
+
+            entries, next_cursor = self.index.list(prefix or '', cursor, limit)
+            result = {'status': 'OK', 'data': entries if detail else [entry['name'] for entry in entries]}
+            if limit is not None:
+                result['next_cursor'] = next_cursor
+            return result
         except Exception as exc:
             logging.error(f"Failed to list files: {exc}")
             return {'status': 'ERROR', 'data': str(exc)}
@@ -33,27 +343,195 @@ class FileInterface:
                 return {'status': 'ERROR', 'data': 'No filename provided'}
 
             file_name = params[0]
-            logging.info(f"GET request received for file: {file_name}")
+            logging.debug("GET request received for file: %s", file_name)
 
             if not os.path.isfile(file_name):
                 logging.error(f"File '{file_name}' does not exist")
                 return {'status': 'ERROR', 'data': f"File {file_name} not found"}
 
-            file_size = os.path.getsize(file_name)
-            logging.info(f"File size: {file_size} bytes")
-
             with open(file_name, 'rb') as file_handle:
-                raw_content = file_handle.read()
+                file_stat = os.fstat(file_handle.fileno())
+                file_size = file_stat.st_size
+                logging.debug("File size: %s bytes", file_size)
+                offset, length = resolve_range(file_size, *params[1:3])
+
+                digest = None
+                if length == file_size:
+                    digest = self.response_digest(file_handle, file_name, params[3:4])
+                    if params[3:4] == [digest]:
+                        return self.not_modified(file_name, digest)
+
+                encoded_content = None
+                if length == file_size:
+                    encoded_content = self.cached_base64(file_handle, file_name)
+                if encoded_content is None:
+                    with mapped(file_handle, file_name) as view:
+                        if view is not None:
+                            # Range dibaca langsung dari mapping bersama tanpa salinan perantara
+                            with span('encode'), view[offset:offset + length] as content:
+                                encoded_content = base64.b64encode(content)
+                        else:
+                            file_handle.seek(offset)
+                            with span('disk'):
+                                content = file_handle.read(length)
+                            with span('encode'):
+                                encoded_content = base64.b64encode(content)
+                with span('encode'):
+                    encoded_content = encoded_content.decode()
+
+            logging.debug("Encoded content length: %s characters", len(encoded_content))
+
+            result = {'status': 'OK', 'data_namafile': file_name, 'data_file': encoded_content}
+            if any(value is not None for value in params[1:3]):
+                result.update({'data_offset': offset, 'data_size': length, 'file_size': file_size,
+                               'file_mtime': file_stat.st_mtime})
+            if digest is not None:
+                result['data_digest'] = digest
+            return result
+
+        except Exception as err:
+            logging.error(f"Unexpected error during GET: {err}")
+            return {'status': 'ERROR', 'data': str(err)}
+
+    def get_raw(self, params=None):
+        if params is None:
+            params = []
+        try:
+            if not params:
+                logging.error("GET operation missing filename parameter")
+                return {'status': 'ERROR', 'data': 'No filename provided'}
+
+            file_name = params[0]
+            logging.debug("Raw GET request received for file: %s", file_name)
+
+            if not os.path.isfile(file_name):
+                logging.error(f"File '{file_name}' does not exist")
+                return {'status': 'ERROR', 'data': f"File {file_name} not found"}
 
-            encoded_content = base64.b64encode(raw_content).decode()
-            logging.info(f"Encoded content length: {len(encoded_content)} characters")
+            # File tidak dibaca ke memori; isi dikirim lewat sendfile oleh server
+            file_handle = open(file_name, 'rb')
+            file_stat = os.fstat(file_handle.fileno())
+            file_size = file_stat.st_size
+            try:
+                offset, length = resolve_range(file_size, *params[1:3])
+                digest = self.response_digest(file_handle, file_name, params[3:4]) if length == file_size else None
+            except Exception:
+                file_handle.close()
+                raise
+            if digest is not None and params[3:4] == [digest]:
+                file_handle.close()
+                return self.not_modified(file_name, digest)
+            body = FileBody(file_handle, offset, length)
 
-            return {'status': 'OK', 'data_namafile': file_name, 'data_file': encoded_content}
+            result = {'status': 'OK', 'data_namafile': file_name, 'data_size': length,
+                      'data_offset': offset, 'file_size': file_size, 'file_mtime': file_stat.st_mtime,
+                      'data_file': body}
+            if digest is not None:
+                result['data_digest'] = digest
+            return result
 
         except Exception as err:
             logging.error(f"Unexpected error during GET: {err}")
             return {'status': 'ERROR', 'data': str(err)}
 
+    def not_modified(self, file_name, digest):
+        logging.debug("File %s not modified, body skipped", file_name)
+        return {'status': 'NOT_MODIFIED', 'data_namafile': file_name, 'data_digest': digest}
+
+    def response_digest(self, file_handle, file_name, if_none_match):
+        # Digest baru dihitung bila client membandingkannya (if_none_match); selain itu hanya
+        # digest yang sudah diketahui index (misalnya dari upload) yang ikut dikirim
+        if if_none_match and if_none_match[0]:
+            return self.file_digest(file_handle, file_name)
+        return self.index.digest(file_name, file_stamp(os.fstat(file_handle.fileno())))
+
+    def file_digest(self, file_handle, file_name):
+        # SHA-256 isi file; disimpan di index per versi file sehingga hanya dihitung sekali
+        stamp = file_stamp(os.fstat(file_handle.fileno()))
+        digest = self.index.digest(file_name, stamp)
+        if digest is not None:
+            return digest
+
+        def compute():
+            with span('digest'), mapped(file_handle, file_name) as view:
+                digest = sha256_fd(file_handle.fileno()) if view is None else hashlib.sha256(view).hexdigest()
+            self.index.set_digest(file_name, stamp, digest)
+            return digest
+
+        return self.flights.run((os.path.normpath(file_name), 'digest', stamp), compute)
+
+    def cached_form(self, file_handle, file_name, form, encoded_size, encode):
+        # Isi seluruh file dalam bentuk ter-encode diambil dari cache selama file belum berubah.
+        # GET bersamaan untuk versi file yang sama berbagi satu pembacaan dan encoding.
+        # None berarti file terlalu besar untuk cache dan harus di-encode bertahap oleh pemanggil.
+        file_stat = os.fstat(file_handle.fileno())
+        stamp = file_stamp(file_stat)
+        encoded_content = self.cache.get(file_name, form, stamp)
+        if encoded_content is not None:
+            return encoded_content
+        if not self.cache.accepts(encoded_size(file_stat.st_size)):
+            return None
+
+        def load():
+            # Flight sebelumnya mungkin baru saja selesai dan mengisi cache
+            encoded_content = self.cache.get(file_name, form, stamp, count=False)
+            if encoded_content is None:
+                with mapped(file_handle, file_name) as view:
+                    if view is not None:
+                        with span('encode'):
+                            encoded_content = encode(view)
+                    else:
+                        file_handle.seek(0)
+                        with span('disk'):
+                            content = file_handle.read()
+                        with span('encode'):
+                            encoded_content = encode(content)
+                self.cache.put(file_name, form, stamp, encoded_content)
+            return encoded_content
+
+        return self.flights.run((os.path.normpath(file_name), form, stamp), load)
+
+    def cached_base64(self, file_handle, file_name):
+        return self.cached_form(file_handle, file_name, 'base64', lambda size: -(-size // 3) * 4, base64.b64encode)
+
+    def cached_compressed(self, file_handle, file_name, codec):
+        return self.cached_form(file_handle, file_name, codec.name, lambda size: size,
+                                lambda content: b''.join(compress_chunks(codec, [content])))
+
+    def cache_stats(self, params=None):
+        return dict(status='OK', coalesced=self.flights.shared, **self.cache.stats())
+
+    def stats(self, params=None):
+        # Counter, gauge, dan latency per perintah/fase (p50/p95/p99) dari seluruh proses server
+        cache = dict(self.cache.stats(), coalesced=self.flights.shared)
+        return dict(status='OK', cache=cache, mmap=mappings.stats(), **summarize(metrics.collect()))
+
+    def profile(self, params=None):
+        # Mulai window profiling; laporan ditulis ke direktori profiling setelah window selesai
+        try:
+            return profiler.request(params[0] if params else None)
+        except ValueError:
+            return dict(status='ERROR', data='Profiling window must be a number of seconds')
+
+    def stat(self, params=None):
+        if params is None:
+            params = []
+        try:
+            if not params:
+                return {'status': 'ERROR', 'data': 'No filename provided'}
+
+            file_name = params[0]
+            if not os.path.isfile(file_name):
+                return {'status': 'ERROR', 'data': f"File {file_name} not found"}
+
+            file_stat = os.stat(file_name)
+            return {'status': 'OK', 'data_namafile': file_name, 'data_size': file_stat.st_size,
+                    'data_mtime': file_stat.st_mtime}
+
+        except Exception as err:
+            logging.error(f"Unexpected error during STAT: {err}")
+            return {'status': 'ERROR', 'data': str(err)}
+
     def add(self, params=None):
         if params is None:
             params = []
@@ -64,8 +542,8 @@ class FileInterface:
             new_file_name = params[0]
             b64_content = params[1]
 
-            logging.info(f"Uploading file: {new_file_name}")
-            logging.info(f"Encoded data size: {len(b64_content)}")
+            logging.debug("Uploading file: %s", new_file_name)
+            logging.debug("Encoded data size: %s", len(b64_content))
 
             try:
                 decoded_bytes = base64.b64decode(b64_content)
@@ -73,21 +551,228 @@ class FileInterface:
                 logging.error(f"Failed to decode base64: {decode_err}")
                 return {'status': 'ERROR', 'data': f"Base64 decoding error: {decode_err}"}
 
-            with open(new_file_name, 'wb') as out_file:
-                out_file.write(decoded_bytes)
+            return self.write_file(new_file_name, decoded_bytes)
 
-            if os.path.isfile(new_file_name):
-                size_written = os.path.getsize(new_file_name)
-                logging.info(f"File saved successfully, size: {size_written} bytes")
-                return {'status': 'OK', 'data': f"File {new_file_name} berhasil diupload ({size_written} bytes)"}
-            else:
-                logging.error(f"Failed to write file {new_file_name}")
-                return {'status': 'ERROR', 'data': f"File {new_file_name} gagal diupload"}
+        except Exception as exc:
+            logging.error(f"Error during ADD operation: {exc}")
+            return {'status': 'ERROR', 'data': str(exc)}
+
+    def add_raw(self, params=None):
+        if params is None:
+            params = []
+        if len(params) < 2:
+            return {'status': 'ERROR', 'data': 'Parameter tidak lengkap'}
+
+        new_file_name = params[0]
+        payload = params[1]
+        # Body terkompresi (encoding dari client) di-dekompresi dengan codec ini
+        codec = params[2] if len(params) > 2 else None
+        if isinstance(payload, (bytes, bytearray, memoryview)) and codec is None:
+            try:
+                return self.write_file(new_file_name, payload)
+            except Exception as exc:
+                logging.error(f"Error during ADD operation: {exc}")
+                return {'status': 'ERROR', 'data': str(exc)}
+
+        logging.debug("Streaming raw upload: %s", new_file_name)
+        receiver, error = self.upload_receiver([new_file_name, codec])
+        if receiver is None:
+            return error
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            return self.receive(receiver, [payload])
+        return self.receive(receiver, payload_chunks(payload))
 
+    def add_base64_stream(self, params=None):
+        if params is None:
+            params = []
+        if len(params) < 2:
+            return {'status': 'ERROR', 'data': 'Parameter tidak lengkap'}
+
+        new_file_name = params[0]
+        chunks = params[1]
+        logging.debug("Streaming base64 upload: %s", new_file_name)
+
+        receiver, error = self.upload_receiver([new_file_name, None, True])
+        if receiver is None:
+            # Sisa body tetap dibaca agar request berikutnya di koneksi yang sama tidak rusak
+            for _ in chunks:
+                pass
+            return error
+        return self.receive(receiver, traced_chunks(chunks, 'recv'))
+
+    def upload_receiver(self, params):
+        # [nama, codec, base64]; hasilnya (receiver, None) atau (None, result error)
+        try:
+            return UploadReceiver(self, *params[:3]), None
         except Exception as exc:
             logging.error(f"Error during ADD operation: {exc}")
+            return None, {'status': 'ERROR', 'data': str(exc)}
+
+    def chunk_receiver(self, params):
+        # [upload id, index, panjang payload atau None]; hasilnya sama dengan upload_receiver
+        if len(params) < 2 or params[1] is None:
+            return None, {'status': 'ERROR', 'data': 'Parameter tidak lengkap'}
+        try:
+            payload_len = params[2] if len(params) > 2 else None
+            return ChunkReceiver(UploadSession(params[0]), int(params[1]), payload_len), None
+        except Exception as exc:
+            logging.error(f"Error during UPLOAD_CHUNK operation: {exc}")
+            return None, {'status': 'ERROR', 'data': str(exc)}
+
+    def receive(self, receiver, chunks):
+        # Body ditarik dari chunks oleh thread ini. Setelah receiver gagal, sisa body tetap dibaca
+        # agar request berikutnya di koneksi yang sama tidak rusak.
+        failure = None
+        try:
+            for chunk in chunks:
+                if failure is None:
+                    try:
+                        receiver.write(chunk)
+                    except Exception as exc:
+                        failure = exc
+            if failure is None:
+                return receiver.finish()
+        except Exception as exc:
+            failure = exc
+        receiver.abort()
+        return receiver.failure(failure)
+
+    def upload_begin(self, params=None):
+        if params is None:
+            params = []
+        if len(params) < 2 or not params[0] or params[1] is None:
+            return {'status': 'ERROR', 'data': 'Parameter tidak lengkap'}
+
+        try:
+            chunk_size = UPLOAD_CHUNK_SIZE if len(params) < 3 or params[2] is None else int(params[2])
+            session = UploadSession.create(params[0], int(params[1]), chunk_size)
+            logging.debug("Upload session %s started for %s (%s bytes, %s chunks)",
+                          session.upload_id, params[0], session.info['size'], session.chunk_count)
+            return dict(status='OK', **session.describe())
+        except Exception as exc:
+            logging.error(f"Error during UPLOAD_BEGIN operation: {exc}")
             return {'status': 'ERROR', 'data': str(exc)}
 
+    def upload_chunk(self, params=None):
+        if params is None:
+            params = []
+        if len(params) < 3 or params[1] is None:
+            return {'status': 'ERROR', 'data': 'Parameter tidak lengkap'}
+
+        payload = params[2]
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            receiver, error = self.chunk_receiver([params[0], params[1], len(payload)])
+            chunks = [payload]
+        else:
+            receiver, error = self.chunk_receiver([params[0], params[1], payload.remaining])
+            chunks = payload_chunks(payload)
+        if receiver is None:
+            return error
+        return self.receive(receiver, chunks)
+
+    def upload_status(self, params=None):
+        if params is None:
+            params = []
+        if not params:
+            return {'status': 'ERROR', 'data': 'No upload id provided'}
+
+        try:
+            session = UploadSession(params[0])
+            return dict(status='OK', received=session.received(), **session.describe())
+        except Exception as exc:
+            logging.error(f"Error during UPLOAD_STATUS operation: {exc}")
+            return {'status': 'ERROR', 'data': str(exc)}
+
+    def upload_commit(self, params=None):
+        if params is None:
+            params = []
+        if not params:
+            return {'status': 'ERROR', 'data': 'No upload id provided'}
+
+        try:
+            session = UploadSession(params[0])
+            file_name = session.commit(self.blobs)
+            logging.debug("Upload session %s committed to %s", session.upload_id, file_name)
+            return self.upload_result(file_name, session)
+        except Exception as exc:
+            logging.error(f"Error during UPLOAD_COMMIT operation: {exc}")
+            return {'status': 'ERROR', 'data': str(exc)}
+
+    def upload_abort(self, params=None):
+        if params is None:
+            params = []
+        if not params:
+            return {'status': 'ERROR', 'data': 'No upload id provided'}
+
+        try:
+            session = UploadSession(params[0])
+            session.abort()
+            logging.debug("Upload session %s aborted", session.upload_id)
+            return {'status': 'OK', 'data': f"Upload {session.upload_id} dibatalkan"}
+        except Exception as exc:
+            logging.error(f"Error during UPLOAD_ABORT operation: {exc}")
+            return {'status': 'ERROR', 'data': str(exc)}
+
+    def write_file(self, new_file_name, content):
+        upload = FileUpload(new_file_name, self.blobs)
+        try:
+            upload.write(content)
+            upload.commit()
+        except Exception:
+            upload.abort()
+            raise
+        return self.upload_result(new_file_name, upload)
+
+    def has(self, params=None):
+        if params is None:
+            params = []
+        if not params:
+            return {'status': 'ERROR', 'data': 'No digest provided'}
+
+        try:
+            size = self.blobs.size(params[0]) if self.blobs is not None else None
+            return {'status': 'OK', 'data_digest': params[0], 'exists': size is not None, 'data_size': size}
+        except Exception as exc:
+            logging.error(f"Error during HAS operation: {exc}")
+            return {'status': 'ERROR', 'data': str(exc)}
+
+    def link(self, params=None):
+        # LINK <nama> <digest>: nama baru menunjuk ke blob yang sudah ada, tanpa mengirim isi file
+        if params is None:
+            params = []
+        if len(params) < 2 or not params[0] or not params[1]:
+            return {'status': 'ERROR', 'data': 'Parameter tidak lengkap'}
+        if self.blobs is None:
+            return {'status': 'ERROR', 'data': 'Content-addressed storage is disabled', 'exists': False}
+
+        try:
+            file_name, digest = params[0], params[1]
+            if self.blobs.size(digest) is None:
+                return {'status': 'ERROR', 'data': f"Blob {digest} not found", 'exists': False}
+            file_stat = self.blobs.link(digest, file_name)
+            logging.debug("Linked %s to blob %s", file_name, digest[:12])
+            return self.upload_result(file_name, StoredContent(digest, file_stamp(file_stat)))
+        except FileNotFoundError:
+            # Blob dihapus oleh DELETE lain di antara pengecekan dan pembuatan link
+            return {'status': 'ERROR', 'data': f"Blob {params[1]} not found", 'exists': False}
+        except Exception as exc:
+            logging.error(f"Error during LINK operation: {exc}")
+            return {'status': 'ERROR', 'data': str(exc)}
+
+    def upload_result(self, new_file_name, upload=None):
+        self.cache.invalidate(new_file_name)
+        mappings.invalidate(new_file_name)
+        if upload is not None and upload.digest is not None:
+            self.index.set_digest(new_file_name, upload.stamp, upload.digest)
+        self.index.update(new_file_name)
+        if os.path.isfile(new_file_name):
+            size_written = os.path.getsize(new_file_name)
+            logging.debug("File saved successfully, size: %s bytes", size_written)
+            return {'status': 'OK', 'data': f"File {new_file_name} berhasil diupload ({size_written} bytes)"}
+        else:
+            logging.error(f"Failed to write file {new_file_name}")
+            return {'status': 'ERROR', 'data': f"File {new_file_name} gagal diupload"}
+
     def delete(self, params=None):
         if params is None:
             params = []
@@ -100,8 +785,15 @@ class FileInterface:
             if not os.path.isfile(target_file):
                 return {'status': 'ERROR', 'data': f"File {target_file} not found"}
 
+            previous = os.stat(target_file)
+            previous_digest = self.index.known_digest(target_file)
             os.remove(target_file)
-            logging.info(f"Deleted file: {target_file}")
+            self.cache.invalidate(target_file)
+            mappings.invalidate(target_file)
+            self.index.remove(target_file)
+            if self.blobs is not None:
+                self.blobs.release(previous, previous_digest)
+            logging.debug("Deleted file: %s", target_file)
 
             if os.path.exists(target_file):
                 logging.error(f"Could not delete file: {target_file}")
@@ -0,0 +1,64 @@
+import os
+import queue
+import random
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# FILE_DEBUG=1 menampilkan log per langkah setiap request (level DEBUG)
+DEBUG_ENABLED = os.environ.get('FILE_DEBUG', '') == '1'
+# Fraksi request yang ditulis ke access log; request yang gagal selalu ditulis
+ACCESS_LOG_SAMPLE = float(os.environ.get('FILE_ACCESS_LOG_SAMPLE', 0.1))
+
+access_logger = logging.getLogger('file_server.access')
+
+
+class LogWriter:
+    # Thread handler hanya memasukkan record ke queue; penulisan ke stream dilakukan oleh satu
+    # thread QueueListener, jadi thread handler tidak berebut lock StreamHandler
+    def __init__(self):
+        self.handler = logging.StreamHandler()
+        self.handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.queue_handler = None
+        self.listener = None
+
+    def start(self):
+        # Dipanggil lagi di proses hasil fork, karena thread listener tidak ikut ter-fork
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        if self.queue_handler is not None:
+            root.removeHandler(self.queue_handler)
+        self.queue_handler = QueueHandler(log_queue)
+        root.addHandler(self.queue_handler)
+        self.listener = QueueListener(log_queue, self.handler)
+        self.listener.start()
+
+    def stop(self):
+        # Record yang masih di queue ditulis dulu sebelum proses keluar
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+
+log_writer = LogWriter()
+
+
+def setup_logging():
+    root = logging.getLogger()
+    if log_writer.queue_handler is not None:
+        return
+    root.setLevel(logging.DEBUG if DEBUG_ENABLED else logging.INFO)
+    log_writer.start()
+    os.register_at_fork(after_in_child=log_writer.start)
+    atexit.register(log_writer.stop)
+
+
+def access_log(command, client_addr, status, phases, bytes_in, bytes_out):
+    # Satu record per request berisi waktu setiap fase dan jumlah byte
+    if status not in ('ERROR', 'FAILED') and random.random() >= ACCESS_LOG_SAMPLE:
+        return
+    if not access_logger.isEnabledFor(logging.INFO):
+        return
+    access_logger.info("access client=%s command=%s status=%s recv_ms=%.3f execute_ms=%.3f send_ms=%.3f "
+                       "bytes_in=%d bytes_out=%d", client_addr, command, status,
+                       phases['recv'] * 1000, phases['execute'] * 1000, phases['send'] * 1000, bytes_in, bytes_out)
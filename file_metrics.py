@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Batas atas bucket histogram latency (detik), eksponensial dari 50us sampai sekitar 100 detik
+LATENCY_BUCKETS = [0.00005 * 2**i for i in range(22)]
+QUANTILES = (0.5, 0.95, 0.99)
+# Port endpoint Prometheus; tidak aktif bila kosong
+METRICS_PORT = int(os.environ.get('FILE_METRICS_PORT', 0))
+PUBLISH_INTERVAL = 1.0
+
+
+def metric_key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}="{value}"' for key, value in sorted(labels.items())) + '}'
+
+
+def metric_name(key):
+    return key.split('{', 1)[0]
+
+
+class Histogram:
+    def __init__(self, counts=None, total=0.0, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = list(counts) if counts else [0] * (len(bounds) + 1)
+        self.total = total
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def merge(self, other):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def quantile(self, q):
+        # Perkiraan dari batas atas bucket tempat peringkat ke-q jatuh
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.bounds[min(index, len(self.bounds) - 1)]
+        return 0.0
+
+    def to_dict(self):
+        return {'counts': self.counts, 'sum': self.total}
+
+
+class Metrics:
+    # Counter, gauge, dan histogram latency milik satu proses server
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.gauge_callbacks = {}
+        self.histograms = {}
+        self.spool = None
+
+    def inc(self, name, value=1, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_gauge(self, name, delta, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + delta
+
+    def register_gauge(self, name, callback):
+        self.gauge_callbacks[name] = callback
+
+    def reset(self):
+        # Proses hasil fork mulai dari nol; metrik proses induk tetap dilaporkan induk sendiri
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+        self.gauge_callbacks = {}
+
+    def observe(self, name, seconds, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record_request(self, command, phases, bytes_in, bytes_out):
+        self.inc('file_requests_total', command=command)
+        self.inc('file_bytes_received_total', bytes_in, command=command)
+        self.inc('file_bytes_sent_total', bytes_out, command=command)
+        for phase, seconds in phases.items():
+            self.observe('file_request_seconds', seconds, command=command, phase=phase)
+
+    def snapshot(self):
+        gauges = {}
+        for name, callback in self.gauge_callbacks.items():
+            try:
+                gauges[name] = callback()
+            except Exception as err:
+                logging.error(f"Gauge {name} failed: {err}")
+        with self.lock:
+            gauges.update(self.gauges)
+            return {'pid': os.getpid(), 'time': time.time(), 'counters': dict(self.counters), 'gauges': gauges,
+                    'histograms': {key: histogram.to_dict() for key, histogram in self.histograms.items()}}
+
+    def collect(self):
+        # Pada server prefork snapshot semua worker digabung; selain itu hanya proses ini
+        snapshot = self.snapshot()
+        if self.spool is None:
+            return snapshot
+        return merge_snapshots(self.spool.collect(snapshot))
+
+
+def merge_snapshots(snapshots):
+    merged = {'counters': {}, 'gauges': {}, 'histograms': {}, 'processes': len(snapshots)}
+    histograms = {}
+    for snapshot in snapshots:
+        for section in ('counters', 'gauges'):
+            for key, value in snapshot[section].items():
+                merged[section][key] = merged[section].get(key, 0) + value
+        for key, data in snapshot['histograms'].items():
+            histogram = Histogram(data['counts'], data['sum'])
+            if key in histograms:
+                histograms[key].merge(histogram)
+            else:
+                histograms[key] = histogram
+    merged['histograms'] = {key: histogram.to_dict() for key, histogram in histograms.items()}
+    return merged
+
+
+def summarize(snapshot):
+    latency = {}
+    for key, data in snapshot['histograms'].items():
+        histogram = Histogram(data['counts'], data['sum'])
+        summary = {'count': histogram.count, 'mean': histogram.total / histogram.count if histogram.count else 0.0}
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}"] = histogram.quantile(q)
+        latency[key] = summary
+    return {'counters': snapshot['counters'], 'gauges': snapshot['gauges'], 'latency': latency}
+
+
+def render_prometheus(snapshot):
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for key, value in sorted(snapshot['counters'].items()):
+        declare(metric_name(key), 'counter')
+        lines.append(f"{key} {value}")
+    for key, value in sorted(snapshot['gauges'].items()):
+        declare(metric_name(key), 'gauge')
+        lines.append(f"{key} {value}")
+    for key, data in sorted(snapshot['histograms'].items()):
+        name = metric_name(key)
+        labels = key[len(name) + 1:-1] if '{' in key else ''
+        prefix = labels + ',' if labels else ''
+        declare(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + [float('inf')], data['counts']):
+            cumulative += count
+            upper = '+Inf' if bound == float('inf') else f"{bound:g}"
+            lines.append(f'{name}_bucket{{{prefix}le="{upper}"}} {cumulative}')
+        suffix = '{' + labels + '}' if labels else ''
+        lines.append(f"{name}_sum{suffix} {data['sum']}")
+        lines.append(f"{name}_count{suffix} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsSpool:
+    # Worker prefork menulis snapshot metriknya ke direktori bersama setiap PUBLISH_INTERVAL,
+    # sehingga STATS di worker mana pun dan endpoint di proses induk melihat total semua worker
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.publisher_pid = None
+
+    def publish(self, snapshot):
+        path = os.path.join(self.directory, f"{snapshot['pid']}.json")
+        with open(f"{path}.tmp", 'w') as spool_file:
+            json.dump(snapshot, spool_file)
+        os.replace(f"{path}.tmp", path)
+
+    def start_publisher(self, metrics):
+        if self.publisher_pid == os.getpid():
+            return
+        self.publisher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(PUBLISH_INTERVAL)
+                try:
+                    self.publish(metrics.snapshot())
+                except Exception as err:
+                    logging.error(f"Failed to publish metrics: {err}")
+
+        threading.Thread(target=run, name='metrics-publisher', daemon=True).start()
+
+    def collect(self, own_snapshot=None):
+        snapshots = [] if own_snapshot is None else [own_snapshot]
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            pid = int(entry.name[:-5])
+            if own_snapshot is not None and pid == own_snapshot['pid']:
+                continue
+            try:
+                with open(entry.path) as spool_file:
+                    snapshot = json.load(spool_file)
+            except (OSError, ValueError):
+                continue
+            if not pid_alive(pid):
+                # Counter worker yang sudah mati tetap dihitung, gauge-nya tidak lagi berlaku
+                snapshot['gauges'] = {}
+            snapshots.append(snapshot)
+        return snapshots
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def start_metrics_server(port, collect):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus(collect()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logging.warning(f"Prometheus metrics available on port {port} at /metrics")
+    return server
+
+
+metrics = Metrics()
@@ -0,0 +1,128 @@
+import os
+import mmap
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from file_cache import file_stamp
+
+# Pembacaan isi file lewat mmap; FILE_MMAP=0 kembali ke read()/pread biasa
+MMAP_ENABLED = os.environ.get('FILE_MMAP', '1') != '0'
+# File kecil lebih murah dibaca langsung daripada dipetakan
+MMAP_MIN_SIZE = int(os.environ.get('FILE_MMAP_MIN_SIZE', 2**16))
+# Setiap mapping menahan satu file descriptor (mmap menduplikasi fd), jadi jumlah mapping
+# yang sedang tidak dipakai dibatasi
+MMAP_MAX_IDLE = int(os.environ.get('FILE_MMAP_MAX_IDLE', 256))
+
+
+class Mapping:
+    # Satu mapping read-only untuk satu versi file, dipakai bersama semua pembaca versi itu.
+    # Halaman file tetap berada di page cache kernel dan tidak disalin ke heap setiap proses.
+    def __init__(self, fd, stamp, size):
+        self.stamp = stamp
+        self.size = size
+        self.map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.refs = 0
+        # Versi file sudah diganti/dihapus; ditutup saat pembaca terakhir selesai
+        self.stale = False
+
+    def close(self):
+        self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            # Masih ada slice yang dipegang di luar registry; unmap terjadi saat slice itu dibebaskan
+            logging.debug("Mapping of %s bytes still exported, left to GC", self.size)
+
+
+class MmapRegistry:
+    # Mapping per path dengan reference count. File yang dipotong di tempat (di luar server)
+    # membuat akses ke halaman di luar ukuran baru berakhir SIGBUS yang mematikan proses, jadi
+    # mapping hanya dipakai untuk encode/hash di memori yang singkat, tidak pernah selama
+    # body dikirim ke client; body streaming dibaca dengan pread/sendfile.
+    def __init__(self, min_size=MMAP_MIN_SIZE, max_idle=MMAP_MAX_IDLE, enabled=MMAP_ENABLED):
+        self.min_size = min_size
+        self.max_idle = max_idle
+        self.enabled = enabled
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, file_handle, file_name):
+        # None berarti pemanggil harus membaca file dengan cara biasa
+        if not self.enabled:
+            return None
+        file_stat = os.fstat(file_handle.fileno())
+        if file_stat.st_size < max(self.min_size, 1):
+            return None
+        stamp = file_stamp(file_stat)
+        path = os.path.normpath(file_name)
+        with self.lock:
+            mapping = self.entries.get(path)
+            if mapping is not None and mapping.stamp == stamp:
+                self.entries.move_to_end(path)
+                self.reused += 1
+            else:
+                # Pembaca yang masih membuka versi lama juga mendapat mapping untuk versinya sendiri
+                try:
+                    created = Mapping(file_handle.fileno(), stamp, file_stat.st_size)
+                except (OSError, ValueError) as err:
+                    logging.debug("mmap of %s failed, falling back to read: %s", file_name, err)
+                    return None
+                if mapping is not None:
+                    self.retire(mapping)
+                mapping = self.entries[path] = created
+                self.created += 1
+                self.trim()
+            mapping.refs += 1
+            return mapping
+
+    def release(self, mapping):
+        with self.lock:
+            mapping.refs -= 1
+            if mapping.refs == 0 and mapping.stale:
+                mapping.close()
+
+    def invalidate(self, file_name):
+        path = os.path.normpath(file_name)
+        with self.lock:
+            mapping = self.entries.pop(path, None)
+            if mapping is not None:
+                self.retire(mapping)
+
+    def retire(self, mapping):
+        mapping.stale = True
+        if mapping.refs == 0:
+            mapping.close()
+
+    def trim(self):
+        idle = [path for path, mapping in self.entries.items() if mapping.refs == 0]
+        for path in idle[:max(0, len(idle) - self.max_idle)]:
+            self.retire(self.entries.pop(path))
+
+    def stats(self):
+        with self.lock:
+            return {'mapped_files': len(self.entries), 'mapped_bytes': sum(m.size for m in self.entries.values()),
+                    'readers': sum(m.refs for m in self.entries.values()),
+                    'created': self.created, 'reused': self.reused}
+
+
+mappings = MmapRegistry()
+
+
+@contextmanager
+def mapped(file_handle, file_name):
+    # memoryview seluruh isi file selama blok berjalan, atau None bila mmap tidak dipakai.
+    # Slice dari view tidak boleh dipakai lagi setelah blok selesai, dan blok tidak boleh
+    # menunggu jaringan (lihat MmapRegistry).
+    mapping = mappings.acquire(file_handle, file_name)
+    if mapping is None:
+        yield None
+        return
+    try:
+        yield mapping.view
+    finally:
+        mappings.release(mapping)
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import signal
+import logging
+import tempfile
+import threading
+from collections import Counter
+
+# Lama window profiling (detik) bila tidak ditentukan oleh perintah PROFILE
+PROFILE_SECONDS = float(os.environ.get('FILE_PROFILE_SECONDS', 10))
+PROFILE_MAX_SECONDS = 300
+# Interval pengambilan sampel stack semua thread
+SAMPLE_INTERVAL = 0.005
+# Hasil profiling ditulis di luar folder files/ agar tidak ikut terdaftar sebagai file server
+PROFILE_DIR = os.path.abspath(os.environ.get('FILE_PROFILE_DIR') or
+                              os.path.join(tempfile.gettempdir(), 'file-server-profiles'))
+REPORT_TOP = 25
+# Hanya stack yang melewati jalur penanganan request yang dicatat; thread lain (listener,
+# watcher, publisher metrik) diabaikan
+REQUEST_PATH = {'serve_connection', 'handle_connection', 'string_execute', 'stream_execute', 'frame_execute'}
+# Thread koneksi keep-alive yang sedang menunggu request berikutnya tidak sedang melayani request
+IDLE_PATH = {'wait_for_request', 'release_idle'}
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    labels = []
+    on_request_path = False
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name in IDLE_PATH:
+            return None
+        on_request_path = on_request_path or code.co_name in REQUEST_PATH
+        labels.append(frame_label(code))
+        frame = frame.f_back
+    if not on_request_path:
+        return None
+    return ';'.join(reversed(labels))
+
+
+def render_report(stacks, samples, seconds):
+    own = Counter()
+    inclusive = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for label in set(frames):
+            inclusive[label] += count
+    total = sum(stacks.values()) or 1
+
+    lines = [f"Wall-clock samples: {sum(stacks.values())} request-thread stacks in {samples} rounds "
+             f"over {seconds:g}s (every {SAMPLE_INTERVAL * 1000:g}ms), pid {os.getpid()}", '',
+             'Self (top of stack):']
+    for label, count in own.most_common(REPORT_TOP):
+        lines.append(f"  {count:8d} {count * 100 / total:6.2f}%  {label}")
+    lines += ['', 'Inclusive:']
+    for label, count in inclusive.most_common(REPORT_TOP):
+        lines.append(f"  {count:8d} {count * 100 / total:6.2f}%  {label}")
+    return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    # Sampler statistik: selama window aktif, satu thread mengambil stack semua thread lewat
+    # sys._current_frames. Berbeda dengan cProfile yang hanya mengukur thread tempat ia diaktifkan,
+    # cara ini mencakup thread pool server dan executor asyncio tanpa restart.
+    # Hasilnya: file .collapsed (format flamegraph.pl / speedscope) dan ringkasan .txt.
+    def __init__(self, directory=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.running = False
+        # Diisi server prefork: worker meneruskan permintaan ke proses induk, yang mengirim
+        # SIGUSR1 ke semua worker; lama window dibagikan lewat shared value
+        self.coordinator_pid = None
+        self.shared_seconds = None
+
+    def share(self, context):
+        self.coordinator_pid = os.getpid()
+        self.shared_seconds = context.Value('d', PROFILE_SECONDS, lock=False)
+
+    def request(self, seconds=None):
+        seconds = PROFILE_SECONDS if seconds is None else float(seconds)
+        if not 0 < seconds <= PROFILE_MAX_SECONDS:
+            return dict(status='ERROR', data=f'Profiling window must be between 0 and {PROFILE_MAX_SECONDS} seconds')
+        if self.coordinator_pid is not None and self.coordinator_pid != os.getpid():
+            self.shared_seconds.value = seconds
+            os.kill(self.coordinator_pid, signal.SIGUSR1)
+            return dict(status='OK', data=f'Profiling all workers for {seconds:g}s', seconds=seconds,
+                        directory=self.directory)
+        if not self.start(seconds):
+            return dict(status='ERROR', data='Profiling already running')
+        return dict(status='OK', data=f'Profiling for {seconds:g}s', seconds=seconds, directory=self.directory)
+
+    def start(self, seconds):
+        with self.lock:
+            if self.running:
+                return False
+            self.running = True
+        threading.Thread(target=self.run, args=(seconds,), name='profile-sampler', daemon=True).start()
+        return True
+
+    def run(self, seconds):
+        own_id = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        logging.warning(f"Profiling started for {seconds:g}s")
+        try:
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = collapse(frame)
+                    if stack is not None:
+                        stacks[stack] += 1
+                samples += 1
+                time.sleep(self.interval)
+            self.dump(stacks, samples, seconds)
+        except Exception as err:
+            logging.error(f"Profiling failed: {err}")
+        finally:
+            with self.lock:
+                self.running = False
+
+    def dump(self, stacks, samples, seconds):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        with open(f"{base}.collapsed", 'w') as collapsed:
+            for stack, count in stacks.most_common():
+                collapsed.write(f"{stack} {count}\n")
+        with open(f"{base}.txt", 'w') as report:
+            report.write(render_report(stacks, samples, seconds))
+        logging.warning(f"Profile written to {base}.collapsed and {base}.txt")
+
+    def handle_signal(self, signum, frame):
+        seconds = PROFILE_SECONDS if self.shared_seconds is None else self.shared_seconds.value
+        self.start(seconds)
+
+    def install_signal_handler(self):
+        signal.signal(signal.SIGUSR1, self.handle_signal)
+
+
+profiler = Profiler()
@@ -1,8 +1,15 @@
-import logging
-import shlex
+import os
 import json
+import base64
+import logging
 
 from file_interface import FileInterface
+from file_framing import OPCODES, FLAG_RAW, PAYLOAD_CHUNKED, TEXT_TERMINATOR, FileBody, StreamBody, iter_file_body
+from file_tracing import activate, span, traced_chunks
+from file_codec import COMPRESS_SAMPLE_SIZE, compress_chunks, get_codec, negotiate, worth_compressing
+
+# Kelipatan 3 agar setiap potongan base64 tidak membutuhkan padding
+BASE64_READ_CHUNK = 3 * 2**18
 
 
 class FileProtocol:
@@ -11,39 +18,217 @@ class FileProtocol:
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
     def string_execute(self, input_command=''):
-        logging.info(f"Incoming command: {input_command[:100]}..." if len(input_command) > 100 else input_command)
+        json_response = json.dumps(self.command_execute(input_command))
+        logging.debug("Response size: %s bytes", len(json_response))
+        return json_response
+
+    def command_execute(self, input_command=''):
+        logging.debug("Incoming command: %.100s", input_command)
 
         try:
             tokens = input_command.split(' ', 2)
             command_name = tokens[0].strip().lower()
 
-            logging.info(f"Handling command: {command_name}")
+            logging.debug("Handling command: %s", command_name)
 
             if command_name == "list":
+                arguments = self.list_arguments(input_command.split()[1:])
+            elif command_name in ["cache_stats", "stats"]:
                 arguments = []
-            elif command_name in ["get", "delete"]:
+            elif command_name == "get":
+                try:
+                    arguments = self.get_arguments(tokens)
+                except ValueError as error:
+                    return dict(status='ERROR', data=str(error))
+            elif command_name in ["delete", "stat", "has"]:
                 arguments = [tokens[1]] if len(tokens) > 1 else []
+            elif command_name == "link":
+                arguments = tokens[1:3]
+            elif command_name == "profile":
+                arguments = tokens[1:2]
             elif command_name == "add":
                 if len(tokens) < 3:
-                    return json.dumps(dict(status='FAILED', data='ADD command needs filename and file content'))
+                    return dict(status='FAILED', data='ADD command needs filename and file content')
 
                 file_name = tokens[1]
                 file_data = tokens[2]
                 arguments = [file_name, file_data]
             else:
-                return json.dumps(dict(status='FAILED', data='Unrecognized command'))
+                return dict(status='FAILED', data='Unrecognized command')
 
-            result_data = getattr(self.file_handler, command_name)(arguments)
+            return getattr(self.file_handler, command_name)(arguments)
+
+        except Exception as error:
+            logging.error(f"Command processing failed: {str(error)}")
+            return dict(status='FAILED', data=f'Exception: {str(error)}')
 
-            json_response = json.dumps(result_data)
-            logging.info(f"Response size: {len(json_response)} bytes")
+    def list_arguments(self, options):
+        # LIST prefix=<awalan> cursor=<nama terakhir> limit=<jumlah> detail=1
+        values = dict(option.split('=', 1) for option in options if '=' in option)
+        return [values.get('prefix'), values.get('cursor'), values.get('limit'), values.get('detail') == '1']
 
-            return json_response
+    def get_arguments(self, tokens):
+        # GET <nama> [offset] [length] [if-none-match=<digest>]
+        if len(tokens) < 2:
+            return []
+        extra = tokens[2].split() if len(tokens) > 2 else []
+        options = dict(value.split('=', 1) for value in extra if '=' in value)
+        positional = [value for value in extra if '=' not in value][:2]
+        if not all(value.isascii() and value.isdigit() for value in positional):
+            raise ValueError("offset/length must be non-negative integers")
+        positional = [int(value) for value in positional]
+        return [tokens[1]] + positional + [None] * (2 - len(positional)) + [options.get('if-none-match')]
 
+    def stream_execute(self, input_command=''):
+        # Hasil: (status, potongan respons); status dicatat di access log
+        tokens = input_command.split(' ', 2)
+        if tokens[0].strip().lower() == "get" and len(tokens) > 1:
+            try:
+                arguments = self.get_arguments(tokens)
+            except ValueError as error:
+                return 'ERROR', [json.dumps(dict(status='ERROR', data=str(error))).encode() + TEXT_TERMINATOR]
+            result_data = self.file_handler.get_raw(arguments)
+            if result_data['status'] == 'OK':
+                return 'OK', self.stream_base64_response(result_data)
+            return result_data['status'], [json.dumps(result_data).encode() + TEXT_TERMINATOR]
+
+        result_data = self.command_execute(input_command)
+        return result_data.get('status'), [json.dumps(result_data).encode() + TEXT_TERMINATOR]
+
+    def stream_base64_response(self, result_data):
+        body = result_data.pop('data_file')
+        header = json.dumps(result_data)
+        yield (header[:-1] + ', "data_file": "').encode()
+
+        with body.file:
+            if body.offset == 0 and body.length == result_data['file_size']:
+                encoded_content = self.file_handler.cached_base64(body.file, result_data['data_namafile'])
+                if encoded_content is not None:
+                    yield encoded_content
+                    yield b'"}' + TEXT_TERMINATOR
+                    return
+
+            # Dibaca dengan pread per potongan, tidak lewat mmap: pengiriman bisa lama dan file
+            # bisa dipotong di tempat selama itu
+            for chunk in iter_file_body(body, BASE64_READ_CHUNK):
+                yield base64.b64encode(chunk)
+
+        yield b'"}' + TEXT_TERMINATOR
+
+    def stream_add_execute(self, file_name, chunks):
+        logging.debug("Handling streamed command: add %s", file_name)
+        try:
+            result_data = self.file_handler.add_base64_stream([file_name, chunks])
+            return json.dumps(result_data)
         except Exception as error:
             logging.error(f"Command processing failed: {str(error)}")
             return json.dumps(dict(status='FAILED', data=f'Exception: {str(error)}'))
 
+    def open_text_receiver(self, file_name):
+        logging.debug("Handling streamed command: add %s", file_name)
+        return self.file_handler.upload_receiver([file_name, None, True])
+
+    def open_receiver(self, frame):
+        # Untuk server yang membaca body sendiri (asyncio): penerima body ADD/UPLOAD_CHUNK.
+        # (None, None) berarti perintah tidak memakai body, (None, result) berarti gagal sebelum body dibaca
+        command_name = OPCODES.get(frame.opcode)
+        if command_name not in ("add", "upload_chunk"):
+            return None, None
+        raw_mode = bool(frame.flags & FLAG_RAW)
+        logging.debug("Handling streamed binary command: %s %s (raw=%s)", command_name, frame.name, raw_mode)
+
+        try:
+            if command_name == "upload_chunk":
+                payload_len = None if frame.payload_len == PAYLOAD_CHUNKED else frame.payload_len
+                return self.file_handler.chunk_receiver([frame.name, frame.meta.get('index'), payload_len])
+            if not frame.name:
+                return None, dict(status='FAILED', data='ADD command needs filename and file content')
+            codec = get_codec(frame.meta['encoding']) if raw_mode and frame.meta.get('encoding') else None
+            return self.file_handler.upload_receiver([frame.name, codec, not raw_mode])
+
+        except Exception as error:
+            logging.error(f"Binary command processing failed: {str(error)}")
+            return None, dict(status='FAILED', data=f'Exception: {str(error)}')
+
+    def frame_execute(self, frame, payload, trace=None):
+        # trace (file_tracing.Trace) diisi rincian waktu per fase bila client memintanya
+        with activate(trace):
+            result_data, body = self.execute_frame(frame, payload)
+        if trace is not None and isinstance(body, StreamBody):
+            body = StreamBody(traced_chunks(body.chunks, 'encode', trace))
+        return result_data, body
+
+    def execute_frame(self, frame, payload):
+        command_name = OPCODES.get(frame.opcode)
+        raw_mode = bool(frame.flags & FLAG_RAW)
+        logging.debug("Handling binary command: %s (%s bytes payload, raw=%s)", command_name, frame.payload_len, raw_mode)
+
+        try:
+            with span('parse'):
+                if command_name == "list":
+                    arguments = [frame.meta.get(key) for key in ('prefix', 'cursor', 'limit', 'detail')]
+                elif command_name in ["cache_stats", "stats"]:
+                    arguments = []
+                elif command_name == "get":
+                    arguments = [frame.name, frame.meta.get('offset'), frame.meta.get('length'),
+                                 frame.meta.get('if_none_match')] if frame.name else []
+                elif command_name in ["delete", "stat", "has", "upload_status", "upload_commit", "upload_abort"]:
+                    arguments = [frame.name] if frame.name else []
+                elif command_name == "link":
+                    arguments = [frame.name, frame.meta.get('digest')]
+                elif command_name == "profile":
+                    arguments = [frame.meta.get('seconds')] if frame.meta.get('seconds') else []
+                elif command_name == "upload_begin":
+                    arguments = [frame.name, frame.meta.get('size'), frame.meta.get('chunk_size')]
+                elif command_name == "upload_chunk":
+                    arguments = [frame.name, frame.meta.get('index'), payload]
+                elif command_name == "add":
+                    if not frame.name:
+                        return dict(status='FAILED', data='ADD command needs filename and file content'), b''
+                    if raw_mode:
+                        codec = get_codec(frame.meta['encoding']) if frame.meta.get('encoding') else None
+                        command_name, arguments = "add_raw", [frame.name, payload, codec]
+                    else:
+                        command_name, arguments = "add_base64_stream", [frame.name, payload.iter_chunks()]
+                else:
+                    return dict(status='FAILED', data='Unrecognized command'), b''
+
+                if raw_mode and command_name == "get":
+                    command_name = "get_raw"
+
+            result_data = getattr(self.file_handler, command_name)(arguments)
+            body = result_data.pop('data_file', b'') if raw_mode else b''
+            if frame.meta.get('accept_encoding') and isinstance(body, FileBody):
+                body = self.encode_body(result_data, body, frame.meta['accept_encoding'])
+            return result_data, body
+
+        except Exception as error:
+            logging.error(f"Binary command processing failed: {str(error)}")
+            return dict(status='FAILED', data=f'Exception: {str(error)}'), b''
+
+    def encode_body(self, result_data, body, accepted):
+        # Kompresi dipakai bila client menerimanya dan sampel awal file benar-benar menyusut
+        codec = negotiate(accepted)
+        if codec is None or not body.length:
+            return body
+        sample = os.pread(body.file.fileno(), min(COMPRESS_SAMPLE_SIZE, body.length), body.offset)
+        with span('encode'):
+            compressible = worth_compressing(codec, sample)
+        if not compressible:
+            return body
+
+        result_data['encoding'] = codec.name
+        if body.offset == 0 and body.length == result_data['file_size']:
+            try:
+                compressed = self.file_handler.cached_compressed(body.file, result_data['data_namafile'], codec)
+            except Exception:
+                body.file.close()
+                raise
+            if compressed is not None:
+                body.file.close()
+                return compressed
+        return StreamBody(compress_chunks(codec, iter_file_body(body)))
+
 
 if __name__ == '__main__':
     # usage example
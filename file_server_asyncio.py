@@ -0,0 +1,401 @@
+import asyncio
+import json
+import socket
+import logging
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from file_protocol import FileProtocol
+from file_framing import (BINARY_MAGIC, TEXT_TERMINATOR, CHUNK_HEADER, OPCODES, PAYLOAD_CHUNKED, SENDFILE_SEGMENT,
+                          SEND_SLICE, AsyncSocketReader, FileBody, StreamBody, TransferLimit, encode_chunk,
+                          read_frame_async)
+from file_connection import (INLINE_BODY_LIMIT, NEED_MORE, HEADER_TIMEOUT, IDLE_TIMEOUT, match_add_prefix,
+                             response_header, text_command, consumed_bytes, finish_request, header_limit, body_limit,
+                             send_limit, log_slow_client, start_trace, trace_trailer)
+from file_logging import setup_logging
+from file_admission import (encode_busy, sniffed_binary, MAX_CONNECTIONS, MAX_QUEUE, QUEUE_TIMEOUT, REJECT_READ_TIMEOUT,
+                            REJECT_DRAIN_BYTES)
+from file_metrics import metrics, start_metrics_server, METRICS_PORT
+from file_profiling import profiler
+from file_tracing import traced_call
+
+# Body upload dikumpulkan di event loop sampai sebesar ini sebelum ditulis lewat executor
+UPLOAD_BATCH = 2**18
+
+setup_logging()
+file_proto = FileProtocol()
+
+
+async def detect_binary(reader):
+    while len(reader.pending) < len(BINARY_MAGIC):
+        if TEXT_TERMINATOR in reader.pending or not await reader.fill():
+            return False
+    if reader.pending.startswith(BINARY_MAGIC):
+        del reader.pending[:len(BINARY_MAGIC)]
+        return True
+    return False
+
+
+async def wait_for_request(reader, client_addr, served):
+    # Sama dengan file_connection.wait_for_request
+    reader.limit = TransferLimit(IDLE_TIMEOUT if served else HEADER_TIMEOUT, phase='idle')
+    try:
+        if not reader.pending and not await reader.fill():
+            return False
+    except asyncio.TimeoutError:
+        logging.debug("Closing idle connection %s", client_addr)
+        return False
+    reader.limit = header_limit()
+    return True
+
+
+async def send(writer, data, limit):
+    # Sama dengan file_framing.send_limited: timeout dan laju diperiksa per potongan
+    view = memoryview(data)
+    for start in range(0, len(view), SEND_SLICE):
+        piece = view[start:start + SEND_SLICE]
+        writer.write(piece)
+        await asyncio.wait_for(writer.drain(), limit.timeout())
+        limit.add(len(piece))
+
+
+async def receive_body(loop, receiver, chunks, trace=None):
+    # Socket dibaca di event loop; executor hanya menjalankan decode/tulis disk/hash per potongan,
+    # jadi upload yang lambat tidak menahan thread executor selama transfernya.
+    # Sama dengan FileInterface.receive: setelah receiver gagal, sisa body tetap dibaca.
+    failure = None
+    batch = bytearray()
+
+    async def write(data):
+        nonlocal failure
+        try:
+            await loop.run_in_executor(None, traced_call, trace, receiver.write, data)
+        except Exception as exc:
+            failure = exc
+
+    try:
+        waited = time.perf_counter()
+        async for chunk in chunks:
+            if failure is not None:
+                continue
+            batch += chunk
+            if len(batch) >= UPLOAD_BATCH:
+                if trace is not None:
+                    trace.add_span('recv', time.perf_counter() - waited)
+                data, batch = batch, bytearray()
+                await write(data)
+                waited = time.perf_counter()
+        if trace is not None:
+            trace.add_span('recv', time.perf_counter() - waited)
+        if failure is None and batch:
+            await write(batch)
+    except BaseException:
+        receiver.abort()
+        raise
+
+    if failure is None:
+        try:
+            return await loop.run_in_executor(None, traced_call, trace, receiver.finish)
+        except Exception as exc:
+            failure = exc
+    receiver.abort()
+    return receiver.failure(failure)
+
+
+async def send_file(writer, body, limit):
+    loop = asyncio.get_running_loop()
+    sent = 0
+    with body.file:
+        while sent < body.length:
+            timeout = limit.timeout()
+            segment = min(SENDFILE_SEGMENT, body.length - sent)
+            count = await asyncio.wait_for(loop.sendfile(writer.transport, body.file, body.offset + sent, segment),
+                                           timeout)
+            if not count:
+                break
+            sent += count
+            limit.add(count)
+    return sent
+
+
+async def serve_text(reader, writer, client_addr):
+    loop = reader.loop
+    served = 0
+    while True:
+        if not await wait_for_request(reader, client_addr, served):
+            break
+        served += 1
+        recv_start = time.perf_counter()
+        consumed_start = consumed_bytes(reader)
+        match = match_add_prefix(reader.pending)
+        while match is NEED_MORE:
+            if not await reader.fill():
+                return
+            match = match_add_prefix(reader.pending)
+
+        if match is not None:
+            add_file_name, consumed = match
+            del reader.pending[:consumed]
+            logging.debug("Streaming ADD %s from %s", add_file_name, client_addr)
+            reader.limit = body_limit()
+            exec_start = time.perf_counter()
+            receiver, result_data = await loop.run_in_executor(None, file_proto.open_text_receiver, add_file_name)
+            if receiver is None:
+                async for _ in reader.iter_until(TEXT_TERMINATOR):
+                    pass
+            else:
+                result_data = await receive_body(loop, receiver, reader.iter_until(TEXT_TERMINATOR))
+            result = json.dumps(result_data)
+            send_start = time.perf_counter()
+            response = result.encode() + TEXT_TERMINATOR
+            await send(writer, response, send_limit())
+            finish_request('add', client_addr, json.loads(result).get('status'),
+                           {'recv': exec_start - recv_start, 'execute': send_start - exec_start,
+                            'send': time.perf_counter() - send_start},
+                           consumed_bytes(reader) - consumed_start, len(response))
+            continue
+
+        request_bytes = await reader.read_until(TEXT_TERMINATOR)
+        if request_bytes is None:
+            break
+
+        logging.debug("Received complete data from %s (size: %s bytes)", client_addr, len(request_bytes))
+
+        exec_start = time.perf_counter()
+        status, response_chunks = await loop.run_in_executor(None, file_proto.stream_execute,
+                                                             request_bytes.decode().strip())
+        send_start = time.perf_counter()
+        sent = 0
+        limit = send_limit()
+        if isinstance(response_chunks, list):
+            response = b''.join(response_chunks)
+            await send(writer, response, limit)
+            sent = len(response)
+        else:
+            # Potongan base64 GET dibaca dan di-encode di executor, satu per satu
+            while True:
+                chunk = await loop.run_in_executor(None, next, response_chunks, None)
+                if chunk is None:
+                    break
+                await send(writer, chunk, limit)
+                sent += len(chunk)
+        exec_end = time.perf_counter()
+
+        finish_request(text_command(request_bytes), client_addr, status,
+                       {'recv': exec_start - recv_start, 'execute': send_start - exec_start, 'send': exec_end - send_start},
+                       consumed_bytes(reader) - consumed_start, sent)
+
+
+async def serve_binary(reader, writer, client_addr):
+    loop = reader.loop
+    served = 0
+    while True:
+        if not await wait_for_request(reader, client_addr, served):
+            break
+        served += 1
+        recv_start = time.perf_counter()
+        consumed_start = consumed_bytes(reader)
+        frame = await read_frame_async(reader)
+        if frame is None:
+            break
+
+        reader.limit = body_limit()
+        command = OPCODES.get(frame.opcode, 'unknown')
+
+        exec_start = time.perf_counter()
+        trace = start_trace(frame, exec_start - recv_start)
+        receiver, result = await loop.run_in_executor(None, traced_call, trace, file_proto.open_receiver, frame)
+        body = b''
+        if receiver is not None:
+            result = await receive_body(loop, receiver, reader.iter_payload(frame.payload_len), trace)
+        else:
+            if result is None:
+                result, body = await loop.run_in_executor(None, file_proto.frame_execute, frame, None, trace)
+            # Body yang tidak dipakai perintah tetap dibaca agar frame berikutnya tidak rusak
+            if frame.payload_len == PAYLOAD_CHUNKED:
+                async for _ in reader.iter_payload(frame.payload_len):
+                    pass
+            else:
+                await reader.skip(frame.payload_len)
+        exec_end = time.perf_counter()
+
+        reader.limit = None
+        if trace is not None:
+            trace.add_outer('execute', exec_end - exec_start)
+            result['traced'] = True
+        serialize_start = time.perf_counter()
+        header = response_header(result, body)
+        send_start = time.perf_counter()
+        sent = len(header)
+        limit = send_limit()
+        if isinstance(body, FileBody):
+            await send(writer, header, limit)
+            sent += await send_file(writer, body, limit)
+        elif isinstance(body, StreamBody):
+            # Potongan body (misalnya hasil kompresi) dibuat di executor, satu per satu
+            await send(writer, header, limit)
+            while True:
+                chunk = await loop.run_in_executor(None, next, body.chunks, None)
+                if chunk is None:
+                    break
+                await send(writer, encode_chunk(chunk), limit)
+                sent += CHUNK_HEADER.size + len(chunk)
+            await send(writer, CHUNK_HEADER.pack(0), limit)
+            sent += CHUNK_HEADER.size
+        elif len(body) <= INLINE_BODY_LIMIT:
+            await send(writer, header + bytes(body), limit)
+            sent += len(body)
+        else:
+            writer.write(header)
+            await send(writer, body, limit)
+            sent += len(body)
+        send_end = time.perf_counter()
+        if trace is not None:
+            trace.add('serialize', send_start - serialize_start)
+            trace.add_outer('send', send_end - send_start)
+            trailer = trace_trailer(command, trace)
+            await send(writer, trailer, limit)
+            sent += len(trailer)
+        finish_request(command, client_addr, result.get('status'),
+                       {'recv': exec_start - recv_start, 'execute': exec_end - exec_start,
+                        'send': send_end - exec_end},
+                       consumed_bytes(reader) - consumed_start, sent)
+
+
+async def handle_connection(stream_reader, writer):
+    loop = asyncio.get_running_loop()
+    client_addr = writer.get_extra_info('peername')
+    reader = AsyncSocketReader(stream_reader, loop)
+    metrics.add_gauge('file_active_connections', 1)
+    try:
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        logging.debug("Client %s connected and ready to process.", client_addr)
+        reader.limit = header_limit()
+        if await detect_binary(reader):
+            logging.debug("Client %s negotiated binary framing", client_addr)
+            await serve_binary(reader, writer, client_addr)
+        else:
+            await serve_text(reader, writer, client_addr)
+    except (TimeoutError, asyncio.TimeoutError) as err:
+        log_slow_client(client_addr, err)
+    except Exception as err:
+        logging.error(f"An error occurred while handling {client_addr}: {err}")
+    finally:
+        logging.debug("Connection with %s is now closed.", client_addr)
+        metrics.add_gauge('file_active_connections', -1)
+        writer.close()
+
+
+async def reject_connection(stream_reader, writer):
+    # Versi async dari file_admission.reject_connection
+    metrics.inc('file_rejected_total')
+    reader = AsyncSocketReader(stream_reader, asyncio.get_running_loop())
+    try:
+        try:
+            binary = await asyncio.wait_for(detect_binary(reader), REJECT_READ_TIMEOUT)
+        except asyncio.TimeoutError:
+            binary = sniffed_binary(reader.pending)
+        writer.write(encode_busy(binary))
+        await writer.drain()
+        writer.write_eof()
+
+        async def drain():
+            drained = 0
+            while drained < REJECT_DRAIN_BYTES:
+                data = await stream_reader.read(2**16)
+                if not data:
+                    return
+                drained += len(data)
+
+        await asyncio.wait_for(drain(), REJECT_READ_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        pass
+    finally:
+        writer.close()
+
+
+class AsyncServer:
+    def __init__(self, ipaddress='0.0.0.0', port=13337, max_workers=10, max_connections=MAX_CONNECTIONS,
+                 max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT):
+        self.addr_info = (ipaddress, port)
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2**20)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 2**20)
+        # Thread executor hanya dipakai untuk I/O disk; jumlah koneksi tidak dibatasi olehnya
+        self.worker_count = max_workers
+        # Koneksi di atas max_connections antri maksimal max_queue koneksi dan queue_timeout detik
+        self.max_connections = max_connections
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+
+    async def admit(self, stream_reader, writer):
+        if self.slots.locked() and self.waiting >= self.max_queue:
+            await reject_connection(stream_reader, writer)
+            return
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Client {writer.get_extra_info('peername')} waited longer than "
+                            f"{self.queue_timeout}s, rejecting")
+            await reject_connection(stream_reader, writer)
+            return
+        finally:
+            self.waiting -= 1
+        try:
+            await handle_connection(stream_reader, writer)
+        finally:
+            self.slots.release()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self.slots = asyncio.Semaphore(self.max_connections)
+        metrics.register_gauge('file_admission_waiting', lambda: self.waiting)
+        executor = ThreadPoolExecutor(max_workers=self.worker_count)
+        loop.set_default_executor(executor)
+        # Tugas disk yang menunggu thread executor kosong
+        metrics.register_gauge('file_pool_queue_depth', executor._work_queue.qsize)
+        if METRICS_PORT:
+            start_metrics_server(METRICS_PORT, metrics.collect)
+
+        logging.warning(f"Server is active on {self.addr_info}")
+        self.listener.bind(self.addr_info)
+        server = await asyncio.start_server(self.admit, sock=self.listener, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        # SIGUSR1 menyalakan profiling selama satu window, sama seperti perintah PROFILE
+        profiler.install_signal_handler()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logging.warning("Terminating server... KeyboardInterrupt detected.")
+
+
+def worker_count_arg(value):
+    try:
+        num_workers = int(value)
+        if num_workers <= 0:
+            raise ValueError("Worker count must be greater than zero.")
+    except ValueError as err_msg:
+        print(f"Invalid input: {err_msg}. Defaulting to 10 workers.")
+        num_workers = 10
+    return num_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio file server")
+    parser.add_argument('workers', nargs='?', type=worker_count_arg, default=10)
+    parser.add_argument('--port', type=int, default=13337)
+    args = parser.parse_args()
+
+    service = AsyncServer(ipaddress='0.0.0.0', port=args.port, max_workers=args.workers)
+    service.run()
+
+
+if __name__ == "__main__":
+    main()
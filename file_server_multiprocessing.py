@@ -1,107 +1,247 @@
 from socket import *
+import os
 import socket
-import threading
 import logging
-import time
+import argparse
+import select
+import signal
+import struct
 import sys
+import time
+import threading
+import shutil
+import tempfile
 import multiprocessing
-from multiprocessing import Process, Queue, Pool
-import io
+from multiprocessing.connection import wait
 
 from file_protocol import FileProtocol
+from file_cache import CACHE_BYTES
+from file_connection import serve_connection
+from file_logging import setup_logging, log_writer
+from file_admission import Rejecter, QUEUE_TIMEOUT
+from file_metrics import MetricsSpool, metrics, start_metrics_server, METRICS_PORT
+from file_profiling import profiler
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+setup_logging()
 
 protocol_handler = FileProtocol()
 
-def handle_client_connection(client_pair):
+# Interval thread proses induk memeriksa apakah semua worker sibuk
+SHED_POLL_INTERVAL = 0.1
+# Listener bersama bersifat non-blocking; worker menunggu koneksi dengan timeout ini lalu mengulang
+ACCEPT_TIMEOUT = 1.0
+
+def handle_client_connection(client_pair, should_yield=None):
     conn, client_addr = client_pair
-    data_buffer = b''
+    serve_connection(conn, client_addr, protocol_handler, should_yield)
+
+def listen_queue_depth(server_socket):
+    # Linux: pada socket listen, tcpi_unacked di TCP_INFO adalah jumlah koneksi di accept queue.
+    # Di platform lain hanya diketahui ada (1) atau tidak ada (0) koneksi yang menunggu.
+    if hasattr(socket, 'TCP_INFO'):
+        info = server_socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, 104)
+        return struct.unpack_from('I', info, 24)[0]
+    return int(bool(select.select([server_socket], [], [], 0)[0]))
+
+def create_listener(server_address, backlog, reuse_port=False):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2**20)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 2**20)
+    server_socket.bind(server_address)
+    server_socket.listen(backlog)
+    return server_socket
+
+def worker_loop(server_socket, server_address, backlog, reuse_port, busy, index):
+    # Dengan SO_REUSEPORT setiap worker punya socket sendiri dan kernel yang membagi koneksi;
+    # tanpa itu semua worker accept() dari socket warisan proses induk
+    if reuse_port:
+        server_socket = create_listener(server_address, backlog, reuse_port=True)
+    # Dengan timeout, accept() menunggu lewat poll dan mencoba lagi sendiri bila koneksi lebih dulu
+    # diambil proses lain (listener warisan non-blocking, lihat PreforkServer.shed_overload)
+    server_socket.settimeout(ACCEPT_TIMEOUT)
+    logging.info(f"Worker {multiprocessing.current_process().name} accepting connections")
+    metrics.reset()
+    metrics.spool.start_publisher(metrics)
+    profiler.install_signal_handler()
+
+    # Ada koneksi di backlog listener berarti client lain sedang menunggu worker
+    def has_waiting_clients():
+        readable, _, _ = select.select([server_socket], [], [], 0)
+        return bool(readable)
 
     try:
-        logging.info(f"Handling client at {client_addr}")
         while True:
-            received_chunk = conn.recv(2**20)
-            if not received_chunk:
-                break
-
-            data_buffer += received_chunk
-
-            if b"\r\n\r\n" in data_buffer:
-                request_text = data_buffer.decode()
-                logging.info(f"Full request from {client_addr} received ({len(data_buffer)} bytes)")
-
-                start = time.time()
-                result = protocol_handler.string_execute(request_text.strip())
-                end = time.time()
-
-                logging.info(f"Processed in {end - start:.2f} seconds")
-
-                final_response = result + "\r\n\r\n"
-                response_bytes = final_response.encode()
-                total_length = len(response_bytes)
-                logging.info(f"Sending {total_length} bytes back")
-
-                chunk_size = 2**16
-                for i in range(0, total_length, chunk_size):
-                    conn.sendall(response_bytes[i:i+chunk_size])
-
-                logging.info(f"Response sent to {client_addr}")
-                data_buffer = b''
-
-    except Exception as ex:
-        logging.error(f"Error with client {client_addr}: {ex}")
+            try:
+                conn, client_addr = server_socket.accept()
+            except (socket.timeout, BlockingIOError):
+                continue
+            busy[index] = 1
+            try:
+                handle_client_connection((conn, client_addr), should_yield=has_waiting_clients)
+            finally:
+                busy[index] = 0
+    except (KeyboardInterrupt, SystemExit):
+        pass
     finally:
-        logging.info(f"Closing connection with {client_addr}")
-        conn.close()
+        server_socket.close()
+        # Proses worker keluar lewat os._exit sehingga atexit tidak dijalankan
+        log_writer.stop()
 
-class ThreadedServer:
-    def __init__(self, host='0.0.0.0', port=6666, workers=10):
+class PreforkServer:
+    def __init__(self, host='0.0.0.0', port=6666, workers=10, reuse_port=False, backlog=128,
+                 queue_timeout=QUEUE_TIMEOUT):
         self.server_address = (host, port)
         self.worker_count = workers
-
-    def dispatch_request(self, conn, client_addr):
-        handle_client_connection((conn, client_addr))
+        self.reuse_port = reuse_port
+        # Antrian koneksi adalah backlog listener (dibatasi backlog); bila semua worker sibuk
+        # selama queue_timeout, proses induk menjawab koneksi yang antri dengan BUSY
+        self.backlog = backlog
+        self.queue_timeout = queue_timeout
+        self.context = multiprocessing.get_context('fork')
+        # Satu slot per worker (1 = sedang melayani koneksi); slot worker yang mati di-reset saat diganti
+        self.busy = self.context.Array('b', workers, lock=False)
+        self.rejecter = Rejecter()
+        self.overloaded_since = None
+        # Setiap worker punya cache sendiri, jadi FILE_CACHE_BYTES dibagi sebelum fork
+        protocol_handler.file_handler.cache.resize(CACHE_BYTES // workers)
+
+    def spawn_worker(self, server_socket, index):
+        proc = self.context.Process(target=worker_loop, name=f"worker-{index}",
+                                    args=(server_socket, self.server_address, self.backlog, self.reuse_port,
+                                          self.busy, index))
+        proc.daemon = True
+        proc.start()
+        return proc
+
+    def shed_overload(self, server_socket):
+        # Dijalankan di thread proses induk. Worker bisa mengambil koneksi di antara select dan
+        # accept, jadi accept di sini non-blocking (flag ini ikut berlaku untuk socket warisan
+        # di worker, karena itu worker memakai accept dengan timeout).
+        server_socket.setblocking(False)
+        while True:
+            time.sleep(SHED_POLL_INTERVAL)
+            readable, _, _ = select.select([server_socket], [], [], 0)
+            if sum(self.busy) < self.worker_count or not readable:
+                self.overloaded_since = None
+                continue
+            now = time.monotonic()
+            if self.overloaded_since is None:
+                self.overloaded_since = now
+                continue
+            if now - self.overloaded_since < self.queue_timeout:
+                continue
+
+            shed = 0
+            while sum(self.busy) >= self.worker_count:
+                try:
+                    conn, client_addr = server_socket.accept()
+                except BlockingIOError:
+                    break
+                if sum(self.busy) < self.worker_count:
+                    # Worker sempat kosong setelah accept; koneksi tidak bisa dikembalikan ke
+                    # backlog, jadi dilayani thread proses induk daripada ditolak
+                    threading.Thread(target=handle_client_connection, args=((conn, client_addr),),
+                                     daemon=True).start()
+                    break
+                self.rejecter.reject(conn, client_addr)
+                shed += 1
+            self.overloaded_since = time.monotonic()
+            logging.warning(f"All workers busy for {self.queue_timeout}s, rejected {shed} queued connection(s)")
 
     def start(self):
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2**20)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 2**20)
+        logging.warning(f"Server listening on {self.server_address} with {self.worker_count} prefork workers")
+        # Pada mode SO_REUSEPORT proses induk tidak boleh ikut listen, karena koneksi yang
+        # dibagikan kernel ke socket induk tidak akan pernah di-accept
+        server_socket = None
+        if not self.reuse_port:
+            server_socket = create_listener(self.server_address, self.backlog)
+
+        # SIGTERM diperlakukan seperti Ctrl-C agar worker ikut dihentikan
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        # Setiap worker punya metrik sendiri; snapshot-nya dikumpulkan lewat direktori bersama
+        metrics.spool = MetricsSpool(tempfile.mkdtemp(prefix='file-server-metrics-'))
+
+        workers = {}
 
-        logging.warning(f"Server listening on {self.server_address}")
-        server_socket.bind(self.server_address)
-        server_socket.listen(10)
+        # PROFILE di worker mana pun atau SIGUSR1 ke proses induk diteruskan ke semua worker
+        def forward_profile(signum, frame):
+            for index, proc in list(workers.values()):
+                try:
+                    os.kill(proc.pid, signal.SIGUSR1)
+                except ProcessLookupError:
+                    pass
 
-        pool = multiprocessing.Pool(processes=self.worker_count)
+        profiler.share(self.context)
+        signal.signal(signal.SIGUSR1, forward_profile)
 
         try:
+            for index in range(self.worker_count):
+                proc = self.spawn_worker(server_socket, index)
+                workers[proc.sentinel] = (index, proc)
+            # Pada mode SO_REUSEPORT proses induk tidak punya listener, jadi tidak ada shedding
+            if server_socket is not None:
+                threading.Thread(target=self.shed_overload, args=(server_socket,), name='overload-shedder',
+                                 daemon=True).start()
+            # Gauge pool (worker sibuk, antrian listener) dan penolakan oleh thread shedding dicatat
+            # proses induk, lalu digabung dengan snapshot worker lewat spool
+            metrics.register_gauge('file_busy_workers', lambda: sum(self.busy))
+            if server_socket is not None:
+                metrics.register_gauge('file_pool_queue_depth', lambda: listen_queue_depth(server_socket))
+            metrics.spool.start_publisher(metrics)
+            if METRICS_PORT:
+                start_metrics_server(METRICS_PORT, metrics.collect)
+
+            # Worker yang mati diganti supaya jumlah worker tetap
             while True:
-                conn, client_addr = server_socket.accept()
-                proc = Process(target=self.dispatch_request, args=(conn, client_addr))
-                proc.daemon = True
-                proc.start()
-                conn.close()
-        except KeyboardInterrupt:
+                for sentinel in wait(list(workers)):
+                    index, proc = workers.pop(sentinel)
+                    proc.join()
+                    logging.warning(f"Worker {proc.name} exited with code {proc.exitcode}, restarting")
+                    self.busy[index] = 0
+                    replacement = self.spawn_worker(server_socket, index)
+                    workers[replacement.sentinel] = (index, replacement)
+        except (KeyboardInterrupt, SystemExit):
             logging.warning("Server shutting down.")
         finally:
-            pool.close()
-            pool.join()
-            server_socket.close()
-
-def run_server():
-    if len(sys.argv) > 1:
-        try:
-            workers = int(sys.argv[1])
-            if workers <= 0:
-                raise ValueError("Worker count must be positive.")
-        except ValueError as ve:
-            print(f"Invalid input: {ve}. Using default of 10.")
-            workers = 10
-    else:
+            for index, proc in workers.values():
+                proc.terminate()
+            for index, proc in workers.values():
+                proc.join()
+            if server_socket is not None:
+                server_socket.close()
+            shutil.rmtree(metrics.spool.directory, ignore_errors=True)
+
+# Nama lama dipertahankan untuk kode yang sudah mengimpornya
+ThreadedServer = PreforkServer
+
+def worker_count_arg(value):
+    try:
+        workers = int(value)
+        if workers <= 0:
+            raise ValueError("Worker count must be positive.")
+    except ValueError as ve:
+        print(f"Invalid input: {ve}. Using default of 10.")
         workers = 10
+    return workers
 
-    app_server = ThreadedServer(host='0.0.0.0', port=13337, workers=workers)
+def run_server():
+    parser = argparse.ArgumentParser(description="Prefork multiprocessing file server")
+    parser.add_argument('workers', nargs='?', type=worker_count_arg, default=10)
+    parser.add_argument('--port', type=int, default=13337)
+    parser.add_argument('--reuseport', action='store_true',
+                        help="each worker binds its own SO_REUSEPORT socket")
+    parser.add_argument('--backlog', type=int, default=128,
+                        help="maximum connections queued for a free worker")
+    parser.add_argument('--queue-timeout', type=float, default=QUEUE_TIMEOUT,
+                        help="seconds all workers may stay busy before queued connections get BUSY")
+    args = parser.parse_args()
+
+    app_server = PreforkServer(host='0.0.0.0', port=args.port, workers=args.workers, reuse_port=args.reuseport,
+                               backlog=args.backlog, queue_timeout=args.queue_timeout)
     app_server.start()
 
 if __name__ == "__main__":
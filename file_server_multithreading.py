@@ -3,95 +3,132 @@ import socket
 import threading
 import logging
 import time
-import sys
+import argparse
+import itertools
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
-import io
 
 from file_protocol import FileProtocol
+from file_connection import serve_connection
+from file_logging import setup_logging
+from file_admission import Rejecter, MAX_QUEUE, QUEUE_TIMEOUT
+from file_metrics import metrics, start_metrics_server, METRICS_PORT
+from file_profiling import profiler
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+setup_logging()
 file_proto = FileProtocol()
 
 
-def client_process(sock_conn, client_addr):
-    data_buffer = b''
-    try:
-        logging.info(f"Client {client_addr} connected and ready to process.")
-        while True:
-            packet = sock_conn.recv(2**20)
-            if not packet:
-                break
-
-            data_buffer += packet
-
-            if b"\r\n\r\n" in data_buffer:
-                client_request = data_buffer.decode()
-                logging.info(f"Received complete data from {client_addr} (size: {len(data_buffer)} bytes)")
-
-                exec_start = time.time()
-                result = file_proto.string_execute(client_request.strip())
-                exec_end = time.time()
-
-                logging.info(f"Execution time: {exec_end - exec_start:.2f} seconds")
-                response_msg = result + "\r\n\r\n"
-
-                byte_response = response_msg.encode()
-                total_size = len(byte_response)
+# Interval pemeriksaan koneksi yang terlalu lama menunggu worker
+EXPIRE_INTERVAL = 0.25
 
-                logging.info(f"Sending back {total_size} bytes to {client_addr}")
-                chunk_limit = 2**20
-                for i in range(0, total_size, chunk_limit):
-                    sock_conn.sendall(byte_response[i:i+chunk_limit])
 
-                logging.info(f"All data sent successfully to {client_addr}")
-                data_buffer = b''
-
-    except Exception as err:
-        logging.error(f"An error occurred while handling {client_addr}: {err}")
-    finally:
-        logging.info(f"Connection with {client_addr} is now closed.")
-        sock_conn.close()
+def client_process(sock_conn, client_addr, should_yield=None):
+    serve_connection(sock_conn, client_addr, file_proto, should_yield)
 
 
 class Server:
-    def __init__(self, ipaddress='0.0.0.0', port=13337, max_workers=10):
+    def __init__(self, ipaddress='0.0.0.0', port=13337, max_workers=10, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT):
         self.addr_info = (ipaddress, port)
         self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2**20)
         self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 2**20)
         self.worker_count = max_workers
+        # Koneksi yang dilayani bersamaan dibatasi jumlah worker; sisanya antri maksimal max_queue
+        # koneksi dan maksimal queue_timeout detik sebelum dijawab BUSY
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rejecter = Rejecter()
+        # Koneksi yang sudah di-accept tetapi belum mendapat thread worker, urut waktu accept
+        self.queued = OrderedDict()
+        self.queue_ids = itertools.count()
+        self.waiting_lock = threading.Lock()
+
+    @property
+    def waiting(self):
+        return len(self.queued)
+
+    def has_waiting_clients(self):
+        return bool(self.queued)
+
+    def process(self, queue_id):
+        with self.waiting_lock:
+            entry = self.queued.pop(queue_id, None)
+        # Sudah ditolak oleh expire_queued
+        if entry is None:
+            return
+        conn_obj, addr_obj, accepted_at = entry
+        client_process(conn_obj, addr_obj, should_yield=self.has_waiting_clients)
+
+    def expire_queued(self):
+        deadline = time.monotonic() - self.queue_timeout
+        expired = []
+        with self.waiting_lock:
+            while self.queued:
+                queue_id, (conn_obj, addr_obj, accepted_at) = next(iter(self.queued.items()))
+                if accepted_at > deadline:
+                    break
+                del self.queued[queue_id]
+                expired.append((conn_obj, addr_obj))
+        for conn_obj, addr_obj in expired:
+            logging.warning(f"Client {addr_obj} waited longer than {self.queue_timeout}s, rejecting")
+            self.rejecter.reject(conn_obj, addr_obj)
 
     def run(self):
         logging.warning(f"Server is active on {self.addr_info}")
         self.listener.bind(self.addr_info)
-        self.listener.listen(10)
+        # Antrian dikelola server (max_queue); backlog kernel cukup besar agar lonjakan koneksi
+        # sampai ke loop accept dan dijawab BUSY, bukan tertahan di SYN retry
+        self.listener.listen(128)
+        # accept() diberi timeout agar antrian tetap diperiksa walaupun tidak ada koneksi baru
+        self.listener.settimeout(EXPIRE_INTERVAL)
+        metrics.register_gauge('file_pool_queue_depth', lambda: self.waiting)
+        if METRICS_PORT:
+            start_metrics_server(METRICS_PORT, metrics.collect)
+        # SIGUSR1 menyalakan profiling selama satu window, sama seperti perintah PROFILE
+        profiler.install_signal_handler()
         with ThreadPoolExecutor(max_workers=self.worker_count) as pool:
             try:
                 while True:
-                    conn_obj, addr_obj = self.listener.accept()
-                    logging.warning(f"New client connection from {addr_obj}")
-                    conn_obj.settimeout(300)
-                    pool.submit(client_process, conn_obj, addr_obj)
+                    self.expire_queued()
+                    try:
+                        conn_obj, addr_obj = self.listener.accept()
+                    except socket.timeout:
+                        continue
+                    logging.debug("New client connection from %s", addr_obj)
+                    if self.waiting >= self.max_queue:
+                        self.rejecter.reject(conn_obj, addr_obj)
+                        continue
+                    queue_id = next(self.queue_ids)
+                    with self.waiting_lock:
+                        self.queued[queue_id] = (conn_obj, addr_obj, time.monotonic())
+                    pool.submit(self.process, queue_id)
             except KeyboardInterrupt:
                 logging.warning("Terminating server... KeyboardInterrupt detected.")
             finally:
                 self.listener.close()
 
 
-def main():
-    if len(sys.argv) > 1:
-        try:
-            num_workers = int(sys.argv[1])
-            if num_workers <= 0:
-                raise ValueError("Worker count must be greater than zero.")
-        except ValueError as err_msg:
-            print(f"Invalid input: {err_msg}. Defaulting to 10 workers.")
-            num_workers = 10
-    else:
+def worker_count_arg(value):
+    try:
+        num_workers = int(value)
+        if num_workers <= 0:
+            raise ValueError("Worker count must be greater than zero.")
+    except ValueError as err_msg:
+        print(f"Invalid input: {err_msg}. Defaulting to 10 workers.")
         num_workers = 10
+    return num_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thread pool file server")
+    parser.add_argument('workers', nargs='?', type=worker_count_arg, default=10)
+    parser.add_argument('--port', type=int, default=13337)
+    args = parser.parse_args()
 
-    service = Server(ipaddress='0.0.0.0', port=13337, max_workers=num_workers)
+    service = Server(ipaddress='0.0.0.0', port=args.port, max_workers=args.workers)
     service.run()
 
 
@@ -0,0 +1,124 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Fase yang dilaporkan trace request (detik). execute adalah waktu di FileProtocol/FileInterface
+# di luar fase lain yang tercatat; pada GET raw isi file dibaca kernel saat sendfile, jadi masuk send.
+TRACE_PHASES = ('recv', 'parse', 'disk', 'digest', 'encode', 'execute', 'serialize', 'send')
+
+active = threading.local()
+
+
+class Trace:
+    # Rincian waktu satu request, diisi server selama request diproses
+    def __init__(self):
+        self.phases = dict.fromkeys(TRACE_PHASES, 0.0)
+        # Waktu span yang terjadi di dalam fase pembungkus (execute/send) dan belum dikurangkan darinya
+        self.inner = 0.0
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def add_span(self, phase, seconds):
+        self.phases[phase] += seconds
+        self.inner += seconds
+
+    def add_outer(self, phase, seconds):
+        self.phases[phase] += max(0.0, seconds - self.inner)
+        self.inner = 0.0
+
+
+@contextmanager
+def activate(trace):
+    # Span di thread ini dicatat ke trace; None menonaktifkan pencatatan
+    previous = getattr(active, 'trace', None)
+    active.trace = trace
+    try:
+        yield trace
+    finally:
+        active.trace = previous
+
+
+@contextmanager
+def span(phase):
+    trace = getattr(active, 'trace', None)
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(phase, time.perf_counter() - start)
+
+
+def traced_call(trace, func, *args):
+    # func dijalankan dengan trace aktif di thread pemanggil (misalnya thread executor asyncio)
+    with activate(trace):
+        return func(*args)
+
+
+def traced_chunks(chunks, phase, trace=None):
+    # Waktu mengambil setiap potongan dari iterator dicatat sebagai phase. Trace bisa diberikan
+    # eksplisit untuk iterator yang di-next() di thread lain (executor asyncio)
+    if trace is None:
+        trace = getattr(active, 'trace', None)
+    if trace is None:
+        return chunks
+    chunks = iter(chunks)
+
+    def timed():
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            trace.add_span(phase, time.perf_counter() - start)
+            if chunk is None:
+                return
+            yield chunk
+
+    return timed()
+
+
+class TraceSummary:
+    # Akumulasi trace di sisi client: jumlah request dan total detik per fase, per perintah
+    def __init__(self, data=None):
+        self.lock = threading.Lock()
+        self.data = data or {}
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, data):
+        self.__init__(data)
+
+    def record(self, command, phases):
+        with self.lock:
+            entry = self.data.setdefault(command, {'count': 0, 'phases': dict.fromkeys(TRACE_PHASES, 0.0)})
+            entry['count'] += 1
+            for phase, seconds in phases.items():
+                entry['phases'][phase] = entry['phases'].get(phase, 0.0) + seconds
+
+    def merge(self, other):
+        for command, entry in other.to_dict().items():
+            with self.lock:
+                mine = self.data.setdefault(command, {'count': 0, 'phases': dict.fromkeys(TRACE_PHASES, 0.0)})
+                mine['count'] += entry['count']
+                for phase, seconds in entry['phases'].items():
+                    mine['phases'][phase] = mine['phases'].get(phase, 0.0) + seconds
+
+    def to_dict(self):
+        with self.lock:
+            return {command: {'count': entry['count'], 'phases': dict(entry['phases'])}
+                    for command, entry in self.data.items()}
+
+    def summary(self):
+        # Rata-rata ms per request dan porsi setiap fase dari total waktu server
+        result = {}
+        for command, entry in self.to_dict().items():
+            total = sum(entry['phases'].values()) or 1.0
+            result[command] = {
+                'count': entry['count'],
+                'mean_ms': {phase: seconds * 1000 / entry['count'] for phase, seconds in entry['phases'].items()},
+                'share': {phase: seconds / total for phase, seconds in entry['phases'].items()},
+            }
+        return result
@@ -0,0 +1,12 @@
+import sys
+import time
+
+import benchmark
+
+# Skenario stress test lama (download/upload/list 10/50/100MB, 1/5/50 client, 50 worker)
+# kini dijalankan lewat benchmark.py; opsi tambahan diteruskan apa adanya. Hasil ditulis ke
+# result/bench-*, bukan ke result/*_result.csv yang menyimpan angka baseline lama.
+if __name__ == '__main__':
+    benchmark.main(['--server', 'asyncio', '--operations', 'download,upload,list', '--sizes', '10MB,50MB,100MB',
+                    '--clients', '1,5,50', '--server-pools', '50', '--requests', '1',
+                    '--output', f"result/bench-asyncio-{time.strftime('%Y%m%d-%H%M%S')}"] + sys.argv[1:])
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from file_framing import TEXT_TERMINATOR  # noqa: E402
+
+SERVER_SCRIPTS = {
+    'thread': 'file_server_multithreading.py',
+    'process': 'file_server_multiprocessing.py',
+    'asyncio': 'file_server_asyncio.py',
+}
+BACKENDS = list(SERVER_SCRIPTS)
+SERVER_START_TIMEOUT = 15.0
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def text_request(address, command, timeout=30):
+    # Perintah teks lama: satu request per koneksi, respons JSON diakhiri "\r\n\r\n"
+    with socket.create_connection(address, timeout=timeout) as sock:
+        sock.sendall(command + TEXT_TERMINATOR if isinstance(command, bytes) else command.encode() + TEXT_TERMINATOR)
+        response = b''
+        while not response.endswith(TEXT_TERMINATOR):
+            data = sock.recv(2**20)
+            if not data:
+                break
+            response += data
+    return json.loads(response) if response else None
+
+
+class ServerProcess:
+    # Server dijalankan sebagai subprocess di direktori sementara dengan port bebas
+    def __init__(self, backend, workdir, workers=4, env=None, args=()):
+        self.backend = backend
+        self.workdir = str(workdir)
+        self.files = os.path.join(self.workdir, 'files')
+        self.address = ('127.0.0.1', free_port())
+        self.log_path = os.path.join(self.workdir, f"server-{backend}.log")
+        environment = dict(os.environ, FILE_ACCESS_LOG_SAMPLE='0')
+        environment.pop('FILE_METRICS_PORT', None)
+        environment.update(env or {})
+        self.log_file = open(self.log_path, 'w')
+        command = [sys.executable, os.path.join(ROOT, SERVER_SCRIPTS[backend]), str(workers),
+                   '--port', str(self.address[1])] + list(args)
+        self.process = subprocess.Popen(command, cwd=self.workdir, env=environment,
+                                        stdout=self.log_file, stderr=subprocess.STDOUT)
+        self.wait_ready()
+
+    def wait_ready(self):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server {self.backend} exited with code {self.process.returncode}:\n{self.log()}")
+            try:
+                socket.create_connection(self.address, timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"Server {self.backend} did not start within {SERVER_START_TIMEOUT}s")
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def log(self):
+        self.log_file.flush()
+        with open(self.log_path) as log_file:
+            return log_file.read()
+
+    def text(self, command, timeout=30):
+        return text_request(self.address, command, timeout)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log_file.close()
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    # Server dengan konfigurasi khusus (environment, jumlah worker) untuk satu test
+    servers = []
+
+    def start(backend, workers=4, env=None, args=()):
+        workdir = tmp_path / f"{backend}-{len(servers)}"
+        workdir.mkdir()
+        server = ServerProcess(backend, workdir, workers, env, args)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture(scope='module', params=BACKENDS)
+def server(request, tmp_path_factory):
+    # Satu server per backend dipakai bersama oleh test dalam satu modul
+    server = ServerProcess(request.param, tmp_path_factory.mktemp(request.param))
+    yield server
+    server.stop()
@@ -0,0 +1,23 @@
+import time
+
+
+def wait_for_log(server, text, timeout=5):
+    deadline = time.monotonic() + timeout
+    while text not in server.log():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def test_failures_bypass_sampling(server):
+    # Server test berjalan dengan FILE_ACCESS_LOG_SAMPLE=0: hanya request teks yang gagal yang dicatat
+    assert server.text('GET tidak-ada-teks.bin')['status'] == 'ERROR'
+    assert server.text('DELETE tidak-ada-teks.bin')['status'] == 'ERROR'
+    assert server.text('PERINTAH_ANEH')['status'] == 'FAILED'
+    assert server.text('LIST')['status'] == 'OK'
+    assert wait_for_log(server, 'command=get status=ERROR')
+    assert wait_for_log(server, 'command=delete status=ERROR')
+    assert wait_for_log(server, 'status=FAILED')
+
+    assert 'command=list status=OK' not in server.log()
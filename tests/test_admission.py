@@ -0,0 +1,72 @@
+import json
+import time
+import socket
+import threading
+
+import pytest
+
+from file_admission import reject_connection
+from file_framing import BINARY_MAGIC, TEXT_TERMINATOR, SocketReader, read_frame
+
+
+@pytest.mark.parametrize('sent, binary', [(b'', False), (BINARY_MAGIC[:2], True), (BINARY_MAGIC, True),
+                                          (b'LIST' + TEXT_TERMINATOR, False)])
+def test_reject_answers_busy(sent, binary):
+    # Client yang belum (selesai) mengirim data tetap menerima BUSY, bukan koneksi yang ditutup diam-diam
+    client, server_side = socket.socketpair()
+    client.settimeout(5)
+    client.sendall(sent)
+    rejecter = threading.Thread(target=reject_connection, args=(server_side,))
+    rejecter.start()
+    if binary:
+        result = read_frame(SocketReader(client)).meta
+    else:
+        result = json.loads(SocketReader(client).read_until())
+    rejecter.join()
+    client.close()
+    assert result['status'] == 'BUSY'
+
+
+def test_prefork_sheds_then_serves(start_server):
+    # Satu worker ditahan upload yang tersendat: koneksi yang antri dijawab BUSY walaupun client
+    # belum mengirim apa pun, dan setelah worker kosong koneksi baru dilayani lagi
+    server = start_server('process', workers=1, args=('--queue-timeout', '0.5'))
+    holder = socket.create_connection(server.address, timeout=10)
+    holder.sendall(b'ADD tertahan.bin QUJD')
+    time.sleep(0.3)
+
+    waiting = socket.create_connection(server.address, timeout=10)
+    response = SocketReader(waiting).read_until()
+    waiting.close()
+    assert json.loads(response)['status'] == 'BUSY'
+
+    holder.sendall(b'QUJD' + TEXT_TERMINATOR)
+    assert json.loads(SocketReader(holder).read_until())['status'] == 'OK'
+    holder.close()
+    assert server.text('LIST', timeout=10)['status'] == 'OK'
+
+
+def test_reject_drain_is_bounded():
+    # Client yang terus mengirim tanpa henti tidak boleh menahan thread penolakan
+    client, server_side = socket.socketpair()
+    client.settimeout(5)
+    client.sendall(b'LIST' + TEXT_TERMINATOR)
+    stop = threading.Event()
+
+    def stream():
+        try:
+            while not stop.is_set():
+                client.send(b'x' * 4096)
+        except OSError:
+            pass
+
+    streamer = threading.Thread(target=stream)
+    streamer.start()
+    started = time.monotonic()
+    reject_connection(server_side)
+    elapsed = time.monotonic() - started
+    stop.set()
+    client.shutdown(socket.SHUT_RDWR)
+    streamer.join()
+    client.close()
+    assert elapsed < 1.0
@@ -0,0 +1,79 @@
+import csv
+import json
+
+import pytest
+
+import benchmark
+from conftest import free_port
+
+
+@pytest.mark.parametrize('text, size', [('512', 512), ('64KB', 2**16), ('1.5MB', 3 * 2**19), ('2gb', 2**31)])
+def test_parse_size(text, size):
+    assert benchmark.parse_size(text) == size
+
+
+@pytest.mark.parametrize('size, text', [(2**16, '64KB'), (10 * 2**20, '10MB'), (1000, '1000B')])
+def test_format_size(size, text):
+    assert benchmark.format_size(size) == text
+
+
+def run(tmp_path, *args):
+    prefix = tmp_path / 'hasil'
+    benchmark.main(['--port', str(free_port()), '--output', str(prefix)] + list(args))
+    with open(f"{prefix}.json") as json_file:
+        report = json.load(json_file)
+    with open(f"{prefix}.csv", newline='') as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    return report, rows
+
+
+def test_sweep_reports_measured_bytes(tmp_path):
+    # Server dijalankan harness sendiri; MB/s dihitung dari byte yang benar-benar dikirim server
+    report, rows = run(tmp_path, '--server', 'thread', '--operations', 'download,upload,list',
+                       '--sizes', '64KB', '--clients', '1,2', '--requests', '2', '--server-pools', '2')
+    metadata = report['metadata']
+    assert metadata['settings']['clients'] == [1, 2]
+    assert len(report['results']) == len(rows) == 6
+    assert all(row['run_id'] == metadata['run_id'] for row in rows)
+
+    for row in report['results']:
+        assert row['failed'] == 0
+        assert row['ok'] == row['requests'] == row['clients'] * 2
+        assert row['server_requests'] >= row['requests']
+        assert 0 < row['latency_p50_ms'] <= row['latency_p95_ms'] <= row['latency_p99_ms']
+        if row['operation'] in ('download', 'upload'):
+            assert row['size'] == '64KB'
+            assert row['bytes'] >= row['requests'] * 2**16
+            assert row['mb_per_s'] > 0
+        else:
+            assert row['size'] == ''
+
+
+def test_load_results_merge():
+    # Histogram dan trace dari setiap proses generator digabung menjadi satu hasil
+    first, second = benchmark.LoadResult(), benchmark.LoadResult()
+    for seconds in (0.001, 0.002):
+        first.record(True, seconds)
+    second.record(False, 0.5)
+    second.traces.record('get', {'send': 0.25})
+    second.finished = 3.0
+    first.merge(second)
+    assert (first.ok, first.failed, first.finished) == (2, 1, 3.0)
+    assert first.histogram.count == 3
+    assert first.histogram.quantile(0.99) >= 0.4
+    assert first.traces.to_dict()['get']['phases']['send'] == 0.25
+
+
+@pytest.mark.parametrize('mode', benchmark.CLIENT_MODES)
+def test_client_processes_aggregate(tmp_path, mode):
+    # Client virtual dibagi ke beberapa proses generator; hasilnya tetap dihitung dari semua proses
+    report, rows = run(tmp_path, '--server', 'thread', '--operations', 'get,list', '--sizes', '16KB',
+                       '--clients', '3', '--requests', '2', '--client-processes', '2', '--client-mode', mode,
+                       '--trace')
+    for row in report['results']:
+        assert row['failed'] == 0
+        assert row['ok'] == row['requests'] == 6
+        assert row['server_requests'] >= 6
+        assert row['wall_s'] > 0
+        assert row['trace_execute_ms'] >= 0
+    assert rows[0]['trace_send_ms'] != ''
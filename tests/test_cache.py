@@ -0,0 +1,79 @@
+import os
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from file_cache import SingleFlight
+from file_client import FileClient
+
+
+def test_single_flight_runs_once():
+    # Pemanggil yang datang selama flight berjalan menunggu dan menerima objek hasil yang sama
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return bytearray(b'isi')
+
+    with ThreadPoolExecutor(4) as executor:
+        leader = executor.submit(flights.run, 'kunci', load)
+        started.wait(5)
+        followers = [executor.submit(flights.run, 'kunci', load) for _ in range(3)]
+        while flights.shared < 3:
+            pass
+        release.set()
+        results = [leader.result(5)] + [future.result(5) for future in followers]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flights.shared == 3
+    assert flights.calls == {}
+
+
+def test_single_flight_shares_errors_then_retries():
+    # Error dari flight diteruskan ke semua penunggu dan key dilepas agar pemanggilan berikutnya dijalankan ulang
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise OSError('disk')
+
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(flights.run, 'kunci', failing)
+        started.wait(5)
+        follower = executor.submit(flights.run, 'kunci', failing)
+        while flights.shared < 1:
+            pass
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(OSError):
+                future.result(5)
+
+    assert flights.run('kunci', lambda: 'baru') == 'baru'
+
+
+def test_concurrent_gets_share_one_entry(start_server, tmp_path):
+    # GET teks bersamaan untuk file yang sama berbagi satu pembacaan dan encoding base64
+    server = start_server('thread')
+    data = os.urandom(3 * 2**20)
+    source = tmp_path / 'populer.bin'
+    source.write_bytes(data)
+    client = FileClient(server.address, pool_size=1)
+    try:
+        assert client.upload(str(source), 'populer.bin')['status'] == 'OK'
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: server.text('GET populer.bin'), range(16)))
+        stats = client.cache_stats()
+    finally:
+        client.close()
+    assert all(base64.b64decode(result['data_file']) == data for result in results)
+    assert stats['entries'] == 1
+    assert stats['hits'] + stats['coalesced'] >= 15
@@ -0,0 +1,74 @@
+import os
+import hashlib
+
+import pytest
+
+from file_client import FileClient
+
+
+def blob_count(server):
+    root = os.path.join(server.files, '.blobs')
+    return sum(len(files) for _, _, files in os.walk(root))
+
+
+@pytest.fixture(params=['thread', 'process'])
+def cas_server(request, start_server):
+    return start_server(request.param, env={'FILE_CAS': '1'})
+
+
+def test_store_has_link_and_release(cas_server, tmp_path):
+    data = os.urandom(100000)
+    digest = hashlib.sha256(data).hexdigest()
+    path = tmp_path / 'isi.bin'
+    path.write_bytes(data)
+    client = FileClient(cas_server.address, pool_size=1)
+    try:
+        assert client.has(digest)['exists'] is False
+        assert client.upload(str(path), 'satu.bin')['status'] == 'OK'
+        assert client.has(digest)['exists'] is True
+
+        # Isi yang sama di nama lain memakai blob yang sama
+        assert client.upload(str(path), 'dua.bin', dedupe=True).get('deduplicated')
+        assert client.link('tiga.bin', digest)['status'] == 'OK'
+        assert bytes(client.get('tiga.bin')['data_file']) == data
+        assert blob_count(cas_server) == 1
+        assert client.link('empat.bin', '0' * 64)['status'] == 'ERROR'
+
+        # Menimpa satu nama tidak melepas blob yang masih dipakai nama lain
+        other = tmp_path / 'lain.bin'
+        other.write_bytes(os.urandom(5000))
+        assert client.upload(str(other), 'satu.bin')['status'] == 'OK'
+        assert blob_count(cas_server) == 2
+        for name in ('dua.bin', 'tiga.bin'):
+            assert client.delete(name)['status'] == 'OK'
+        assert client.has(digest)['exists'] is False
+
+        # Blob isi lama dilepas saat nama terakhirnya ditimpa
+        assert client.upload(str(path), 'satu.bin')['status'] == 'OK'
+        assert blob_count(cas_server) == 1
+        assert client.delete('satu.bin')['status'] == 'OK'
+        assert blob_count(cas_server) == 0
+    finally:
+        client.close()
+
+
+def test_release_across_prefork_workers(start_server, tmp_path):
+    # Digest per nama hanya diketahui index worker yang menyimpannya; DELETE dan overwrite di
+    # worker lain (koneksi baru) tetap harus melepas blob
+    server = start_server('process', workers=4, env={'FILE_CAS': '1'})
+    for index in range(12):
+        path = tmp_path / f'berkas-{index}.bin'
+        path.write_bytes(os.urandom(20000))
+        client = FileClient(server.address, pool_size=1)
+        assert client.upload(str(path), f'berkas-{index}.bin')['status'] == 'OK'
+        client.close()
+    for index in range(6):
+        path = tmp_path / f'ganti-{index}.bin'
+        path.write_bytes(os.urandom(20000))
+        client = FileClient(server.address, pool_size=1)
+        assert client.upload(str(path), f'berkas-{index}.bin')['status'] == 'OK'
+        client.close()
+    assert blob_count(server) == 12
+    for index in range(12):
+        assert server.text(f'DELETE berkas-{index}.bin')['status'] == 'OK'
+    assert blob_count(server) == 0
@@ -0,0 +1,184 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from file_framing import (BINARY_MAGIC, CHUNK_HEADER, PAYLOAD_CHUNKED, TEXT_TERMINATOR, ChunkedPayloadReader,
+                          PayloadReader, SocketReader, encode_chunk, pack_frame, payload_reader, read_frame)
+from file_connection import NEED_MORE, match_add_prefix
+from file_codec import StreamDecoder, compress_chunks, decompress_chunks, get_codec, negotiate
+
+
+@pytest.fixture
+def pair():
+    left, right = socket.socketpair()
+    left.settimeout(5)
+    right.settimeout(5)
+    yield left, right
+    left.close()
+    right.close()
+
+
+def send_in_pieces(sock, data, piece=7):
+    # Data dikirim per potongan kecil agar parser harus menyambung beberapa recv
+    def run():
+        for start in range(0, len(data), piece):
+            sock.sendall(data[start:start + piece])
+
+    sender = threading.Thread(target=run)
+    sender.start()
+    return sender
+
+
+def test_frame_round_trip(pair):
+    left, right = pair
+    payload = bytes(range(256)) * 40
+    data = pack_frame(3, 'folder/nama file.bin', {'offset': 5, 'encoding': None}, len(payload), 1) + payload
+    sender = send_in_pieces(left, data, piece=13)
+    reader = SocketReader(right, bufsize=16)
+    frame = read_frame(reader)
+    assert frame.opcode == 3 and frame.flags == 1
+    assert frame.name == 'folder/nama file.bin'
+    assert frame.meta == {'offset': 5, 'encoding': None}
+    assert frame.payload_len == len(payload)
+    assert payload_reader(reader, frame.payload_len).read_all() == payload
+    sender.join()
+
+
+def test_frame_without_name_and_meta(pair):
+    left, right = pair
+    left.sendall(pack_frame(1) + pack_frame(14))
+    reader = SocketReader(right)
+    first, second = read_frame(reader), read_frame(reader)
+    assert (first.opcode, first.name, first.meta, first.payload_len) == (1, '', {}, 0)
+    assert second.opcode == 14
+
+
+def test_read_frame_returns_none_on_close(pair):
+    left, right = pair
+    left.close()
+    assert read_frame(SocketReader(right)) is None
+
+
+def test_truncated_frame_raises(pair):
+    left, right = pair
+    left.sendall(pack_frame(3, 'nama', {'a': 1}, 10)[:-3])
+    left.close()
+    with pytest.raises(ConnectionError):
+        read_frame(SocketReader(right))
+
+
+def test_payload_reader_iter_chunks(pair):
+    left, right = pair
+    payload = b'x' * 100000
+    sender = send_in_pieces(left, payload + b'NEXT', piece=4096)
+    reader = SocketReader(right)
+    payload_data = b''.join(PayloadReader(reader, len(payload)).iter_chunks(chunk_size=1000))
+    assert payload_data == payload
+    assert reader.read_exact(4) == b'NEXT'
+    sender.join()
+
+
+def test_chunked_payload_round_trip(pair):
+    left, right = pair
+    chunks = [b'a' * 10, b'b' * 70000, b'c']
+    data = b''.join(encode_chunk(chunk) for chunk in chunks) + CHUNK_HEADER.pack(0) + b'REST'
+    sender = send_in_pieces(left, data, piece=999)
+    reader = SocketReader(right)
+    payload = payload_reader(reader, PAYLOAD_CHUNKED)
+    assert isinstance(payload, ChunkedPayloadReader)
+    assert payload.read_all() == b''.join(chunks)
+    assert payload.readinto(memoryview(bytearray(10))) == 0
+    assert reader.read_exact(4) == b'REST'
+    sender.join()
+
+
+def test_chunked_payload_truncated(pair):
+    left, right = pair
+    left.sendall(encode_chunk(b'abc')[:-1])
+    left.close()
+    with pytest.raises(ConnectionError):
+        payload_reader(SocketReader(right), PAYLOAD_CHUNKED).read_all()
+
+
+def test_read_until_split_terminator(pair):
+    left, right = pair
+    sender = send_in_pieces(left, b'LIST' + TEXT_TERMINATOR + b'GET a' + TEXT_TERMINATOR, piece=3)
+    reader = SocketReader(right, bufsize=5)
+    assert reader.read_until() == b'LIST'
+    assert reader.read_until() == b'GET a'
+    sender.join()
+
+
+def test_iter_until_keeps_pipelined_request(pair):
+    left, right = pair
+    body = b'QUJD' * 5000
+    sender = send_in_pieces(left, body + TEXT_TERMINATOR + b'LIST' + TEXT_TERMINATOR, piece=1000)
+    reader = SocketReader(right, bufsize=333)
+    assert b''.join(reader.iter_until()) == body
+    assert reader.read_until() == b'LIST'
+    sender.join()
+
+
+@pytest.mark.parametrize('data, binary', [(BINARY_MAGIC + b'rest', True), (b'LIST' + TEXT_TERMINATOR, False),
+                                          (b'GE', False)])
+def test_detect_binary(pair, data, binary):
+    left, right = pair
+    left.sendall(data)
+    left.shutdown(socket.SHUT_WR)
+    reader = SocketReader(right)
+    assert reader.detect_binary() is binary
+    if binary:
+        assert bytes(reader.pending) == b'rest'
+
+
+@pytest.mark.parametrize('pending, expected', [
+    (b'ADD nama.txt QUJD', ('nama.txt', 13)),
+    (b'add x ', ('x', 6)),
+    (b'LIST' + TEXT_TERMINATOR, None),
+    (b'ADD nama.txt' + TEXT_TERMINATOR, None),
+    (b'AD', NEED_MORE),
+    (b'ADD nama', NEED_MORE),
+])
+def test_match_add_prefix(pending, expected):
+    assert match_add_prefix(bytearray(pending)) == expected
+
+
+@pytest.mark.parametrize('name', ['zlib', 'gzip'])
+def test_codec_round_trip(name):
+    codec = get_codec(name)
+    data = json.dumps(list(range(20000))).encode()
+    compressed = b''.join(compress_chunks(codec, [data[:1000], data[1000:]]))
+    assert len(compressed) < len(data)
+    assert b''.join(decompress_chunks(codec, [compressed[i:i + 100] for i in range(0, len(compressed), 100)])) == data
+
+
+def test_stream_decoder_small_pieces():
+    codec = get_codec('gzip')
+    data = b'hello world ' * 50000
+    compressed = b''.join(compress_chunks(codec, [data]))
+    decoder = StreamDecoder(codec)
+    received = bytearray()
+    for start in range(0, len(compressed), 4096):
+        for piece in decoder.feed(compressed[start:start + 4096]):
+            received += piece
+    for piece in decoder.finish():
+        received += piece
+    assert received == data
+
+
+@pytest.mark.parametrize('damage', [lambda data: data[:-20], lambda data: data + b'sampah'])
+def test_stream_decoder_rejects_damaged_stream(damage):
+    codec = get_codec('gzip')
+    compressed = damage(b''.join(compress_chunks(codec, [b'isi file ' * 10000])))
+    with pytest.raises(ValueError):
+        b''.join(decompress_chunks(codec, [compressed]))
+
+
+def test_negotiate():
+    assert negotiate(['br', 'gzip', 'zlib']).name == 'gzip'
+    assert negotiate('zlib').name == 'zlib'
+    assert negotiate(['br']) is None
+    with pytest.raises(ValueError):
+        get_codec('br')
@@ -0,0 +1,64 @@
+import time
+import socket
+import urllib.request
+
+import pytest
+
+from file_client import FileClient
+from file_metrics import PUBLISH_INTERVAL
+from conftest import BACKENDS, free_port
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_stats_and_prometheus(start_server, backend):
+    port = free_port()
+    server = start_server(backend, env={'FILE_METRICS_PORT': str(port)})
+    client = FileClient(server.address, pool_size=1)
+    try:
+        for _ in range(3):
+            assert client.list()['status'] == 'OK'
+        time.sleep(PUBLISH_INTERVAL * 1.5)
+        stats = client.stats()
+    finally:
+        client.close()
+    assert stats['status'] == 'OK'
+    assert stats['counters']['file_requests_total{command="list"}'] >= 3
+    assert stats['latency']['file_request_seconds{command="list",phase="execute"}']['count'] >= 3
+    assert 'file_pool_queue_depth' in stats['gauges']
+
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10).read().decode()
+    assert '# TYPE file_requests_total counter' in body
+    assert 'file_requests_total{command="list"}' in body
+    assert 'file_request_seconds_bucket{command="list",phase="execute",le="+Inf"}' in body
+    assert '# TYPE file_pool_queue_depth gauge' in body
+
+
+def prometheus_values(port):
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10).read().decode()
+    return dict(line.rsplit(' ', 1) for line in body.splitlines() if line and not line.startswith('#'))
+
+
+def test_prefork_pool_gauges(start_server):
+    # Worker sibuk dan koneksi yang antri di listener dilaporkan proses induk; endpoint
+    # Prometheus dilayani proses induk sehingga tetap bisa dibaca saat semua worker sibuk
+    port = free_port()
+    server = start_server('process', workers=1, env={'FILE_METRICS_PORT': str(port)},
+                          args=('--queue-timeout', '30'))
+    holder = socket.create_connection(server.address, timeout=10)
+    holder.sendall(b'ADD tertahan.bin QUJD')
+    time.sleep(0.3)
+    queued = [socket.create_connection(server.address, timeout=10) for _ in range(2)]
+    time.sleep(PUBLISH_INTERVAL * 1.5)
+
+    values = prometheus_values(port)
+    assert float(values['file_busy_workers']) == 1
+    assert float(values['file_pool_queue_depth']) == 2
+    assert float(values['file_active_connections']) == 1
+
+    for sock in queued:
+        sock.close()
+    holder.sendall(b'QUJD\r\n\r\n')
+    holder.recv(1024)
+    holder.close()
+    time.sleep(PUBLISH_INTERVAL * 1.5)
+    assert float(prometheus_values(port)['file_busy_workers']) == 0
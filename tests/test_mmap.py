@@ -0,0 +1,66 @@
+import os
+import time
+import socket
+import base64
+
+import pytest
+
+from file_client import FileClient
+from file_framing import TEXT_TERMINATOR
+from conftest import BACKENDS
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_truncate_during_streamed_get(start_server, tmp_path, backend):
+    # File yang dipotong di tempat (bukan lewat rename) selama GET streaming tidak boleh
+    # mematikan proses server; cache dimatikan supaya body dibaca bertahap dari file
+    server = start_server(backend, env={'FILE_CACHE_BYTES': '1000'})
+    source = tmp_path / 'besar.bin'
+    source.write_bytes(os.urandom(32 * 2**20))
+    client = FileClient(server.address, pool_size=1)
+    assert client.upload(str(source), 'besar.bin')['status'] == 'OK'
+    client.close()
+
+    sock = socket.create_connection(server.address, timeout=10)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2**16)
+    sock.sendall(b'GET besar.bin' + TEXT_TERMINATOR)
+    response = b''
+    while len(response) < 2**20:
+        response += sock.recv(2**16)
+    os.truncate(os.path.join(server.files, 'besar.bin'), 4096)
+    time.sleep(0.2)
+    try:
+        # Respons berakhir lebih pendek (atau koneksi ditutup), tetapi server tetap hidup
+        while not response.endswith(TEXT_TERMINATOR):
+            data = sock.recv(2**20)
+            if not data:
+                break
+            response += data
+    except OSError:
+        pass
+    sock.close()
+
+    time.sleep(0.5)
+    assert server.alive()
+    assert 'exited with code' not in server.log()
+    assert server.text('LIST')['status'] == 'OK'
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_get_after_in_place_edit(start_server, backend):
+    # Mapping lama tidak dipakai lagi setelah isi file diubah di tempat
+    server = start_server(backend, workers=1)
+    path = os.path.join(server.files, 'diubah.bin')
+    first = os.urandom(2**20)
+    with open(path, 'wb') as file_handle:
+        file_handle.write(first)
+    assert base64.b64decode(server.text('GET diubah.bin 0 100000')['data_file']) == first[:100000]
+
+    second = os.urandom(2**19)
+    with open(path, 'r+b') as file_handle:
+        file_handle.truncate(len(second))
+        file_handle.seek(0)
+        file_handle.write(second)
+    result = server.text('GET diubah.bin')
+    assert base64.b64decode(result['data_file']) == second
+    assert server.alive()
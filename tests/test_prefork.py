@@ -0,0 +1,45 @@
+import os
+import time
+import signal
+
+import pytest
+
+
+def worker_pids(server):
+    with open(f"/proc/{server.process.pid}/task/{server.process.pid}/children") as children:
+        return set(map(int, children.read().split()))
+
+
+def wait_for_workers(server, count):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        pids = worker_pids(server)
+        if len(pids) == count:
+            return pids
+        time.sleep(0.1)
+    raise AssertionError(f"expected {count} workers, found {worker_pids(server)}")
+
+
+@pytest.mark.parametrize('args', [(), ('--reuseport',)])
+def test_fixed_worker_pool(start_server, args):
+    # Koneksi dilayani worker yang sudah ada; tidak ada fork per koneksi
+    server = start_server('process', workers=3, args=args)
+    before = wait_for_workers(server, 3)
+    for _ in range(30):
+        assert server.text('LIST')['status'] == 'OK'
+    assert worker_pids(server) == before
+
+
+def test_dead_worker_is_replaced(start_server):
+    server = start_server('process', workers=2)
+    before = wait_for_workers(server, 2)
+    victim = min(before)
+    os.kill(victim, signal.SIGKILL)
+    deadline = time.monotonic() + 10
+    while victim in worker_pids(server) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    after = wait_for_workers(server, 2)
+    assert victim not in after
+    for _ in range(10):
+        assert server.text('LIST')['status'] == 'OK'
+    assert 'restarting' in server.log()
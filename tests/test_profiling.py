@@ -0,0 +1,40 @@
+import sys
+import threading
+
+from file_profiling import collapse
+
+
+def sampled_stack(target):
+    # Stack thread yang sedang berhenti di dalam target, diambil seperti sampler profiler
+    started, release = threading.Event(), threading.Event()
+    thread = threading.Thread(target=target, args=(started, release))
+    thread.start()
+    started.wait(5)
+    try:
+        return collapse(sys._current_frames()[thread.ident])
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_idle_keep_alive_is_not_sampled():
+    def wait_for_request(started, release):
+        started.set()
+        release.wait(5)
+
+    def serve_connection(started, release):
+        wait_for_request(started, release)
+
+    assert sampled_stack(serve_connection) is None
+
+
+def test_request_work_is_sampled():
+    def frame_execute(started, release):
+        started.set()
+        release.wait(5)
+
+    def serve_connection(started, release):
+        frame_execute(started, release)
+
+    stack = sampled_stack(serve_connection)
+    assert 'serve_connection' in stack and stack.split(';')[-1].startswith('wait')
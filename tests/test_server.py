@@ -0,0 +1,275 @@
+import os
+import base64
+import asyncio
+import hashlib
+
+import pytest
+
+from file_client import FileClient, AsyncFileClient, RangedDownload, RangeWriter, Request, encode_request
+from file_framing import PAYLOAD_CHUNKED, CHUNK_HEADER
+from file_codec import compress_chunks, get_codec
+
+
+@pytest.fixture
+def client(server):
+    client = FileClient(server.address, pool_size=4, timeout=30)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def source(tmp_path):
+    # File acak (tidak bisa dikompresi) dan file teks (bisa dikompresi)
+    def make(name, size, text=False):
+        path = tmp_path / name
+        if text:
+            line = b'baris log yang berulang-ulang untuk diuji 0123456789\n'
+            data = (line * (size // len(line) + 1))[:size]
+        else:
+            data = os.urandom(size)
+        path.write_bytes(data)
+        return str(path), data
+
+    return make
+
+
+def test_upload_download_round_trip(client, source, tmp_path):
+    path, data = source('acak.bin', 3 * 2**20 + 17)
+    result = client.upload(path, 'acak.bin')
+    assert result['status'] == 'OK'
+
+    target = tmp_path / 'hasil.bin'
+    result = client.download('acak.bin', str(target))
+    assert result['status'] == 'OK'
+    assert target.read_bytes() == data
+    assert result['data_digest'] == hashlib.sha256(data).hexdigest()
+
+    # Salinan lokal belum berubah, jadi server menjawab NOT_MODIFIED tanpa body
+    again = client.download('acak.bin', str(target))
+    assert again['status'] == 'OK' and again.get('not_modified')
+    assert target.read_bytes() == data
+
+
+def test_digest_only_when_compared(server, client, tmp_path):
+    # File yang disalin langsung ke direktori belum punya digest; GET biasa tidak menghitungnya
+    data = os.urandom(100000)
+    with open(os.path.join(server.files, 'disalin.bin'), 'wb') as file_handle:
+        file_handle.write(data)
+    digest = hashlib.sha256(data).hexdigest()
+    assert 'data_digest' not in client.get('disalin.bin')
+    result = client.pool.request(Request('get', 'disalin.bin', meta={'if_none_match': digest}))
+    assert result['status'] == 'NOT_MODIFIED'
+
+    # Tanpa digest dari server, download memakai digest isi yang ditulis
+    result = client.download('disalin.bin', str(tmp_path / 'disalin.out'))
+    assert result['data_digest'] == digest
+    assert client.download('disalin.bin', str(tmp_path / 'disalin.out')).get('not_modified')
+
+
+def test_get_and_stat(client, source):
+    path, data = source('kecil.bin', 5000)
+    client.upload(path, 'kecil.bin')
+    result = client.get('kecil.bin')
+    assert result['status'] == 'OK'
+    assert bytes(result['data_file']) == data
+    stat = client.stat('kecil.bin')
+    assert stat['status'] == 'OK' and stat['data_size'] == len(data)
+    assert client.get('tidak-ada.bin')['status'] == 'ERROR'
+
+
+@pytest.mark.parametrize('offset, length', [(0, 1), (1000, 70000), (2**20 - 10, 100), (5, None)])
+def test_range_get(client, source, offset, length):
+    path, data = source('range.bin', 2**20)
+    client.upload(path, 'range.bin')
+    if length is None:
+        result = client.pool.request(Request('get', 'range.bin', meta={'offset': offset}))
+        expected = data[offset:]
+    else:
+        result = client.get_range('range.bin', offset, length)
+        expected = data[offset:offset + length]
+    assert result['status'] == 'OK'
+    assert bytes(result['data_file']) == expected
+    assert result['file_size'] == len(data)
+
+
+def test_invalid_range(client, source):
+    path, data = source('range2.bin', 1000)
+    client.upload(path, 'range2.bin')
+    assert client.get_range('range2.bin', 2000, 10)['status'] == 'ERROR'
+    assert client.get_range('range2.bin', 10, -1)['status'] == 'ERROR'
+    # Koneksi tetap bisa dipakai setelah error
+    assert client.get_range('range2.bin', 990, 100)['data_size'] == 10
+
+
+def test_non_raw_binary_get(client, source):
+    path, data = source('b64.bin', 200000)
+    client.upload(path, 'b64.bin')
+    result = client.pool.request(Request('get', 'b64.bin', flags=0))
+    assert result['status'] == 'OK'
+    assert base64.b64decode(result['data_file']) == data
+
+
+def test_parallel_download_detects_changed_file(server, client, source, tmp_path):
+    path, data = source('paralel.bin', 2**20)
+    client.upload(path, 'paralel.bin')
+    target = tmp_path / 'paralel.out'
+    assert client.download_parallel('paralel.bin', str(target), streams=3)['status'] == 'OK'
+    assert target.read_bytes() == data
+
+    # Isi diganti di tempat dengan ukuran sama setelah STAT: range dari versi baru ditolak
+    info = client.stat('paralel.bin')
+    transfer = RangedDownload(str(tmp_path / 'berubah.out'), info, 2)
+    stored = os.path.join(server.files, 'paralel.bin')
+    with open(stored, 'r+b') as file_handle:
+        file_handle.write(os.urandom(1000))
+    os.utime(stored, (info['data_mtime'] + 5, info['data_mtime'] + 5))
+    result = client.pool.call('download', transfer.request(0, 1000), RangeWriter(transfer.fd, 0))
+    assert transfer.check(result, 0)['status'] == 'ERROR'
+    os.close(transfer.fd)
+    # Range yang ditolak tidak dicatat sebagai selesai
+    assert not os.path.exists(transfer.state_path)
+
+
+def test_chunked_upload(client, source):
+    path, data = source('bertahap.bin', 2**20 + 12345)
+    result = client.upload_chunked(path, 'bertahap.bin', streams=3, chunk_size=300000)
+    assert result['status'] == 'OK'
+    assert bytes(client.get('bertahap.bin')['data_file']) == data
+    assert not os.path.exists(f"{path}.upload.json")
+
+
+def test_chunked_upload_resume(client, source):
+    path, data = source('lanjut.bin', 500000)
+    begin = client.pool.request(Request('upload_begin', 'lanjut.bin', meta={'size': len(data), 'chunk_size': 200000}))
+    assert begin['status'] == 'OK' and begin['chunk_count'] == 3
+    upload_id = begin['upload_id']
+    chunk = client.pool.request(Request('upload_chunk', upload_id, data[200000:400000], meta={'index': 1}))
+    assert chunk['status'] == 'OK'
+    status = client.pool.request(Request('upload_status', upload_id))
+    assert status['received'] == [1]
+    # Chunk dengan panjang salah ditolak dan commit sebelum lengkap gagal
+    wrong = client.pool.request(Request('upload_chunk', upload_id, b'x' * 10, meta={'index': 0}))
+    assert wrong['status'] == 'ERROR'
+    assert client.pool.request(Request('upload_commit', upload_id))['status'] == 'ERROR'
+    for index in (0, 2):
+        piece = data[index * 200000:(index + 1) * 200000]
+        assert client.pool.request(Request('upload_chunk', upload_id, piece, meta={'index': index}))['status'] == 'OK'
+    assert client.pool.request(Request('upload_commit', upload_id))['status'] == 'OK'
+    assert bytes(client.get('lanjut.bin')['data_file']) == data
+
+
+def test_chunked_payload_upload(client):
+    # Body ADD dengan panjang tidak diketahui dikirim sebagai rangkaian chunk
+    parts = [b'satu ', b'dua ' * 20000, b'tiga']
+    with client.pool.connection() as conn:
+        header, _ = encode_request(Request('add', 'chunked.txt'), True, payload_len=PAYLOAD_CHUNKED)
+        conn.sock.sendall(header)
+        for part in parts:
+            conn.sock.sendall(CHUNK_HEADER.pack(len(part)) + part)
+        conn.sock.sendall(CHUNK_HEADER.pack(0))
+        assert conn.receive()['status'] == 'OK'
+    assert bytes(client.get('chunked.txt')['data_file']) == b''.join(parts)
+
+
+@pytest.mark.parametrize('codec', ['gzip', 'zlib'])
+def test_compressed_transfer(server, source, tmp_path, codec):
+    path, data = source(f'teks-{codec}.log', 2**20, text=True)
+    client = FileClient(server.address, pool_size=2, compression=codec)
+    try:
+        assert client.upload(path, f'teks-{codec}.log')['status'] == 'OK'
+        target = tmp_path / f'teks-{codec}.out'
+        result = client.download(f'teks-{codec}.log', str(target))
+        assert result['encoding'] == codec
+        assert target.read_bytes() == data
+        result = client.get_range(f'teks-{codec}.log', 100, 300000)
+        assert bytes(result['data_file']) == data[100:300100]
+    finally:
+        client.close()
+
+
+def test_truncated_compressed_upload(client):
+    # Upload gzip yang terpotong ditolak, bukan disimpan sebagai file yang lebih pendek
+    codec = get_codec('gzip')
+    compressed = b''.join(compress_chunks(codec, [b'baris terpotong\n' * 50000]))[:-100]
+    request = Request('add', 'terpotong.log', compressed, meta={'encoding': 'gzip'})
+    assert client.pool.request(request)['status'] != 'OK'
+    assert client.stat('terpotong.log')['status'] == 'ERROR'
+
+
+def test_delete_and_list(client, source):
+    for index in range(5):
+        path, _ = source(f'daftar-{index}.txt', 10)
+        client.upload(path, f'daftar-{index}.txt')
+    names = list(client.iter_list(prefix='daftar-', page_size=2))
+    assert names == [f'daftar-{index}.txt' for index in range(5)]
+    assert client.delete('daftar-0.txt')['status'] == 'OK'
+    assert client.delete('daftar-0.txt')['status'] == 'ERROR'
+    assert 'daftar-0.txt' not in client.list(prefix='daftar-')['data']
+
+
+def test_pipeline(client, source):
+    path, data = source('pipa.bin', 1000)
+    client.upload(path, 'pipa.bin')
+    results = client.pipeline([Request('stat', 'pipa.bin'), Request('get', 'pipa.bin'), Request('list')])
+    assert [result['status'] for result in results] == ['OK', 'OK', 'OK']
+    assert bytes(results[1]['data_file']) == data
+
+
+def test_get_without_name(client):
+    assert client.pool.request(Request('get', ''))['status'] == 'ERROR'
+
+
+def test_async_client(server, source, tmp_path):
+    path, data = source('async.bin', 2**20)
+
+    async def run():
+        client = AsyncFileClient(server.address, pool_size=2)
+        try:
+            assert (await client.upload(path, 'async.bin'))['status'] == 'OK'
+            result = await client.get_range('async.bin', 10, 1000)
+            assert bytes(result['data_file']) == data[10:1010]
+            target = tmp_path / 'async.out'
+            assert (await client.download('async.bin', str(target)))['status'] == 'OK'
+            assert target.read_bytes() == data
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+def test_legacy_text_protocol(server):
+    data = os.urandom(300000)
+    encoded = base64.b64encode(data).decode()
+    assert server.text(f"ADD teks.bin {encoded}")['status'] == 'OK'
+    assert 'teks.bin' in server.text('LIST')['data']
+
+    result = server.text('GET teks.bin')
+    assert result['status'] == 'OK' and result['data_namafile'] == 'teks.bin'
+    assert base64.b64decode(result['data_file']) == data
+
+    result = server.text('GET teks.bin 1000 5000')
+    assert base64.b64decode(result['data_file']) == data[1000:6000]
+    assert result['file_size'] == len(data)
+
+    assert server.text('GET tidak-ada.bin')['status'] == 'ERROR'
+    assert server.text('PERINTAH_ANEH')['status'] == 'FAILED'
+    assert server.text('DELETE teks.bin')['status'] == 'OK'
+    assert 'teks.bin' not in server.text('LIST')['data']
+
+
+@pytest.mark.parametrize('command', ['GET teks-range.bin b', 'GET teks-range.bin -5 10', 'GET teks-range.bin 0 1.5'])
+def test_legacy_text_invalid_range(server, command):
+    result = server.text(command)
+    assert result == {'status': 'ERROR', 'data': 'offset/length must be non-negative integers'}
+
+
+def test_legacy_text_bad_base64(server):
+    assert server.text('ADD rusak.bin ###')['status'] == 'ERROR'
+    assert 'rusak.bin' not in server.text('LIST')['data']
+
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_cache_budget_is_per_server(start_server, backend):
+    server = start_server(backend, workers=4, env={'FILE_CACHE_BYTES': '4000000'})
+    expected = 1000000 if backend == 'process' else 4000000
+    assert server.text('CACHE_STATS')['max_bytes'] == expected
@@ -0,0 +1,92 @@
+import os
+import time
+import json
+import socket
+import base64
+
+import pytest
+
+from file_client import FileClient, Request, encode_request
+from file_framing import BINARY_MAGIC, TEXT_TERMINATOR
+from conftest import BACKENDS
+
+
+def upload(server, tmp_path, name, size):
+    data = os.urandom(size)
+    (tmp_path / name).write_bytes(data)
+    client = FileClient(server.address, pool_size=1)
+    assert client.upload(str(tmp_path / name), name)['status'] == 'OK'
+    client.close()
+    return data
+
+
+def small_buffer_connection(address):
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2**16)
+    sock.settimeout(10)
+    sock.connect(address)
+    return sock
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_send_timeout_is_a_stall_timeout(start_server, tmp_path, backend):
+    # Client yang membaca terus dengan laju wajar tidak boleh diputus walaupun seluruh body
+    # (base64 dari cache, satu buffer besar) butuh jauh lebih lama dari SEND_TIMEOUT
+    server = start_server(backend, env={'FILE_SEND_TIMEOUT': '1'})
+    data = upload(server, tmp_path, 'lambat.bin', 3 * 2**20)
+    sock = small_buffer_connection(server.address)
+    sock.sendall(b'GET lambat.bin' + TEXT_TERMINATOR)
+    response = bytearray()
+    started = time.monotonic()
+    while not response.endswith(TEXT_TERMINATOR):
+        chunk = sock.recv(2**16)
+        if not chunk:
+            break
+        response += chunk
+        time.sleep(0.04)
+    sock.close()
+    assert time.monotonic() - started > 2
+    assert base64.b64decode(json.loads(response)['data_file']) == data
+    assert 'Closing slow connection' not in server.log()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_stalled_reader_is_dropped(start_server, tmp_path, backend):
+    server = start_server(backend, env={'FILE_SEND_TIMEOUT': '1'})
+    upload(server, tmp_path, 'macet.bin', 8 * 2**20)
+    sock = small_buffer_connection(server.address)
+    sock.sendall(b'GET macet.bin' + TEXT_TERMINATOR)
+    deadline = time.monotonic() + 10
+    while 'Closing slow connection' not in server.log():
+        assert time.monotonic() < deadline, server.log()
+        time.sleep(0.2)
+    sock.close()
+    assert server.text('LIST')['status'] == 'OK'
+
+
+def test_slow_uploads_do_not_block_executor(start_server, tmp_path):
+    # Upload yang body-nya tersendat tidak boleh memakai thread executor selama menunggu data,
+    # jadi client lain tetap dilayani walaupun jumlah upload lambat >= jumlah thread
+    server = start_server('asyncio', workers=2)
+    data = os.urandom(2**20)
+    uploads = []
+    for index in range(2):
+        sock = socket.create_connection(server.address, timeout=10)
+        header, _ = encode_request(Request('add', f'lambat-{index}.bin'), True, payload_len=len(data))
+        sock.sendall(BINARY_MAGIC + header + data[:100])
+        uploads.append(sock)
+    time.sleep(0.3)
+
+    started = time.monotonic()
+    assert server.text('LIST', timeout=10)['status'] == 'OK'
+    assert time.monotonic() - started < 2
+
+    # Sisa body tetap diterima dan upload selesai dengan benar
+    for index, sock in enumerate(uploads):
+        client = FileClient(server.address, pool_size=1)
+        sock.sendall(data[100:])
+        sock.settimeout(10)
+        assert sock.recv(1)
+        sock.close()
+        assert bytes(client.get(f'lambat-{index}.bin')['data_file']) == data
+        client.close()
@@ -0,0 +1,63 @@
+import os
+import asyncio
+
+from file_client import FileClient, AsyncFileClient
+from file_tracing import TRACE_PHASES, Trace
+
+
+def test_outer_phase_excludes_inner_spans():
+    trace = Trace()
+    trace.add_span('disk', 0.3)
+    trace.add_outer('execute', 0.5)
+    trace.add_outer('send', 0.1)
+    assert trace.phases['disk'] == 0.3
+    assert abs(trace.phases['execute'] - 0.2) < 1e-9
+    assert abs(trace.phases['send'] - 0.1) < 1e-9
+
+
+def test_trace_trailer(server, tmp_path):
+    # Trailer dibaca habis sebelum request berikutnya memakai koneksi yang sama
+    source = tmp_path / 'dilacak.bin'
+    data = os.urandom(200000)
+    source.write_bytes(data)
+    client = FileClient(server.address, pool_size=1, trace=True)
+    try:
+        uploaded = client.upload(str(source), 'dilacak.bin')
+        fetched = client.get('dilacak.bin')
+        listed = client.list()
+    finally:
+        client.close()
+    assert uploaded['status'] == 'OK' and listed['status'] == 'OK'
+    assert bytes(fetched['data_file']) == data
+    for result in (uploaded, fetched, listed):
+        assert set(result['trace']) == set(TRACE_PHASES)
+        assert all(seconds >= 0 for seconds in result['trace'].values())
+        assert 'traced' not in result
+
+    recorded = client.traces.to_dict()
+    assert recorded['get']['count'] == 1 and recorded['list']['count'] == 1
+    summary = client.traces.summary()['get']
+    assert abs(sum(summary['share'].values()) - 1.0) < 1e-6
+
+
+def test_untraced_requests_have_no_trailer(server):
+    client = FileClient(server.address, pool_size=1)
+    try:
+        first, second = client.list(), client.list()
+    finally:
+        client.close()
+    assert first['status'] == second['status'] == 'OK'
+    assert 'trace' not in first and client.traces is None
+
+
+def test_async_client_trace(server):
+    async def run():
+        client = AsyncFileClient(server.address, pool_size=1, trace=True)
+        try:
+            return [await client.list() for _ in range(2)], client.traces.to_dict()
+        finally:
+            client.close()
+
+    results, recorded = asyncio.run(run())
+    assert all(set(result['trace']) == set(TRACE_PHASES) for result in results)
+    assert recorded['list']['count'] == 2